@@ -0,0 +1,511 @@
+# КОТОГАДАЛКА - бенчмарки
+# База данных: наполняет базу синтетической историей и замеряет запись и чтение
+# на нескольких размерах таблиц, плюс скорость записи в каждом профиле Database.
+# Картинки: декодирование и уменьшение фото котов и карт таро разными способами,
+# холодный и тёплый кэш.
+# Результат - JSON для сравнения между версиями.
+# Запуск: python main.py bench-db [--sizes 10000 1000000 10000000] [--users 100] [--profile-rows 2000]
+#                                  [--output файл.json]
+#         python main.py bench-images [--repeat 5] [--output файл.json]
+
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from PIL import Image, ImageChops, ImageStat
+
+from metrics import percentile
+from oracle import (QUESTIONS, CAT_TYPES, DB_PROFILES, PREDICTION_TOPICS, IMAGES_FOLDER, TAROT_CARD_SIZE,
+                    TAROT_ATLAS_IMAGE, TAROT_ATLAS_INDEX, Database, ImageCache, TarotAtlas,
+                    get_cat_type, get_tarot_registry, open_scaled, resize_image)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+SEED_BATCH_SIZE = 50000
+SEED_DAYS = 365
+
+
+# ============================================================
+# СИНТЕТИЧЕСКИЕ ДАННЫЕ
+# ============================================================
+
+class HistoryGenerator:
+    """
+    Воспроизводимая синтетическая история для N пользователей.
+    У каждого пользователя свой привычный уровень настроения, по выходным
+    он чуть выше; ответ на вопрос - вариант около этого уровня, поэтому
+    суммы баллов распределены как у живых людей, а не равномерно.
+    """
+
+    def __init__(self, users=100, seed=42):
+        self.random = random.Random(seed)
+        self.users = [f"user{i:05d}" for i in range(users)]
+        # Уровень настроения пользователя - позиция в списке вариантов (0..1)
+        self.baselines = {user: self.random.betavariate(3, 3) for user in self.users}
+        self.option_scores = [sorted(option["score"] for option in question["options"])
+                              for question in QUESTIONS]
+        self.card_names = [card.name for card in get_tarot_registry()]
+        self.now = int(time.time())
+
+    def answers(self, user, weekday):
+        level = self.baselines[user] + (0.1 if weekday in (0, 6) else 0.0)
+        answers = []
+        for scores in self.option_scores:
+            position = min(max(self.random.gauss(level, 0.2), 0.0), 0.999)
+            answers.append(scores[int(position * len(scores))])
+        return answers
+
+    def timestamp(self):
+        return self.now - self.random.randrange(SEED_DAYS * 24 * 60 * 60)
+
+    def mood_rows(self, count):
+        """Строки mood_results: (date, cat_type, score, answers, ts, user_id)."""
+        for _ in range(count):
+            user = self.random.choice(self.users)
+            ts = self.timestamp()
+            moment = datetime.fromtimestamp(ts)
+            answers = self.answers(user, int(moment.strftime("%w")))
+            score = sum(answers)
+            yield (moment.strftime("%Y-%m-%d %H:%M:%S"), get_cat_type(score)["name"], score,
+                   ",".join(map(str, answers)), ts, user)
+
+    def tarot_rows(self, count):
+        """Строки tarot_readings: (date, карта1, карта2, карта3, предсказания..., ts, user_id)."""
+        for _ in range(count):
+            ts = self.timestamp()
+            cards = self.random.sample(self.card_names, 3)
+            predictions = [f"Synthetic {topic} prediction for {card}."
+                           for topic, card in zip(PREDICTION_TOPICS, cards)]
+            yield (datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"), *cards, *predictions,
+                   ts, self.random.choice(self.users))
+
+
+def insert_batches(db, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH_SIZE:
+            db.cursor.executemany(sql, batch)
+            db.connection.commit()
+            batch = []
+    if batch:
+        db.cursor.executemany(sql, batch)
+        db.connection.commit()
+
+
+def seed_database(db, generator, mood_rows, tarot_rows):
+    """Добавляет строки в обход буфера записи: большими транзакциями через executemany."""
+    with db.lock:
+        db.flush()
+        insert_batches(db, '''
+            INSERT INTO mood_results (date, cat_type, score, answers, ts, user_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', generator.mood_rows(mood_rows))
+        insert_batches(db, '''
+            INSERT INTO tarot_readings
+            (date, card1_name, card2_name, card3_name,
+             prediction_love, prediction_career, prediction_finance, ts, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', generator.tarot_rows(tarot_rows))
+        db.cursor.execute("PRAGMA optimize")
+
+
+# ============================================================
+# ЗАМЕРЫ
+# ============================================================
+
+def summarize(name, rows, durations, total=None):
+    durations = sorted(durations)
+    total = total if total is not None else sum(durations)
+    return {
+        "rows": rows,
+        "op": name,
+        "calls": len(durations),
+        "mean_ms": round(total / len(durations) * 1000, 4),
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 4),
+        "ops_per_s": round(len(durations) / total, 1) if total else None,
+    }
+
+
+def time_calls(func, args_list):
+    durations = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def time_writes(db, func, args_list):
+    """
+    Записи буферизуются, поэтому кроме времени вызовов
+    в общее время входит и финальный flush().
+    """
+    started = time.perf_counter()
+    durations = time_calls(func, args_list)
+    db.flush()
+    return durations, time.perf_counter() - started
+
+
+def run_operations(db, generator, rows, calls):
+    rnd = random.Random(rows)
+    users = [rnd.choice(generator.users) for _ in range(calls)]
+    cards = [list(get_tarot_registry()[:3])] * calls
+    prediction = {topic: f"Benchmark {topic}." for topic in PREDICTION_TOPICS}
+    results = []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        durations, total = time_writes(db, db.save_mood_result, [
+            (get_cat_type(sum(answers))["name"], sum(answers), answers, user)
+            for user, answers in ((user, generator.answers(user, 1)) for user in users)
+        ])
+        results.append(summarize("save_mood_result", rows, durations, total))
+
+        durations, total = time_writes(db, db.save_tarot_reading, [
+            (spread, prediction, user) for spread, user in zip(cards, users)
+        ])
+        results.append(summarize("save_tarot_reading", rows, durations, total))
+
+    reads = [
+        ("get_mood_history", db.get_mood_history, [(20, user) for user in users]),
+        ("get_mood_trend", db.get_mood_trend, [(30, user) for user in users]),
+        ("get_mood_by_weekday", db.get_mood_by_weekday, [(user,) for user in users]),
+        ("get_mood_statistics", db.get_mood_statistics, [(user,) for user in users]),
+    ]
+    for name, func, args_list in reads:
+        results.append(summarize(name, rows, time_calls(func, args_list)))
+    return results
+
+
+def run_benchmarks(db_path, sizes, users=100, calls=1000, seed=42, profile="fast"):
+    """
+    Наращивает базу до каждого размера из sizes (строк mood_results,
+    раскладов - вчетверо меньше) и после каждого шага делает замеры.
+    """
+    generator = HistoryGenerator(users, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(db_path, profile=profile)
+    report = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "schema_version": db.query("PRAGMA user_version")[0][0],
+            "profile": profile,
+            "users": users,
+            "calls": calls,
+            "seed": seed,
+        },
+        "seeding": [],
+        "results": [],
+    }
+
+    try:
+        for size in sorted(sizes):
+            existing = db.query("SELECT COUNT(*) FROM mood_results")[0][0]
+            missing = max(size - existing, 0)
+            started = time.perf_counter()
+            seed_database(db, generator, missing, missing // 4)
+            elapsed = time.perf_counter() - started
+            report["seeding"].append({"rows": size, "inserted": missing, "seconds": round(elapsed, 3)})
+            print(f"[BENCH] {size} строк: наполнение {missing} строк за {elapsed:.1f} с")
+
+            for result in run_operations(db, generator, size, calls):
+                report["results"].append(result)
+                print(f"[BENCH] {size:>9} {result['op']:<20} p50 {result['p50_ms']:.3f} мс, "
+                      f"p95 {result['p95_ms']:.3f} мс, {result['ops_per_s']} оп/с")
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.close()
+    return report
+
+
+def compare_write_profiles(rows=2000):
+    """Скорость записи результатов тестов по одному в каждом профиле DB_PROFILES."""
+    results = []
+    for profile in DB_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with contextlib.redirect_stdout(io.StringIO()):
+                db = Database(os.path.join(tmp_dir, "bench.db"), profile=profile)
+                started = time.perf_counter()
+                for i in range(rows):
+                    db.save_mood_result(CAT_TYPES[i % len(CAT_TYPES)]["name"], 5 + i % 21, [1, 2, 3, 4, 5])
+                db.close()
+                elapsed = time.perf_counter() - started
+        results.append({"profile": profile, "rows": rows, "seconds": round(elapsed, 3),
+                        "rows_per_s": round(rows / elapsed, 1)})
+        print(f"[BENCH] Профиль {profile}: {rows} записей за {elapsed:.3f} с, {rows / elapsed:.0f} записей/с")
+    return results
+
+
+def main_db(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py bench-db", description="Бенчмарки базы данных")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000, 10000000],
+                        help="размеры mood_results, на которых делать замеры")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=1000, help="вызовов каждой операции на размер")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--profile", default="fast", help="профиль Database")
+    parser.add_argument("--db", help="файл базы; существующий дополняется, по умолчанию временный")
+    parser.add_argument("--profile-rows", type=int, default=2000,
+                        help="записей для сравнения профилей записи, 0 - не сравнивать")
+    parser.add_argument("--output", default="-", help="файл для JSON с результатами, '-' - в stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.abspath(args.db) if args.db else os.path.join(tmp_dir, "bench.db")
+        report = run_benchmarks(db_path, args.sizes, args.users, args.calls, args.seed, args.profile)
+    if args.profile_rows:
+        report["write_profiles"] = compare_write_profiles(args.profile_rows)
+    write_report(report, args.output)
+
+
+def write_report(report, output):
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if output == "-":
+        print(data)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+        print(f"[BENCH] Результаты: {output}")
+
+
+# ============================================================
+# КАРТИНКИ
+# ============================================================
+
+# Фильтры уменьшения от лучшего к самому дешёвому
+IMAGE_FILTERS = {
+    "lanczos": Image.LANCZOS,
+    "bicubic": Image.BICUBIC,
+    "bilinear": Image.BILINEAR,
+    "box": Image.BOX,
+}
+CAT_IMAGE_SIZE = (180, 180)  # как на экране результата теста
+
+
+def image_datasets():
+    """Наборы картинок из images/: (файлы, рамка, fit) как их грузит приложение."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    images_dir = os.path.join(script_dir, IMAGES_FOLDER)
+    tarot_dir = os.path.join(images_dir, "tarot")
+
+    def files(folder):
+        return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                      if not name.startswith("."))
+
+    cats = []
+    for cat_type in CAT_TYPES:
+        cats += files(os.path.join(images_dir, cat_type["image_folder"]))
+    return {
+        "cats": (cats, CAT_IMAGE_SIZE, True),
+        "tarot_png": (files(os.path.join(tarot_dir, "png")), TAROT_CARD_SIZE, False),
+        "tarot_jpg": (files(os.path.join(tarot_dir, "jpg")), TAROT_CARD_SIZE, False),
+    }
+
+
+def target_size(image_size, box, fit):
+    if not fit:
+        return box
+    ratio = min(box[0] / image_size[0], box[1] / image_size[1], 1)
+    return int(image_size[0] * ratio), int(image_size[1] * ratio)
+
+
+def decode_and_resize(path, box, fit, resample=Image.LANCZOS, draft=False, reduce=False):
+    """
+    Один вариант конвейера: открыть, (draft) декодировать сразу в 1/2..1/8 размера,
+    (reduce) уменьшить в целое число раз, затем resize выбранным фильтром.
+    """
+    with Image.open(path) as image:
+        target = target_size(image.size, box, fit)
+        if draft and image.format == "JPEG":
+            image.draft("RGB", target)
+        image.load()
+        if reduce:
+            factor = min(image.width // target[0], image.height // target[1])
+            if factor >= 2:
+                image = image.reduce(factor)
+        return resize_image(image, *box, fit=fit, resample=resample)
+
+
+def image_error(image, reference):
+    """Средняя разница с эталоном по каналам, 0..255."""
+    if image.size != reference.size:
+        image = image.resize(reference.size, Image.LANCZOS)
+    return sum(ImageStat.Stat(ImageChops.difference(image, reference)).mean) / 3
+
+
+def image_cases(datasets):
+    """Все сочетания (набор, вариант), которые стоит мерить."""
+    cases = []
+    for dataset in datasets:
+        for name in IMAGE_FILTERS:
+            cases.append((dataset, name))
+        cases.append((dataset, "reduce+lanczos"))
+        cases.append((dataset, "open_scaled"))
+        if dataset != "tarot_png":
+            cases.append((dataset, "draft+lanczos"))
+            cases.append((dataset, "draft+reduce+lanczos"))
+        cases += [(dataset, "cache_cold"), (dataset, "cache_disk"), (dataset, "cache_memory")]
+    cases += [("tarot_atlas", "atlas_cold"), ("tarot_atlas", "atlas_warm")]
+    return cases
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS считает в байтах
+
+
+def time_image_calls(files, repeat, call):
+    durations = []
+    for _ in range(repeat):
+        for path in files:
+            started = time.perf_counter()
+            call(path)
+            durations.append(time.perf_counter() - started)
+    return durations
+
+
+def run_cache_case(files, box, fit, repeat, variant):
+    """
+    cache_cold - пустой кэш: декодирование, уменьшение и запись PNG на диск;
+    cache_disk - новый ImageCache над готовой папкой, как после перезапуска;
+    cache_memory - повторный get из LRU в памяти.
+    Файловый кэш ОС не сбрасывается, так что «холодный» - это холодный кэш приложения.
+    """
+    durations = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ImageCache(cache_dir)
+            for path in files:
+                started = time.perf_counter()
+                cache.get(path, *box, fit=fit)
+                if variant == "cache_cold":
+                    durations.append(time.perf_counter() - started)
+            if variant == "cache_cold":
+                continue
+
+            if variant == "cache_disk":
+                cache = ImageCache(cache_dir)
+            for path in files:
+                started = time.perf_counter()
+                cache.get(path, *box, fit=fit)
+                durations.append(time.perf_counter() - started)
+    return durations
+
+
+def run_atlas_case(repeat, variant):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    tarot_dir = os.path.join(script_dir, IMAGES_FOLDER, "tarot")
+    paths = (os.path.join(tarot_dir, TAROT_ATLAS_IMAGE), os.path.join(tarot_dir, TAROT_ATLAS_INDEX))
+    names = [card.name for card in get_tarot_registry()]
+
+    durations = []
+    if variant == "atlas_cold":
+        # Первая карта после запуска: чтение индекса и декодирование всего листа
+        for _ in range(repeat):
+            started = time.perf_counter()
+            TarotAtlas(*paths).crop(names[0])
+            durations.append(time.perf_counter() - started)
+    else:
+        atlas = TarotAtlas(*paths)
+        for _ in range(repeat):
+            for name in names:
+                started = time.perf_counter()
+                atlas.crop(name).load()
+                durations.append(time.perf_counter() - started)
+    return durations, len(names)
+
+
+def run_image_case(dataset, variant, repeat):
+    """Выполняется в отдельном процессе, чтобы пик RSS относился к одному варианту."""
+    rss_before = peak_rss_kb()
+    error = None
+
+    if dataset == "tarot_atlas":
+        durations, images = run_atlas_case(repeat, variant)
+    else:
+        files, box, fit = image_datasets()[dataset]
+        images = len(files)
+        if variant.startswith("cache_"):
+            durations = run_cache_case(files, box, fit, repeat, variant)
+        elif variant == "open_scaled":
+            # То, что делает приложение при промахе кэша
+            durations = time_image_calls(files, repeat, lambda path: open_scaled(path, *box, fit=fit))
+            errors = [image_error(open_scaled(path, *box, fit=fit), decode_and_resize(path, box, fit))
+                      for path in files]
+            error = round(sum(errors) / len(errors), 3)
+        else:
+            options = {
+                "resample": IMAGE_FILTERS[variant.split("+")[-1]],
+                "draft": "draft" in variant,
+                "reduce": "reduce" in variant,
+            }
+            durations = time_image_calls(files, repeat, lambda path: decode_and_resize(path, box, fit, **options))
+            errors = [image_error(decode_and_resize(path, box, fit, **options),
+                                  decode_and_resize(path, box, fit)) for path in files]
+            error = round(sum(errors) / len(errors), 3)
+
+    result = summarize(variant, images, durations)
+    del result["rows"]
+    rss_after = peak_rss_kb()
+    result.update({
+        "dataset": dataset,
+        "images": images,
+        "error_vs_lanczos": error,
+        "rss_before_kb": rss_before,
+        "peak_rss_kb": rss_after,
+    })
+    return result
+
+
+def run_image_benchmarks(repeat=5):
+    report = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pillow": Image.__version__,
+            "repeat": repeat,
+        },
+        "results": [],
+    }
+    cases = image_cases(image_datasets())
+    # spawn: каждый вариант в чистом процессе, пик RSS не наследуется от предыдущих
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for dataset, variant in cases:
+            result = pool.apply(run_image_case, (dataset, variant, repeat))
+            report["results"].append(result)
+            error = "" if result["error_vs_lanczos"] is None else f", ошибка {result['error_vs_lanczos']}"
+            rss = "" if result["peak_rss_kb"] is None else \
+                f", RSS +{result['peak_rss_kb'] - result['rss_before_kb']} КиБ"
+            print(f"[BENCH] {dataset:<11} {variant:<21} p50 {result['p50_ms']:.2f} мс, "
+                  f"p95 {result['p95_ms']:.2f} мс{error}{rss}")
+    return report
+
+
+def main_images(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py bench-images", description="Бенчмарки картинок")
+    parser.add_argument("--repeat", type=int, default=5, help="проходов по каждому набору")
+    parser.add_argument("--output", default="-", help="файл для JSON с результатами, '-' - в stdout")
+    args = parser.parse_args(argv)
+    write_report(run_image_benchmarks(args.repeat), args.output)
@@ -3,408 +3,448 @@
 
 import os
 import sys
+import time
+
+# Отметки времени запуска для --profile-startup
+STARTUP_STARTED = time.perf_counter()
+startup_marks = []
+
+
+def mark_startup(name):
+    startup_marks.append((name, time.perf_counter()))
+
 
 python_dir = sys.base_prefix
 os.environ['TCL_LIBRARY'] = os.path.join(python_dir, 'tcl', 'tcl8.6')
 os.environ['TK_LIBRARY'] = os.path.join(python_dir, 'tcl', 'tk8.6')
 
 # --- ИМПОРТЫ ---
+# PIL, sqlite3 и колода не импортируются здесь: они нужны только экранам
+# после меню и подгружаются при первом обращении
 import tkinter as tk
 from tkinter import messagebox
-from PIL import Image, ImageTk
-import random
-import json
-import sqlite3
-from datetime import datetime, timedelta
+mark_startup("импорт tkinter")
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
+from oracle import (
+    QUESTIONS, CAT_TYPES, WEEKDAYS, PREDICTION_FALLBACK,
+    OracleEngine, MoodQuiz, SpreadPrefetcher, HistoryPages,
+    get_random_local_image, image_cache, api_client,
+    build_tarot_atlas, get_tarot_atlas, Database,
+)
+from metrics import metrics, Histogram
+mark_startup("импорт oracle")
 
-# ============================================================
-# БАЗА ДАННЫХ (SQLite)
-# ============================================================
-
-class Database:
-    """
-    Класс для работы с базой данных SQLite.
-    Хранит результаты тестов и раскладов таро.
-    """
-    
-    def __init__(self, db_name="cat_oracle.db"):
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = os.path.join(script_dir, db_name)
-        self.connection = sqlite3.connect(self.db_path)
-        self.cursor = self.connection.cursor()
-        self.create_tables()
-        print(f"[DB] База данных: {self.db_path}")
-    
-    def create_tables(self):
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mood_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                cat_type TEXT NOT NULL,
-                score INTEGER NOT NULL,
-                answers TEXT
-            )
-        ''')
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tarot_readings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                card1_name TEXT,
-                card2_name TEXT,
-                card3_name TEXT,
-                prediction_love TEXT,
-                prediction_career TEXT,
-                prediction_finance TEXT
-            )
-        ''')
-        
-        self.connection.commit()
-        print("[DB] Таблицы созданы")
-    
-    def save_mood_result(self, cat_type, score, answers):
-        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        answers_str = ",".join(map(str, answers))
-        
-        self.cursor.execute('''
-            INSERT INTO mood_results (date, cat_type, score, answers)
-            VALUES (?, ?, ?, ?)
-        ''', (date, cat_type, score, answers_str))
-        
-        self.connection.commit()
-        print(f"[DB] Сохранён результат теста: {cat_type}")
-    
-    def save_tarot_reading(self, cards, prediction):
-        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        card_names = [card.name if card else "" for card in cards]
-        while len(card_names) < 3:
-            card_names.append("")
-        
-        self.cursor.execute('''
-            INSERT INTO tarot_readings 
-            (date, card1_name, card2_name, card3_name, 
-             prediction_love, prediction_career, prediction_finance)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            date, 
-            card_names[0], card_names[1], card_names[2],
-            prediction.get('love', ''),
-            prediction.get('career', ''),
-            prediction.get('finance', '')
-        ))
-        
-        self.connection.commit()
-        print(f"[DB] Сохранён расклад таро")
-    
-    def get_mood_history(self, limit=20):
-        self.cursor.execute('''
-            SELECT date, cat_type, score FROM mood_results
-            ORDER BY date DESC LIMIT ?
-        ''', (limit,))
-        return self.cursor.fetchall()
-    
-    def get_tarot_history(self, limit=20):
-        self.cursor.execute('''
-            SELECT date, card1_name, card2_name, card3_name, prediction_love, prediction_career, prediction_finance FROM tarot_readings
-            ORDER BY date DESC LIMIT ?
-        ''', (limit,))
-        return self.cursor.fetchall()
-    
-    def get_mood_statistics(self):
-        self.cursor.execute('''
-            SELECT cat_type, COUNT(*) as count FROM mood_results
-            GROUP BY cat_type ORDER BY count DESC
-        ''')
-        return self.cursor.fetchall()
-    
-    def get_mood_trend(self, days=14):
-        """
-        Получает тренд настроения за последние N дней.
-        Возвращает список кортежей (дата, средний_балл, количество_тестов)
-        """
-        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        
-        self.cursor.execute('''
-            SELECT 
-                DATE(date) as day,
-                AVG(score) as avg_score,
-                COUNT(*) as count
-            FROM mood_results
-            WHERE DATE(date) >= ?
-            GROUP BY DATE(date)
-            ORDER BY day ASC
-        ''', (start_date,))
-        
-        return self.cursor.fetchall()
-    
-    def get_mood_by_weekday(self):
-        """
-        Получает среднее настроение по дням недели.
-        0 = Воскресенье, 1 = Понедельник, ... 6 = Суббота (SQLite strftime %w)
-        """
-        self.cursor.execute('''
-            SELECT 
-                CAST(strftime('%w', date) AS INTEGER) as weekday,
-                AVG(score) as avg_score,
-                COUNT(*) as count
-            FROM mood_results
-            GROUP BY weekday
-            ORDER BY weekday
-        ''')
-        return self.cursor.fetchall()
-    
-    def close(self):
-        self.connection.close()
-        print("[DB] Соединение закрыто")
+STARTUP_TARGET_MS = 150
 
 
 # ============================================================
-# ДАННЫЕ ДЛЯ ТЕСТА НАСТРОЕНИЯ
+# КАРТИНКИ ДЛЯ TKINTER
 # ============================================================
 
-QUESTIONS = [
-    {
-        "text": "Как ты себя чувствуешь прямо сейчас?",
-        "options": [
-            {"text": "Хочу спать и ничего не делать", "score": 1},
-            {"text": "Немного устал(а)", "score": 2},
-            {"text": "Нормально, обычный день", "score": 3},
-            {"text": "Довольно бодро!", "score": 4},
-            {"text": "Полон(на) энергии! 🔥", "score": 5}
-        ]
-    },
-    {
-        "text": "Что бы ты хотел(а) сделать прямо сейчас?",
-        "options": [
-            {"text": "Свернуться клубочком и уснуть", "score": 1},
-            {"text": "Посидеть в тишине", "score": 2},
-            {"text": "Посмотреть что-нибудь", "score": 3},
-            {"text": "Пообщаться с друзьями", "score": 4},
-            {"text": "Активно провести время!", "score": 5}
-        ]
-    },
-    {
-        "text": "Как ты относишься к сегодняшнему дню?",
-        "options": [
-            {"text": "Хочу, чтобы он скорее закончился", "score": 1},
-            {"text": "Как-то не очень...", "score": 2},
-            {"text": "Обычный день", "score": 3},
-            {"text": "Хороший день!", "score": 4},
-            {"text": "Отличный день! Всё супер!", "score": 5}
-        ]
-    },
-    {
-        "text": "Выбери погоду, которая тебе ближе сейчас:",
-        "options": [
-            {"text": "🌧️ Дождь за окном", "score": 1},
-            {"text": "☁️ Пасмурно", "score": 2},
-            {"text": "⛅ Переменная облачность", "score": 3},
-            {"text": "🌤️ Солнце выглядывает", "score": 4},
-            {"text": "☀️ Яркое солнце!", "score": 5}
-        ]
-    },
-    {
-        "text": "Если бы ты был(а) котом, что бы делал(а)?",
-        "options": [
-            {"text": "Спал(а) весь день", "score": 1},
-            {"text": "Лежал(а) и смотрел(а) в окно", "score": 2},
-            {"text": "Гулял(а) по дому", "score": 3},
-            {"text": "Играл(а) с игрушками", "score": 4},
-            {"text": "Носился(ась) как сумасшедший!", "score": 5}
-        ]
-    }
-]
-
-CAT_TYPES = [
-    {
-        "name": "Сонный котик 😴",
-        "description": "Сегодня тебе нужен отдых. Позволь себе расслабиться, "
-                       "как кот на мягком пледе. Не требуй от себя слишком многого.",
-        "min_score": 5, "max_score": 9,
-        "color": "#9E9E9E", "image_folder": "sleepy"
-    },
-    {
-        "name": "Задумчивый кот 🐱",
-        "description": "Ты сегодня в созерцательном настроении. Хорошее время "
-                       "для размышлений и планирования.",
-        "min_score": 10, "max_score": 14,
-        "color": "#78909C", "image_folder": "thoughtful"
-    },
-    {
-        "name": "Довольный котик 😺",
-        "description": "У тебя хорошее, стабильное настроение! Как кот, который "
-                       "поел и теперь доволен жизнью. Мур-мур!",
-        "min_score": 15, "max_score": 19,
-        "color": "#81C784", "image_folder": "happy"
-    },
-    {
-        "name": "Игривый кот 😸",
-        "description": "Ты полон энергии и готов к приключениям! Отличный день "
-                       "для активностей и новых начинаний!",
-        "min_score": 20, "max_score": 22,
-        "color": "#FFB74D", "image_folder": "playful"
-    },
-    {
-        "name": "Кот-ураган 🙀",
-        "description": "Энергия бьёт через край! Ты как кот в 3 часа ночи — "
-                       "готов свернуть горы и носиться по потолку!",
-        "min_score": 23, "max_score": 25,
-        "color": "#FF7043", "image_folder": "crazy"
-    }
-]
-
-IMAGES_FOLDER = "images"
-
-# Названия дней недели (индекс 0 = Воскресенье в SQLite)
-WEEKDAYS = ["Вс", "Пн", "Вт", "Ср", "Чт", "Пт", "Сб"]
+def to_photo_image(image):
+    from PIL import ImageTk
+    return ImageTk.PhotoImage(image)
+
+
+def load_local_image(image_path, max_width=250, max_height=250):
+    try:
+        image = image_cache.get(image_path, max_width, max_height)
+        return to_photo_image(image)
+    except Exception as e:
+        print(f"[IMG] Ошибка: {e}")
+        return None
 
 
 # ============================================================
-# ФУНКЦИИ ДЛЯ РАБОТЫ С КАРТИНКАМИ
+# ВИДЖЕТЫ
 # ============================================================
 
-def get_random_local_image(folder_name):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    folder_path = os.path.join(script_dir, IMAGES_FOLDER, folder_name)
+def format_history_date(date):
+    try:
+        dt = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
+        return dt.strftime("%d.%m.%Y %H:%M")
+    except (TypeError, ValueError):
+        return date
+
+
+class VirtualList:
+    """
+    Виртуальный список для длинной истории.
+    Держит только visible_rows переиспользуемых строк-виджетов и при прокрутке
+    перезаполняет их данными. Данные подгружаются страницами по ключу (ts, id)
+    и хранятся в HistoryPages: в памяти лишь несколько страниц вокруг видимых строк.
+    fetch_page(before, limit) должна возвращать строки, начинающиеся с (ts, id).
+    make_row(parent) создаёт виджеты одной строки, fill_row(widgets, row) заполняет их.
+    """
     
-    if not os.path.exists(folder_path):
-        return None
+    def __init__(self, parent, fetch_page, make_row, fill_row, bg,
+                 visible_rows=6, page_size=50, first_page=None):
+        self.fill_row = fill_row
+        self.visible_rows = visible_rows
+        self.rows = HistoryPages(fetch_page, page_size)
+        self.first = 0
+        
+        self.frame = tk.Frame(parent, bg=bg)
+        self.body = tk.Frame(self.frame, bg=bg)
+        self.body.columnconfigure(0, weight=1)
+        self.scrollbar = tk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        
+        self.pool = []
+        for i in range(visible_rows):
+            widgets = make_row(self.body)
+            widgets["frame"].grid(row=i, column=0, sticky="ew", pady=3, padx=10)
+            self.bind_wheel(widgets["frame"])
+            self.pool.append(widgets)
+        self.bind_wheel(self.body)
+        
+        self.body.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.update(first_page)
     
-    image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.jfif')
-    images = [f for f in os.listdir(folder_path) if f.lower().endswith(image_extensions)]
+    def update(self, first_page=None):
+        """Перечитывает список с начала, виджеты строк остаются прежними."""
+        self.rows.reset(first_page)
+        self.first = 0
+        self.scroll_to(0)
     
-    if not images:
-        return None
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
     
-    return os.path.join(folder_path, random.choice(images))
-
-
-def load_local_image(image_path, max_width=250, max_height=250):
-    try:
-        image = Image.open(image_path)
-        
-        if image.mode in ('RGBA', 'P', 'LA'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            if 'A' in image.mode:
-                background.paste(image, mask=image.split()[-1])
+    def pack_forget(self):
+        self.frame.pack_forget()
+    
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        widget.bind("<Button-4>", lambda e: self.scroll_by(-1))
+        widget.bind("<Button-5>", lambda e: self.scroll_by(1))
+        for child in widget.winfo_children():
+            self.bind_wheel(child)
+    
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_by(int(args[1]) * step)
+    
+    def scroll_by(self, delta):
+        self.scroll_to(self.first + delta)
+    
+    def scroll_to(self, first):
+        # Подгружаем следующую страницу заранее, пока до конца больше экрана
+        while self.rows.has_more and first + 2 * self.visible_rows > len(self.rows):
+            self.rows.load_more()
+        self.first = max(0, min(first, len(self.rows) - self.visible_rows))
+        self.render()
+    
+    def render(self):
+        for i, widgets in enumerate(self.pool):
+            row = self.rows.row(self.first + i) if self.first + i < len(self.rows) else None
+            if row is not None:
+                self.fill_row(widgets, row)
+                widgets["frame"].grid()
             else:
-                background.paste(image)
-            image = background
-        elif image.mode != 'RGB':
-            image = image.convert('RGB')
+                widgets["frame"].grid_remove()
         
-        width, height = image.size
-        ratio = min(max_width / width, max_height / height)
-        
-        if ratio < 1:
-            new_width = int(width * ratio)
-            new_height = int(height * ratio)
-            image = image.resize((new_width, new_height), Image.LANCZOS)
-        
-        return ImageTk.PhotoImage(image)
-    except Exception as e:
-        print(f"[IMG] Ошибка: {e}")
-        return None
+        total = max(len(self.rows), 1)
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible_rows) / total))
 
 
-# ============================================================
-# КЛАССЫ ДЛЯ ТАРО
-# ============================================================
+def score_color(avg_score):
+    if avg_score >= 20:
+        return "#81C784"  # зелёный
+    if avg_score >= 15:
+        return "#FFB74D"  # оранжевый
+    return "#9E9E9E"  # серый
 
-class TarotCard:
-    def __init__(self, name, value, image_path):
-        self.name = name
-        self.value = value
-        self.image_path = image_path
+
+def bucket_trend(trend_data, max_points):
+    """
+    Сжимает ряд (дата, средний_балл, количество) до max_points точек.
+    Соседние дни объединяются в корзины: средний балл взвешивается по числу
+    тестов, min/max - разброс средних по дням внутри корзины.
+    Возвращает список (дата_начала, средний_балл, min, max).
+    """
+    size = max(1, -(-len(trend_data) // max_points))
+    buckets = []
+    for start in range(0, len(trend_data), size):
+        chunk = trend_data[start:start + size]
+        count = sum(c for _, _, c in chunk)
+        avg = sum(a * c for _, a, c in chunk) / count if count else 0
+        scores = [a for _, a, _ in chunk]
+        buckets.append((chunk[0][0], avg, min(scores), max(scores)))
+    return buckets
 
 
-class Deck:
-    BASEPATH = 'images/tarot/png/'
+class TrendChart:
+    """
+    График тренда на одном Canvas. Оси рисуются один раз, линия - одна
+    ломаная, точки и подписи берутся из пула элементов и только двигаются
+    и перекрашиваются при новых данных. Длинные ряды сжимаются bucket_trend.
+    """
     
-    def __init__(self):
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        markup_path = os.path.join(script_dir, 'markup.json')
+    MIN_SCORE = 5
+    MAX_SCORE = 25
+    
+    def __init__(self, parent, bg, line_color, text_color, axis_color,
+                 width=700, height=250, max_points=30):
+        self.width = width
+        self.padding = 50
+        self.bottom = 200
+        self.graph_width = width - 2 * self.padding
+        self.graph_height = self.bottom - self.padding
+        self.max_points = max_points
+        self.text_color = text_color
+        self.axis_color = axis_color
+        
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg=bg, highlightthickness=0)
+        
+        # Оси и подписи баллов
+        self.canvas.create_line(self.padding, self.bottom, width - self.padding, self.bottom,
+                                fill=axis_color, width=2)
+        self.canvas.create_line(self.padding, self.bottom, self.padding, 30, fill=axis_color, width=2)
+        for score in [5, 10, 15, 20, 25]:
+            y = self.y_for(score)
+            self.canvas.create_text(self.padding - 20, y, text=str(score), fill=axis_color, font=("Arial", 9))
+            self.canvas.create_line(self.padding - 5, y, self.padding, y, fill=axis_color)
+        
+        # Полоса min/max для сжатых рядов и сама линия тренда
+        self.band = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, fill="#2a3a5e", outline="", state="hidden")
+        self.line = self.canvas.create_line(0, 0, 0, 0, fill=line_color, width=3, state="hidden")
+        
+        self.points = []
+        self.date_labels = []
+    
+    def y_for(self, score):
+        return self.bottom - ((score - self.MIN_SCORE) / (self.MAX_SCORE - self.MIN_SCORE)) * self.graph_height
+    
+    def set_data(self, trend_data):
+        buckets = bucket_trend(trend_data, self.max_points)
+        num_points = len(buckets)
+        bucketed = num_points < len(trend_data)
         
-        with open(markup_path, 'r') as markup_file:
-            markup = json.load(markup_file)
+        xs = [self.padding + (i / max(num_points - 1, 1)) * self.graph_width for i in range(num_points)]
+        ys = [self.y_for(avg) for _, avg, _, _ in buckets]
         
-        self.cards = []
-        for i in markup:
-            card_path = os.path.join(script_dir, self.BASEPATH + i['name'] + '.png')
-            self.cards.append(TarotCard(i['name'], i['id'], card_path))
+        if num_points > 1:
+            self.canvas.coords(self.line, *[c for xy in zip(xs, ys) for c in xy])
+            self.canvas.itemconfig(self.line, state="normal")
+        else:
+            self.canvas.itemconfig(self.line, state="hidden")
+        
+        if bucketed and num_points > 1:
+            upper = [c for x, (_, _, _, hi) in zip(xs, buckets) for c in (x, self.y_for(hi))]
+            lower = [c for x, (_, _, lo, _) in reversed(list(zip(xs, buckets))) for c in (x, self.y_for(lo))]
+            self.canvas.coords(self.band, *upper, *lower)
+            self.canvas.itemconfig(self.band, state="normal")
+        else:
+            self.canvas.itemconfig(self.band, state="hidden")
+        
+        while len(self.points) < num_points:
+            oval = self.canvas.create_oval(0, 0, 0, 0, outline=self.text_color, width=2)
+            value = self.canvas.create_text(0, 0, fill=self.text_color, font=("Arial", 8, "bold"))
+            self.points.append((oval, value))
+        
+        for i, (oval, value) in enumerate(self.points):
+            if i >= num_points:
+                self.canvas.itemconfig(oval, state="hidden")
+                self.canvas.itemconfig(value, state="hidden")
+                continue
+            x, y, avg_score = xs[i], ys[i], buckets[i][1]
+            radius = 4 if bucketed else 6
+            self.canvas.coords(oval, x - radius, y - radius, x + radius, y + radius)
+            self.canvas.itemconfig(oval, fill=score_color(avg_score), state="normal")
+            self.canvas.coords(value, x, y - 15)
+            self.canvas.itemconfig(value, text=f"{avg_score:.0f}", state="hidden" if bucketed else "normal")
+        
+        # Подписи дат: не больше 7 штук
+        step = 1 if num_points <= 7 else -(-num_points // 7)
+        label_indexes = list(range(0, num_points, step))
+        while len(self.date_labels) < len(label_indexes):
+            self.date_labels.append(self.canvas.create_text(0, 0, fill=self.axis_color, font=("Arial", 8)))
+        
+        for i, label in enumerate(self.date_labels):
+            if i >= len(label_indexes):
+                self.canvas.itemconfig(label, state="hidden")
+                continue
+            index = label_indexes[i]
+            date = buckets[index][0]
+            try:
+                date_str = datetime.strptime(date, "%Y-%m-%d").strftime("%d.%m")
+            except (TypeError, ValueError):
+                date_str = date[-5:]
+            self.canvas.coords(label, xs[index], 215)
+            self.canvas.itemconfig(label, text=date_str, state="normal")
+
+
+class WeekdayBars:
+    """Столбики среднего настроения по дням недели на одном Canvas."""
+    
+    SLOT_WIDTH = 46
+    BAR_AREA = 70
     
-    def pull_card(self):
-        card = random.choice(self.cards)
-        self.cards.remove(card)
-        return card
+    def __init__(self, parent, bg, text_color, label_color):
+        self.canvas = tk.Canvas(parent, width=self.SLOT_WIDTH * len(WEEKDAYS), height=self.BAR_AREA + 20,
+                                bg=bg, highlightthickness=0)
+        self.slots = []
+        for i in range(len(WEEKDAYS)):
+            bar = self.canvas.create_rectangle(0, 0, 0, 0, outline="", state="hidden")
+            value = self.canvas.create_text(0, 0, fill=text_color, font=("Arial", 8), state="hidden")
+            day = self.canvas.create_text(0, 0, fill=label_color, font=("Arial", 9), state="hidden")
+            self.slots.append((bar, value, day))
     
-    def reset(self):
-        self.__init__()
+    def set_data(self, weekday_data):
+        offset = (len(WEEKDAYS) - len(weekday_data)) * self.SLOT_WIDTH / 2
+        for i, (bar, value, day) in enumerate(self.slots):
+            if i >= len(weekday_data):
+                for item in (bar, value, day):
+                    self.canvas.itemconfig(item, state="hidden")
+                continue
+            weekday, avg_score, count = weekday_data[i]
+            center = offset + i * self.SLOT_WIDTH + self.SLOT_WIDTH / 2
+            bar_height = int((avg_score / 25) * 60)
+            
+            self.canvas.coords(bar, center - 10, self.BAR_AREA - bar_height, center + 10, self.BAR_AREA)
+            self.canvas.itemconfig(bar, fill=score_color(avg_score), state="normal")
+            self.canvas.coords(value, center, self.BAR_AREA - bar_height - 10)
+            self.canvas.itemconfig(value, text=f"{avg_score:.0f}", state="normal")
+            self.canvas.coords(day, center, self.BAR_AREA + 10)
+            self.canvas.itemconfig(day, text=WEEKDAYS[weekday], state="normal")
 
 
-def translate_prediction(text):
-    import requests
-    from dotenv import load_dotenv
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
 
-    print(text)
-    
-    load_dotenv()
-    API_KEY = os.getenv("API_KEY")
-    folderId = os.getenv("folderId")
 
-    r = requests.post("https://translate.api.cloud.yandex.net/translate/v2/translate",
-        headers={
-            "Authorization": f"Api-Key {API_KEY}",
-            "Content-Type": "application/json"    
-        },
-        json={
-            "folderId": folderId,
-            "texts": [text],
-            "targetLanguageCode": "ru"
-        },
-        timeout=15,
-        verify=False
-    )
+class ScreenManager:
+    """
+    Кэш экранов. Каждый экран строится один раз в своём Frame функцией build,
+    при переходе текущий Frame скрывается, а нужный показывается.
+    Если у экрана есть update, он вызывается при каждом показе и обновляет
+    данные в уже созданных виджетах вместо пересоздания всего дерева.
+    """
+    
+    def __init__(self, parent, bg):
+        self.parent = parent
+        self.bg = bg
+        self.screens = {}
+        self.current = None
+        self.stats = {"builds": 0, "widgets_built": 0, "shows": 0, "total_time": 0.0, "max_time": 0.0}
     
-    return r.json()['translations'][0]['text']
+    def register(self, name, build, update=None):
+        self.screens[name] = {"build": build, "update": update, "frame": None}
+    
+    def show(self, name):
+        started = time.perf_counter()
+        screen = self.screens[name]
+        
+        if screen["frame"] is None:
+            screen["frame"] = tk.Frame(self.parent, bg=self.bg)
+            with metrics.timed(f"screen.build.{name}"):
+                screen["build"](screen["frame"])
+            self.stats["builds"] += 1
+            self.stats["widgets_built"] += count_widgets(screen["frame"])
+        
+        if screen["update"] is not None:
+            screen["update"]()
+        
+        if self.current != name:
+            if self.current is not None:
+                self.screens[self.current]["frame"].pack_forget()
+            screen["frame"].pack(fill="both", expand=True)
+            self.current = name
+        
+        elapsed = time.perf_counter() - started
+        metrics.observe(f"screen.{name}", elapsed)
+        self.stats["shows"] += 1
+        self.stats["total_time"] += elapsed
+        self.stats["max_time"] = max(self.stats["max_time"], elapsed)
+    
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["avg_time"] = stats["total_time"] / stats["shows"] if stats["shows"] else 0.0
+        return stats
 
 
-def get_prediction(cards):
-    import requests
-    import base64
-    
-    print(cards[0].value)
+# ============================================================
+# СТОРОЖ ЗАВИСАНИЙ
+# ============================================================
 
-    try:
-        auth = "Basic " + base64.b64encode(
-            "649129:12788919b4c04b4ce2ddd4c31b36260a2aecf2d9".encode()
-        ).decode()
-        
-        r = requests.post(
-            "https://json.astrologyapi.com/v1/tarot_predictions",
-            headers={
-                'Authorization': auth,
-                'Content-Type': 'application/json'
-            },
-            params={
-                'love': cards[0].value,
-                'career': cards[1].value,
-                'finance': cards[2].value
-            },
-            timeout=15,
-            verify=False
-        )
-        return r.json()
-    except Exception as e:
-        print(f"[API] Ошибка: {e}")
-        return {
-            'love': 'Не удалось получить предсказание. Попробуйте позже.',
-            'career': 'Не удалось получить предсказание. Попробуйте позже.',
-            'finance': 'Не удалось получить предсказание. Попробуйте позже.'
-        }
+class StallWatchdog:
+    """
+    Ловит моменты, когда главный поток Tkinter занят и окно не отвечает.
+    Главный поток каждые interval_ms отмечается через window.after, фоновый
+    поток следит за отметкой: если её нет дольше threshold_ms, он снимает стек
+    главного потока (sys._current_frames). Когда цикл событий оживает,
+    длительность зависания попадает в гистограмму текущего экрана.
+    Включение: флаг --watchdog или ORACLE_WATCHDOG=1.
+    """
+    
+    STACK_DEPTH = 8
+    
+    def __init__(self, window, current_screen, interval_ms=20, threshold_ms=50):
+        self.window = window
+        self.current_screen = current_screen
+        self.interval_ms = interval_ms
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.main_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self.stall_stack = None
+        self.histograms = {}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+    
+    def start(self):
+        self.last_beat = time.perf_counter()
+        self.window.after(self.interval_ms, self.beat)
+        self.thread.start()
+    
+    def beat(self):
+        """Отметка из главного потока."""
+        now = time.perf_counter()
+        stall = now - self.last_beat - self.interval
+        if stall > self.threshold:
+            self.record(stall)
+        self.last_beat = now
+        if not self.stop_event.is_set():
+            self.window.after(self.interval_ms, self.beat)
+    
+    def watch(self):
+        """Фоновый поток: снимает стек, пока главный поток ещё занят."""
+        reported_beat = None
+        while not self.stop_event.wait(self.interval / 2):
+            beat = self.last_beat
+            if beat == reported_beat or time.perf_counter() - beat - self.interval <= self.threshold:
+                continue
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is not None:
+                self.stall_stack = "".join(traceback.format_stack(frame, limit=self.STACK_DEPTH))
+            reported_beat = beat
+    
+    def record(self, stall):
+        screen = self.current_screen() or "-"
+        self.histograms.setdefault(screen, Histogram()).observe(stall)
+        metrics.observe(f"ui.stall.{screen}", stall)
+        
+        print(f"[STALL] Экран {screen}: окно не отвечало {stall * 1000:.0f} мс")
+        stack, self.stall_stack = self.stall_stack, None
+        if stack:
+            print(stack, end="")
+        else:
+            print("[STALL] Стек снять не успели: зависание закончилось раньше проверки")
+    
+    def stop(self):
+        self.stop_event.set()
+        for screen, histogram in sorted(self.histograms.items()):
+            summary = histogram.summary()
+            print(f"[STALL] {screen}: {summary['count']} зависаний, p50 {summary['p50'] * 1000:.0f} мс, "
+                  f"p95 {summary['p95'] * 1000:.0f} мс, max {summary['max'] * 1000:.0f} мс")
 
 
 # ============================================================
@@ -417,49 +457,82 @@ class MainApp:
     BUTTON_COLOR = "#16213e"
     TEXT_COLOR = "#ffffff"
     GRAY_COLOR = "#a0a0a0"
+    POLL_INTERVAL_MS = 100
+    PREFETCH_DEPTH = 1
+    DIARY_PAGE_SIZE = 50
+    TREND_RANGES = (14, 90, 365)
     
-    def __init__(self):
+    def __init__(self, profile_startup=False, watchdog=False):
+        self.profile_startup = profile_startup
         self.window = tk.Tk()
         self.window.title("🐱 Котогадалка")
         self.window.geometry("800x600")
         self.window.configure(bg=self.BG_COLOR)
         self.window.resizable(False, False)
+        mark_startup("окно Tk")
         
-        self.db = Database()
+        # База откроется при первом экране, которому она нужна
+        self.engine = OracleEngine()
         
         self.main_frame = tk.Frame(self.window, bg=self.BG_COLOR)
         self.main_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
-        self.current_question = 0
-        self.total_score = 0
-        self.answers = []
+        self.quiz = MoodQuiz()
+        self.cat_type = CAT_TYPES[0]
+        self.trend_days = self.TREND_RANGES[0]
         
         self.deck = None
         self.cards_for_prediction = []
         self.prediction = {}
+        self.prediction_future = None
+        self.prefetcher = None
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="oracle")
+        
+        self.screens = ScreenManager(self.main_frame, bg=self.BG_COLOR)
+        self.screens.register("menu", self.build_main_menu)
+        self.screens.register("mood_question", self.build_mood_question, self.update_mood_question)
+        self.screens.register("mood_result", self.build_mood_result, self.update_mood_result)
+        self.screens.register("trends", self.build_trends, self.update_trends)
+        self.screens.register("tarot", self.build_tarot_start)
+        self.screens.register("tarot_spread", self.build_tarot_spread, self.update_tarot_spread)
+        self.screens.register("diary", self.build_diary, self.update_diary)
+        self.screens.register("statistics", self.build_statistics, self.update_statistics)
         
         self.show_main_menu()
+        mark_startup("главное меню")
+        
+        self.watchdog = StallWatchdog(self.window, lambda: self.screens.current) if watchdog else None
     
-    def clear_screen(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
+    def show_screen(self, name, keep_prefetch=False):
+        """Уходит с текущего экрана (отменяя фоновые запросы таро) и показывает name."""
+        self.cancel_prediction()
+        if not keep_prefetch and self.prefetcher is not None:
+            self.prefetcher.cancel()
+            self.prefetcher = None
+        self.screens.show(name)
+    
+    def make_back_button(self, parent, pady):
+        tk.Button(parent, text="🏠 Вернуться в меню", font=("Arial", 12),
+                  fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, width=20, height=2,
+                  border=0, cursor="hand2", command=self.show_main_menu).pack(pady=pady)
     
     # ==================== ГЛАВНОЕ МЕНЮ ====================
     
     def show_main_menu(self):
-        self.clear_screen()
-        
+        self.show_screen("menu")
+    
+    def build_main_menu(self, frame):
         tk.Label(
-            self.main_frame, text="🐱 Котогадалка 🐱",
+            frame, text="🐱 Котогадалка 🐱",
             font=("Arial", 32, "bold"), fg=self.ACCENT_COLOR, bg=self.BG_COLOR
         ).pack(pady=20)
         
         tk.Label(
-            self.main_frame, text="Выбери, что хочешь сделать:",
+            frame, text="Выбери, что хочешь сделать:",
             font=("Arial", 14), fg=self.TEXT_COLOR, bg=self.BG_COLOR
         ).pack(pady=5)
         
-        buttons_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        buttons_frame = tk.Frame(frame, bg=self.BG_COLOR)
         buttons_frame.pack(pady=20)
         
         buttons = [
@@ -480,96 +553,107 @@ class MainApp:
     # ==================== ТЕСТ НАСТРОЕНИЯ ====================
     
     def start_mood_test(self):
-        self.current_question = 0
-        self.total_score = 0
-        self.answers = []
+        self.quiz = MoodQuiz()
         self.show_mood_question()
     
     def show_mood_question(self):
-        self.clear_screen()
-        question_data = QUESTIONS[self.current_question]
-        
-        progress_text = f"Вопрос {self.current_question + 1} из {len(QUESTIONS)}"
-        tk.Label(self.main_frame, text=progress_text, font=("Arial", 12),
-                 fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack(pady=10)
+        self.show_screen("mood_question")
+    
+    def build_mood_question(self, frame):
+        self.progress_label = tk.Label(frame, font=("Arial", 12), fg=self.GRAY_COLOR, bg=self.BG_COLOR)
+        self.progress_label.pack(pady=10)
         
-        progress_frame = tk.Frame(self.main_frame, bg="#333333", height=10)
+        progress_frame = tk.Frame(frame, bg="#333333", height=10)
         progress_frame.pack(fill="x", pady=5)
+        self.progress_fill = tk.Frame(progress_frame, bg=self.ACCENT_COLOR, height=10)
+        self.progress_fill.place(x=0, y=0)
         
-        progress_percent = (self.current_question + 1) / len(QUESTIONS)
-        progress_fill = tk.Frame(progress_frame, bg=self.ACCENT_COLOR, height=10,
-                                  width=int(760 * progress_percent))
-        progress_fill.place(x=0, y=0)
-        
-        tk.Label(self.main_frame, text=question_data["text"], font=("Arial", 18),
-                 fg=self.TEXT_COLOR, bg=self.BG_COLOR, wraplength=600).pack(pady=30)
+        self.question_label = tk.Label(frame, font=("Arial", 18), fg=self.TEXT_COLOR,
+                                       bg=self.BG_COLOR, wraplength=600)
+        self.question_label.pack(pady=30)
         
-        for option in question_data["options"]:
+        self.option_buttons = []
+        for i in range(max(len(question["options"]) for question in QUESTIONS)):
             btn = tk.Button(
-                self.main_frame, text=option["text"], font=("Arial", 12),
+                frame, font=("Arial", 12),
                 fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR,
                 activebackground=self.ACCENT_COLOR, width=45, height=2,
                 border=0, cursor="hand2",
-                command=lambda s=option["score"]: self.answer_mood_question(s)
+                command=lambda i=i: self.answer_mood_question(self.quiz.question()["options"][i]["score"])
             )
-            btn.pack(pady=5)
             btn.bind('<Enter>', lambda e, b=btn: b.configure(bg=self.ACCENT_COLOR))
             btn.bind('<Leave>', lambda e, b=btn: b.configure(bg=self.BUTTON_COLOR))
+            self.option_buttons.append(btn)
+    
+    def update_mood_question(self):
+        question_data = self.quiz.question()
+        current_question = self.quiz.current_question
+        
+        self.progress_label.config(text=f"Вопрос {current_question + 1} из {len(QUESTIONS)}")
+        progress_percent = (current_question + 1) / len(QUESTIONS)
+        self.progress_fill.config(width=int(760 * progress_percent))
+        self.question_label.config(text=question_data["text"])
+        
+        options = question_data["options"]
+        for i, btn in enumerate(self.option_buttons):
+            btn.pack_forget()
+            if i < len(options):
+                btn.config(text=options[i]["text"], bg=self.BUTTON_COLOR)
+                btn.pack(pady=5)
     
     def answer_mood_question(self, score):
-        self.total_score += score
-        self.answers.append(score)
-        self.current_question += 1
+        self.quiz.answer(score)
         
-        if self.current_question < len(QUESTIONS):
+        if not self.quiz.finished:
             self.show_mood_question()
         else:
             self.show_mood_result()
     
-    def get_cat_type(self):
-        for cat_type in CAT_TYPES:
-            if cat_type["min_score"] <= self.total_score <= cat_type["max_score"]:
-                return cat_type
-        return CAT_TYPES[0]
-    
     def show_mood_result(self):
-        self.clear_screen()
-        cat_type = self.get_cat_type()
-        
-        self.db.save_mood_result(cat_type["name"], self.total_score, self.answers)
-        
-        tk.Label(self.main_frame, text="✨ Твой результат ✨", font=("Arial", 16),
+        self.cat_type, _ = self.engine.submit_mood_test(self.quiz.answers)
+        self.show_screen("mood_result")
+    
+    def build_mood_result(self, frame):
+        tk.Label(frame, text="✨ Твой результат ✨", font=("Arial", 16),
                  fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack(pady=10)
         
-        tk.Label(self.main_frame, text=cat_type["name"], font=("Arial", 24, "bold"),
-                 fg=cat_type["color"], bg=self.BG_COLOR).pack(pady=5)
+        self.result_name_label = tk.Label(frame, font=("Arial", 24, "bold"), bg=self.BG_COLOR)
+        self.result_name_label.pack(pady=5)
         
-        tk.Label(self.main_frame, text=f"Баллы: {self.total_score} из {len(QUESTIONS) * 5}",
-                 font=("Arial", 11), fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack(pady=5)
+        self.result_score_label = tk.Label(frame, font=("Arial", 11), fg=self.GRAY_COLOR, bg=self.BG_COLOR)
+        self.result_score_label.pack(pady=5)
         
-        image_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        image_frame = tk.Frame(frame, bg=self.BG_COLOR)
         image_frame.pack(pady=10)
         self.image_label = tk.Label(image_frame, bg=self.BG_COLOR)
         self.image_label.pack()
-        self.load_cat_image(cat_type["image_folder"])
         
-        desc_frame = tk.Frame(self.main_frame, bg=cat_type["color"], padx=3, pady=3)
-        desc_frame.pack(pady=10, padx=20, fill="x")
-        desc_inner = tk.Frame(desc_frame, bg=self.BUTTON_COLOR)
+        self.result_desc_frame = tk.Frame(frame, padx=3, pady=3)
+        self.result_desc_frame.pack(pady=10, padx=20, fill="x")
+        desc_inner = tk.Frame(self.result_desc_frame, bg=self.BUTTON_COLOR)
         desc_inner.pack(fill="both", expand=True)
-        tk.Label(desc_inner, text=cat_type["description"], font=("Arial", 11),
-                 fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, wraplength=500,
-                 justify="center", padx=15, pady=10).pack()
+        self.result_desc_label = tk.Label(desc_inner, font=("Arial", 11),
+                                          fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, wraplength=500,
+                                          justify="center", padx=15, pady=10)
+        self.result_desc_label.pack()
         
-        buttons_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        buttons_frame = tk.Frame(frame, bg=self.BG_COLOR)
         buttons_frame.pack(pady=15)
         
-        for text, cmd in [("🔄 Другой котик", lambda: self.load_cat_image(cat_type["image_folder"])),
+        for text, cmd in [("🔄 Другой котик", lambda: self.load_cat_image(self.cat_type["image_folder"])),
                           ("🔁 Заново", self.start_mood_test), ("🏠 Меню", self.show_main_menu)]:
             tk.Button(buttons_frame, text=text, font=("Arial", 11), fg=self.TEXT_COLOR,
                       bg=self.BUTTON_COLOR, width=14, height=2, border=0,
                       cursor="hand2", command=cmd).pack(side="left", padx=5)
     
+    def update_mood_result(self):
+        cat_type = self.cat_type
+        self.result_name_label.config(text=cat_type["name"], fg=cat_type["color"])
+        self.result_score_label.config(text=f"Баллы: {self.quiz.total_score} из {len(QUESTIONS) * 5}")
+        self.result_desc_frame.config(bg=cat_type["color"])
+        self.result_desc_label.config(text=cat_type["description"])
+        self.load_cat_image(cat_type["image_folder"])
+    
     def load_cat_image(self, folder):
         image_path = get_random_local_image(folder)
         if image_path:
@@ -586,201 +670,133 @@ class MainApp:
     
     def show_trends(self):
         """Показывает график тренда настроения."""
-        self.clear_screen()
-        
-        tk.Label(self.main_frame, text="📈 Тренды настроения", font=("Arial", 24, "bold"),
+        self.show_screen("trends")
+    
+    def build_trends(self, frame):
+        tk.Label(frame, text="📈 Тренды настроения", font=("Arial", 24, "bold"),
                  fg=self.ACCENT_COLOR, bg=self.BG_COLOR).pack(pady=15)
         
-        # Получаем данные за последние 14 дней
-        trend_data = self.db.get_mood_trend(14)
-        weekday_data = self.db.get_mood_by_weekday()
+        content = tk.Frame(frame, bg=self.BG_COLOR)
+        content.pack()
+        
+        self.trends_empty_label = tk.Label(
+            content,
+            text="📊 Пока нет данных для анализа.\n\nПроходи тесты настроения каждый день,\nчтобы отслеживать тренды!",
+            font=("Arial", 14), fg=self.GRAY_COLOR, bg=self.BG_COLOR, justify="center")
+        
+        self.trends_area = tk.Frame(content, bg=self.BG_COLOR)
+        
+        self.trend_chart = TrendChart(self.trends_area, bg=self.BUTTON_COLOR, line_color=self.ACCENT_COLOR,
+                                      text_color=self.TEXT_COLOR, axis_color=self.GRAY_COLOR)
+        self.trend_chart.canvas.pack(pady=10)
+        
+        legend_frame = tk.Frame(self.trends_area, bg=self.BG_COLOR)
+        legend_frame.pack(pady=5)
+        self.trends_legend = tk.Label(legend_frame, font=("Arial", 10), fg=self.GRAY_COLOR, bg=self.BG_COLOR)
+        self.trends_legend.pack(side="left", padx=10)
+        
+        self.trend_range_buttons = {}
+        for days in self.TREND_RANGES:
+            btn = tk.Button(legend_frame, text=f"{days} дн.", font=("Arial", 9), fg=self.TEXT_COLOR,
+                            bg=self.BUTTON_COLOR, border=0, cursor="hand2", padx=6,
+                            command=lambda d=days: self.set_trend_range(d))
+            btn.pack(side="left", padx=2)
+            self.trend_range_buttons[days] = btn
+        
+        self.weekday_area = tk.Frame(self.trends_area, bg=self.BG_COLOR)
+        tk.Label(self.weekday_area, text="📆 Среднее настроение по дням недели:",
+                 font=("Arial", 12, "bold"), fg=self.TEXT_COLOR, bg=self.BG_COLOR).pack(pady=(15, 5))
+        self.weekday_bars = WeekdayBars(self.weekday_area, bg=self.BG_COLOR,
+                                        text_color=self.TEXT_COLOR, label_color=self.GRAY_COLOR)
+        self.weekday_bars.canvas.pack(pady=5)
+        
+        self.make_back_button(frame, pady=15)
+    
+    def set_trend_range(self, days):
+        self.trend_days = days
+        self.update_trends()
+    
+    def update_trends(self):
+        trend_data = self.engine.mood_trend(self.trend_days)
+        weekday_data = self.engine.mood_by_weekday()
         
         if not trend_data:
-            tk.Label(self.main_frame, 
-                     text="📊 Пока нет данных для анализа.\n\nПроходи тесты настроения каждый день,\nчтобы отслеживать тренды!",
-                     font=("Arial", 14), fg=self.GRAY_COLOR, bg=self.BG_COLOR,
-                     justify="center").pack(pady=50)
+            self.trends_area.pack_forget()
+            self.trends_empty_label.pack(pady=50)
+            return
+        
+        self.trends_empty_label.pack_forget()
+        self.trends_area.pack()
+        
+        self.trend_chart.set_data(trend_data)
+        
+        avg_total = sum(d[1] for d in trend_data) / len(trend_data)
+        self.trends_legend.config(text=f"📅 Последние {self.trend_days} дн. | Средний балл: {avg_total:.1f}")
+        for days, btn in self.trend_range_buttons.items():
+            btn.config(bg=self.ACCENT_COLOR if days == self.trend_days else self.BUTTON_COLOR)
+        
+        if weekday_data and len(weekday_data) >= 3:
+            self.weekday_bars.set_data(weekday_data)
+            self.weekday_area.pack()
         else:
-            # Создаём Canvas для графика
-            canvas = tk.Canvas(self.main_frame, width=700, height=250, 
-                               bg=self.BUTTON_COLOR, highlightthickness=0)
-            canvas.pack(pady=10)
-            
-            # Параметры графика
-            padding = 50
-            graph_width = 700 - 2 * padding
-            graph_height = 200 - padding
-            
-            # Мин/макс баллы
-            min_score = 5
-            max_score = 25
-            
-            # Рисуем оси
-            canvas.create_line(padding, 200, 700 - padding, 200, fill=self.GRAY_COLOR, width=2)
-            canvas.create_line(padding, 200, padding, 30, fill=self.GRAY_COLOR, width=2)
-            
-            # Подписи оси Y (баллы)
-            for score in [5, 10, 15, 20, 25]:
-                y = 200 - ((score - min_score) / (max_score - min_score)) * graph_height
-                canvas.create_text(padding - 20, y, text=str(score), fill=self.GRAY_COLOR, font=("Arial", 9))
-                canvas.create_line(padding - 5, y, padding, y, fill=self.GRAY_COLOR)
-            
-            # Рисуем точки и линии
-            points = []
-            num_points = len(trend_data)
-            
-            for i, (date, avg_score, count) in enumerate(trend_data):
-                x = padding + (i / max(num_points - 1, 1)) * graph_width
-                y = 200 - ((avg_score - min_score) / (max_score - min_score)) * graph_height
-                points.append((x, y))
-                
-                # Подпись даты
-                if num_points <= 7 or i % 2 == 0:
-                    try:
-                        dt = datetime.strptime(date, "%Y-%m-%d")
-                        date_str = dt.strftime("%d.%m")
-                    except:
-                        date_str = date[-5:]
-                    canvas.create_text(x, 215, text=date_str, fill=self.GRAY_COLOR, font=("Arial", 8))
-            
-            # Рисуем линию тренда
-            if len(points) > 1:
-                for i in range(len(points) - 1):
-                    x1, y1 = points[i]
-                    x2, y2 = points[i + 1]
-                    canvas.create_line(x1, y1, x2, y2, fill=self.ACCENT_COLOR, width=3)
-            
-            # Рисуем точки
-            for i, (x, y) in enumerate(points):
-                avg_score = trend_data[i][1]
-                if avg_score >= 20:
-                    color = "#81C784"  # зелёный
-                elif avg_score >= 15:
-                    color = "#FFB74D"  # оранжевый
-                else:
-                    color = "#9E9E9E"  # серый
-                
-                canvas.create_oval(x-6, y-6, x+6, y+6, fill=color, outline=self.TEXT_COLOR, width=2)
-                canvas.create_text(x, y-15, text=f"{avg_score:.0f}", fill=self.TEXT_COLOR, font=("Arial", 8, "bold"))
-            
-            # Легенда
-            avg_total = sum(d[1] for d in trend_data) / len(trend_data)
-            tk.Label(self.main_frame, 
-                     text=f"📅 Последние {len(trend_data)} дн. | Средний балл: {avg_total:.1f}",
-                     font=("Arial", 10), fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack(pady=5)
-            
-            # График по дням недели
-            if weekday_data and len(weekday_data) >= 3:
-                tk.Label(self.main_frame, text="📆 Среднее настроение по дням недели:",
-                         font=("Arial", 12, "bold"), fg=self.TEXT_COLOR, bg=self.BG_COLOR).pack(pady=(15, 5))
-                
-                weekday_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
-                weekday_frame.pack(pady=5)
-                
-                for weekday, avg_score, count in weekday_data:
-                    day_name = WEEKDAYS[weekday]
-                    
-                    if avg_score >= 20:
-                        bar_color = "#81C784"
-                    elif avg_score >= 15:
-                        bar_color = "#FFB74D"
-                    else:
-                        bar_color = "#9E9E9E"
-                    
-                    day_frame = tk.Frame(weekday_frame, bg=self.BG_COLOR)
-                    day_frame.pack(side="left", padx=8)
-                    
-                    bar_height = int((avg_score / 25) * 60)
-                    bar_canvas = tk.Canvas(day_frame, width=30, height=70, 
-                                           bg=self.BG_COLOR, highlightthickness=0)
-                    bar_canvas.pack()
-                    bar_canvas.create_rectangle(5, 70 - bar_height, 25, 70, fill=bar_color, outline="")
-                    bar_canvas.create_text(15, 70 - bar_height - 10, text=f"{avg_score:.0f}", 
-                                           fill=self.TEXT_COLOR, font=("Arial", 8))
-                    
-                    tk.Label(day_frame, text=day_name, font=("Arial", 9),
-                             fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack()
-        
-        # Кнопка назад
-        tk.Button(self.main_frame, text="🏠 Вернуться в меню", font=("Arial", 12),
-                  fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, width=20, height=2,
-                  border=0, cursor="hand2", command=self.show_main_menu).pack(pady=15)
+            self.weekday_area.pack_forget()
     
     # ==================== ТАРО ====================
     
     def start_tarot(self):
-        self.clear_screen()
-        self.deck = Deck()
-        
-        tk.Label(self.main_frame, text="🃏 Расклад Таро 🃏", font=("Arial", 24, "bold"),
+        self.show_screen("tarot")
+        # Лист атласа декодируется в фоне, пока пользователь не нажал "Вытянуть карты"
+        self.executor.submit(get_tarot_atlas)
+        self.deck = self.engine.new_deck()
+        self.prefetcher = SpreadPrefetcher(self.executor, self.deck, depth=self.PREFETCH_DEPTH)
+    
+    def build_tarot_start(self, frame):
+        tk.Label(frame, text="🃏 Расклад Таро 🃏", font=("Arial", 24, "bold"),
                  fg=self.ACCENT_COLOR, bg=self.BG_COLOR).pack(pady=20)
         
-        tk.Label(self.main_frame, text="Нажми кнопку, чтобы вытянуть три карты\nи узнать, что тебя ждёт",
+        tk.Label(frame, text="Нажми кнопку, чтобы вытянуть три карты\nи узнать, что тебя ждёт",
                  font=("Arial", 14), fg=self.TEXT_COLOR, bg=self.BG_COLOR, justify="center").pack(pady=20)
         
-        tk.Button(self.main_frame, text="✨ Вытянуть карты ✨", font=("Arial", 16, "bold"),
+        tk.Button(frame, text="✨ Вытянуть карты ✨", font=("Arial", 16, "bold"),
                   fg=self.TEXT_COLOR, bg=self.ACCENT_COLOR, width=20, height=2,
                   border=0, cursor="hand2", command=self.draw_tarot_cards).pack(pady=30)
         
-        tk.Button(self.main_frame, text="🏠 Вернуться в меню", font=("Arial", 12),
-                  fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, width=20, height=2,
-                  border=0, cursor="hand2", command=self.show_main_menu).pack(pady=10)
+        self.make_back_button(frame, pady=10)
     
     def draw_tarot_cards(self):
-        self.clear_screen()
-        
-        self.canvas = tk.Canvas(self.main_frame, bg=self.BG_COLOR, highlightthickness=0, width=760, height=520)
+        self.show_screen("tarot_spread", keep_prefetch=True)
+    
+    def build_tarot_spread(self, frame):
+        self.canvas = tk.Canvas(frame, bg=self.BG_COLOR, highlightthickness=0, width=760, height=520)
         self.canvas.pack(fill=tk.BOTH, expand=True)
         
-        self.card_images = {}
-        self.cards_for_prediction = []
-        
+        self.card_items = []
         for i in range(3):
-            card = self.deck.pull_card()
-            self.cards_for_prediction.append(card)
-            
-            try:
-                img = Image.open(card.image_path)
-                img = img.resize((150, 280), Image.LANCZOS)
-                card_img = ImageTk.PhotoImage(img)
-                
-                self.card_images[f"card_{i}"] = card_img
-                x_pos = 130 + i * 250
-                self.canvas.create_image(x_pos, 160, image=card_img)
-                self.canvas.create_text(x_pos, 320, text=card.name.replace("_", " ").title(),
-                                        fill=self.TEXT_COLOR, font=("Arial", 10))
-            except Exception as e:
-                print(f"[IMG] Ошибка загрузки карты: {e}")
-        
-        self.canvas.create_text(380, 360, text="⏳ Получаю предсказание...",
-                                fill=self.GRAY_COLOR, font=("Arial", 12))
-        self.window.update()
+            x_pos = 130 + i * 250
+            image_item = self.canvas.create_image(x_pos, 160)
+            name_item = self.canvas.create_text(x_pos, 320, fill=self.TEXT_COLOR, font=("Arial", 10))
+            self.card_items.append((image_item, name_item))
         
-        self.prediction = get_prediction(self.cards_for_prediction)
-        
-        try:
-            self.prediction = {
-                'love': translate_prediction(self.prediction['love']),
-                'career': translate_prediction(self.prediction['career']),
-                'finance': translate_prediction(self.prediction['finance'])
-            }
-        except:
-            pass
-        
-        self.db.save_tarot_reading(self.cards_for_prediction, self.prediction)
+        self.status_item = self.canvas.create_text(380, 345, fill=self.GRAY_COLOR, font=("Arial", 12))
         
         self.text_widget = tk.Text(self.canvas, height=6, width=80, wrap="word",
                                    bg=self.BUTTON_COLOR, fg=self.TEXT_COLOR, font=("Arial", 10))
         self.canvas.create_window(380, 400, window=self.text_widget)
-        self.text_widget.insert("1.0", "Выбери тему предсказания ниже...")
-        self.text_widget.config(state="disabled")
         
         button_frame = tk.Frame(self.canvas, bg=self.BG_COLOR)
         
+        self.topic_buttons = []
         for text, topic in [("❤️ Любовь", 'love'), ("💼 Карьера", 'career'), ("💰 Финансы", 'finance')]:
-            tk.Button(button_frame, text=text, font=("Arial", 11), fg=self.TEXT_COLOR,
-                      bg=self.ACCENT_COLOR, width=12, height=2, border=0,
-                      command=lambda t=topic: self.show_prediction(t)).pack(side="left", padx=10)
+            btn = tk.Button(button_frame, text=text, font=("Arial", 11), fg=self.TEXT_COLOR,
+                            bg=self.ACCENT_COLOR, width=12, height=2, border=0,
+                            command=lambda t=topic: self.show_prediction(t))
+            btn.pack(side="left", padx=10)
+            self.topic_buttons.append(btn)
+        
+        # Пока идёт загрузка - "Отмена", потом - "Ещё расклад"
+        self.action_button = tk.Button(button_frame, font=("Arial", 11), fg=self.TEXT_COLOR,
+                                       bg=self.BUTTON_COLOR, width=12, height=2, border=0)
+        self.action_button.pack(side="left", padx=10)
         
         tk.Button(button_frame, text="🏠 Меню", font=("Arial", 11), fg=self.TEXT_COLOR,
                   bg=self.BUTTON_COLOR, width=12, height=2, border=0,
@@ -788,6 +804,84 @@ class MainApp:
         
         self.canvas.create_window(380, 490, window=button_frame)
     
+    def update_tarot_spread(self):
+        self.card_images = {}
+        
+        # Следующий расклад мог быть уже вытянут и прогрет заранее
+        spread = self.prefetcher.take() if self.prefetcher else None
+        if spread is not None:
+            self.cards_for_prediction, prediction_future = spread
+        else:
+            self.cards_for_prediction = self.engine.draw_spread(self.deck)
+            prediction_future = self.executor.submit(self.engine.predict, self.cards_for_prediction)
+        
+        for i, card in enumerate(self.cards_for_prediction):
+            image_item, name_item = self.card_items[i]
+            try:
+                card_img = to_photo_image(card.load_image())
+                
+                self.card_images[f"card_{i}"] = card_img
+                self.canvas.itemconfig(image_item, image=card_img)
+                self.canvas.itemconfig(name_item, text=card.name.replace("_", " ").title())
+            except Exception as e:
+                print(f"[IMG] Ошибка загрузки карты: {e}")
+                self.canvas.itemconfig(image_item, image="")
+                self.canvas.itemconfig(name_item, text="")
+        
+        self.canvas.itemconfig(self.status_item, text="⏳ Получаю предсказание...")
+        
+        self.prediction = {}
+        
+        self.text_widget.config(state="normal")
+        self.text_widget.delete("1.0", "end")
+        self.text_widget.insert("1.0", "Выбери тему предсказания ниже...")
+        self.text_widget.config(state="disabled")
+        
+        for btn in self.topic_buttons:
+            btn.config(state="disabled")
+        self.action_button.config(text="✖ Отмена", command=self.cancel_prediction)
+        
+        # Сеть - в фоновом потоке, результат забираем опросом через after()
+        self.prediction_future = prediction_future
+        self.poll_prediction(prediction_future, 0)
+    
+    def poll_prediction(self, future, tick):
+        if future is not self.prediction_future:
+            return  # расклад отменён или пользователь ушёл с экрана
+        
+        if not future.done():
+            dots = "." * (tick % 3 + 1)
+            self.canvas.itemconfig(self.status_item, text=f"⏳ Получаю предсказание{dots}")
+            self.window.after(self.POLL_INTERVAL_MS, self.poll_prediction, future, tick + 1)
+            return
+        
+        self.prediction_future = None
+        try:
+            self.prediction = future.result()
+        except Exception as e:
+            print(f"[API] Ошибка: {e}")
+            self.prediction = dict(PREDICTION_FALLBACK)
+        
+        self.engine.save_reading(self.cards_for_prediction, self.prediction)
+        
+        self.canvas.itemconfig(self.status_item, text="✨ Предсказание готово")
+        self.action_button.config(text="🔁 Ещё расклад", command=self.draw_tarot_cards)
+        for btn in self.topic_buttons:
+            btn.config(state="normal")
+        
+        if self.prefetcher is not None:
+            self.prefetcher.fill()
+    
+    def cancel_prediction(self):
+        if self.prediction_future is None:
+            return
+        self.prediction_future.cancel()
+        self.prediction_future = None
+        
+        if self.canvas.winfo_exists():
+            self.canvas.itemconfig(self.status_item, text="Предсказание отменено")
+            self.action_button.config(text="🔁 Ещё расклад", command=self.draw_tarot_cards)
+    
     def show_prediction(self, topic):
         text = self.prediction.get(topic, "Предсказание недоступно")
         self.text_widget.config(state="normal")
@@ -798,206 +892,251 @@ class MainApp:
     # ==================== ДНЕВНИК ====================
     
     def show_diary(self):
-        self.clear_screen()
-        
-        tk.Label(self.main_frame, text="📔 Мой дневник", font=("Arial", 24, "bold"),
+        self.show_screen("diary")
+    
+    def build_diary(self, frame):
+        tk.Label(frame, text="📔 Мой дневник", font=("Arial", 24, "bold"),
                  fg=self.ACCENT_COLOR, bg=self.BG_COLOR).pack(pady=15)
         
-        tabs_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        tabs_frame = tk.Frame(frame, bg=self.BG_COLOR)
         tabs_frame.pack(pady=10)
         
-        tk.Button(tabs_frame, text="😺 Тесты настроения", font=("Arial", 11),
-                  fg=self.TEXT_COLOR, bg=self.ACCENT_COLOR, width=18, height=2,
-                  border=0, command=self.show_mood_diary).pack(side="left", padx=5)
+        self.mood_tab_button = tk.Button(tabs_frame, text="😺 Тесты настроения", font=("Arial", 11),
+                                         fg=self.TEXT_COLOR, bg=self.ACCENT_COLOR, width=18, height=2,
+                                         border=0, command=self.show_mood_diary)
+        self.mood_tab_button.pack(side="left", padx=5)
         
-        tk.Button(tabs_frame, text="🃏 Расклады таро", font=("Arial", 11),
-                  fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, width=18, height=2,
-                  border=0, command=self.show_tarot_diary).pack(side="left", padx=5)
+        self.tarot_tab_button = tk.Button(tabs_frame, text="🃏 Расклады таро", font=("Arial", 11),
+                                          fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, width=18, height=2,
+                                          border=0, command=self.show_tarot_diary)
+        self.tarot_tab_button.pack(side="left", padx=5)
         
-        self.diary_container = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        self.diary_container = tk.Frame(frame, bg=self.BG_COLOR)
         self.diary_container.pack(fill="both", expand=True, pady=10)
         
+        # Обе вкладки и детали расклада строятся один раз, переключение - pack/pack_forget.
+        # Списки создаются пустыми ([]), строки они читают при показе вкладки
+        self.mood_diary_list = VirtualList(self.diary_container, self.engine.mood_history_page,
+                                           self.make_mood_row, self.fill_mood_row, bg=self.BG_COLOR,
+                                           page_size=self.DIARY_PAGE_SIZE, first_page=[])
+        self.mood_diary_empty = tk.Label(self.diary_container,
+                                         text="Пока нет записей.\nПройди тест, чтобы появилась история!",
+                                         font=("Arial", 12), fg=self.GRAY_COLOR, bg=self.BG_COLOR)
+        self.tarot_diary_list = VirtualList(self.diary_container, self.engine.tarot_history_page,
+                                            self.make_tarot_row, self.fill_tarot_row, bg=self.BG_COLOR,
+                                            page_size=self.DIARY_PAGE_SIZE, first_page=[])
+        self.tarot_diary_empty = tk.Label(self.diary_container,
+                                          text="Пока нет раскладов.\nСделай расклад, чтобы появилась история!",
+                                          font=("Arial", 12), fg=self.GRAY_COLOR, bg=self.BG_COLOR)
+        self.build_tarot_details(self.diary_container)
+        
+        self.make_back_button(frame, pady=10)
+    
+    def update_diary(self):
         self.show_mood_diary()
-        
-        tk.Button(self.main_frame, text="🏠 Вернуться в меню", font=("Arial", 12),
-                  fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, width=20, height=2,
-                  border=0, cursor="hand2", command=self.show_main_menu).pack(pady=10)
     
-    def show_mood_diary(self):
-        for widget in self.diary_container.winfo_children():
-            widget.destroy()
-        
-        history = self.db.get_mood_history(15)
+    def hide_diary_views(self):
+        for view in (self.mood_diary_list, self.mood_diary_empty, self.tarot_diary_list,
+                     self.tarot_diary_empty, self.tarot_details_frame):
+            view.pack_forget()
+    
+    def show_diary_tab(self, diary_list, empty_label, first_page, active_button):
+        self.hide_diary_views()
+        for button in (self.mood_tab_button, self.tarot_tab_button):
+            button.config(bg=self.ACCENT_COLOR if button is active_button else self.BUTTON_COLOR)
         
-        if not history:
-            tk.Label(self.diary_container, text="Пока нет записей.\nПройди тест, чтобы появилась история!",
-                     font=("Arial", 12), fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack(pady=50)
+        if not first_page:
+            empty_label.pack(pady=50)
             return
-        
-        canvas = tk.Canvas(self.diary_container, bg=self.BG_COLOR, highlightthickness=0)
-        scrollbar = tk.Scrollbar(self.diary_container, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=self.BG_COLOR)
-        
-        scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        for date, cat_type, score in history:
-            entry_frame = tk.Frame(scrollable_frame, bg=self.BUTTON_COLOR, padx=10, pady=8)
-            entry_frame.pack(fill="x", pady=3, padx=10)
-            
-            try:
-                dt = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-                date_str = dt.strftime("%d.%m.%Y %H:%M")
-            except:
-                date_str = date
-            
-            tk.Label(entry_frame, text=f"📅 {date_str}", font=("Arial", 10),
-                     fg=self.GRAY_COLOR, bg=self.BUTTON_COLOR).pack(anchor="w")
-            tk.Label(entry_frame, text=f"{cat_type} — {score} баллов", font=("Arial", 12, "bold"),
-                     fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR).pack(anchor="w")
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        diary_list.update(first_page)
+        diary_list.pack(fill="both", expand=True)
+    
+    def show_mood_diary(self):
+        first_page = self.engine.mood_history_page(limit=self.DIARY_PAGE_SIZE)
+        self.show_diary_tab(self.mood_diary_list, self.mood_diary_empty, first_page, self.mood_tab_button)
+    
+    def make_mood_row(self, parent):
+        entry_frame = tk.Frame(parent, bg=self.BUTTON_COLOR, padx=10, pady=8)
+        date_label = tk.Label(entry_frame, font=("Arial", 10), fg=self.GRAY_COLOR, bg=self.BUTTON_COLOR)
+        date_label.pack(anchor="w")
+        title_label = tk.Label(entry_frame, font=("Arial", 12, "bold"), fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR)
+        title_label.pack(anchor="w")
+        return {"frame": entry_frame, "date": date_label, "title": title_label}
+    
+    def fill_mood_row(self, widgets, row):
+        _, _, date, cat_type, score = row
+        widgets["date"].config(text=f"📅 {format_history_date(date)}")
+        widgets["title"].config(text=f"{cat_type} — {score} баллов")
     
     def show_tarot_diary(self):
-        for widget in self.diary_container.winfo_children():
-            widget.destroy()
-        
-        history = self.db.get_tarot_history(15)
-        
-        if not history:
-            tk.Label(self.diary_container, text="Пока нет раскладов.\nСделай расклад, чтобы появилась история!",
-                     font=("Arial", 12), fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack(pady=50)
-            return
-        
-        canvas = tk.Canvas(self.diary_container, bg=self.BG_COLOR, highlightthickness=0)
-        scrollbar = tk.Scrollbar(self.diary_container, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=self.BG_COLOR)
-        
-        scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        for date, card1, card2, card3, prediction_love, prediction_career, prediction_finance in history:
-            entry_frame = tk.Frame(scrollable_frame, bg=self.BUTTON_COLOR, padx=10, pady=8)
-            entry_frame.pack(fill="x", pady=3, padx=10)
-            
-            entry_frame.columnconfigure(0, weight=1) 
-            
-            try:
-                dt = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-                date_str = dt.strftime("%d.%m.%Y %H:%M")
-            except:
-                date_str = date
-            
-            tk.Label(entry_frame, text=f"📅 {date_str}", font=("Arial", 10),
-                    fg=self.GRAY_COLOR, bg=self.BUTTON_COLOR).grid(row=0, column=0, sticky="w")
-            cards_text = f"🃏 {card1.replace('_', ' ')}, {card2.replace('_', ' ')}, {card3.replace('_', ' ')}"
-            tk.Label(entry_frame, text=cards_text, font=("Arial", 11), fg=self.TEXT_COLOR,
-                    bg=self.BUTTON_COLOR, wraplength=500).grid(row=1, column=0, sticky="w", pady=(0, 5))
-
-            tk.Button(entry_frame, text="Подробнее", font=("Arial", 10),
-                    fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR,
-                    border=0, cursor="hand2",
-                    command=lambda pl=prediction_love, pc=prediction_career, pf=prediction_finance: 
-                    self.show_tarot_details(pl, pc, pf)
-                    ).grid(row=0, column=1, rowspan=2, sticky="ns", padx=(10, 0))
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        first_page = self.engine.tarot_history_page(limit=self.DIARY_PAGE_SIZE)
+        self.show_diary_tab(self.tarot_diary_list, self.tarot_diary_empty, first_page, self.tarot_tab_button)
     
-    def show_tarot_details(self, prediction_love, prediction_career, prediction_finance):
+    def make_tarot_row(self, parent):
+        entry_frame = tk.Frame(parent, bg=self.BUTTON_COLOR, padx=10, pady=8)
+        entry_frame.columnconfigure(0, weight=1)
+        
+        date_label = tk.Label(entry_frame, font=("Arial", 10), fg=self.GRAY_COLOR, bg=self.BUTTON_COLOR)
+        date_label.grid(row=0, column=0, sticky="w")
+        cards_label = tk.Label(entry_frame, font=("Arial", 11), fg=self.TEXT_COLOR,
+                               bg=self.BUTTON_COLOR, wraplength=500)
+        cards_label.grid(row=1, column=0, sticky="w", pady=(0, 5))
+        
+        details_button = tk.Button(entry_frame, text="Подробнее", font=("Arial", 10),
+                                   fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR,
+                                   border=0, cursor="hand2")
+        details_button.grid(row=0, column=1, rowspan=2, sticky="ns", padx=(10, 0))
+        return {"frame": entry_frame, "date": date_label, "cards": cards_label, "details": details_button}
+    
+    def fill_tarot_row(self, widgets, row):
+        _, reading_id, date, card1, card2, card3 = row
+        widgets["date"].config(text=f"📅 {format_history_date(date)}")
+        widgets["cards"].config(text=f"🃏 {card1.replace('_', ' ')}, {card2.replace('_', ' ')}, {card3.replace('_', ' ')}")
+        widgets["details"].config(command=lambda: self.show_tarot_details(*self.engine.tarot_reading_details(reading_id)))
+    
+    def build_tarot_details(self, parent):
+        self.tarot_details_frame = tk.Frame(parent, bg=self.BG_COLOR)
         
-        for widget in self.diary_container.winfo_children():
-            widget.destroy()
-
-        main_details_frame = tk.Frame(self.diary_container, bg=self.BG_COLOR)
-        main_details_frame.pack(fill="both", expand=True, padx=20, pady=20)
-
-        tk.Label(main_details_frame, text="Детали расклада", font=("Arial", 16, "bold"),
-                fg=self.TEXT_COLOR, bg=self.BG_COLOR).pack(anchor="w", pady=(0, 20))
-
-        areas_frame = tk.Frame(main_details_frame, bg=self.BG_COLOR)
+        tk.Label(self.tarot_details_frame, text="Детали расклада", font=("Arial", 16, "bold"),
+                 fg=self.TEXT_COLOR, bg=self.BG_COLOR).pack(anchor="w", pady=(0, 20))
+        
+        areas_frame = tk.Frame(self.tarot_details_frame, bg=self.BG_COLOR)
         areas_frame.pack(fill="both", expand=True)
-
+        
         areas_frame.columnconfigure(0, weight=1)
         areas_frame.columnconfigure(1, weight=1)
         areas_frame.columnconfigure(2, weight=1)
-
-        predictions = [
-            ("❤️ Любовь", prediction_love),
-            ("💼 Карьера", prediction_career),
-            ("💰 Финансы", prediction_finance)
-        ]
         
-        for i, (title, text) in enumerate(predictions):
-            area = tk.Frame(areas_frame, bg=self.BUTTON_COLOR, relief="solid", 
-                        borderwidth=2, padx=15, pady=15)
+        self.tarot_details_texts = []
+        for i, title in enumerate(["❤️ Любовь", "💼 Карьера", "💰 Финансы"]):
+            area = tk.Frame(areas_frame, bg=self.BUTTON_COLOR, relief="solid",
+                            borderwidth=2, padx=15, pady=15)
             area.grid(row=0, column=i, sticky="nsew", padx=(0 if i == 0 else 10, 10 if i == 2 else 5))
             
             tk.Label(area, text=title, font=("Arial", 14, "bold"),
-                    fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR).pack(anchor="w", pady=(0, 10))
+                     fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR).pack(anchor="w", pady=(0, 10))
             
             text_frame = tk.Frame(area, bg=self.BUTTON_COLOR)
             text_frame.pack(fill="both", expand=True)
             
-            text_widget = tk.Text(text_frame, font=("Arial", 12), fg=self.TEXT_COLOR, 
-                                bg=self.BUTTON_COLOR, wrap="word", height=9,
-                                borderwidth=0, highlightthickness=0)
-            text_widget.insert("1.0", text)
-            text_widget.config(state="disabled")
+            text_widget = tk.Text(text_frame, font=("Arial", 12), fg=self.TEXT_COLOR,
+                                  bg=self.BUTTON_COLOR, wrap="word", height=9,
+                                  borderwidth=0, highlightthickness=0, state="disabled")
             
             scrollbar = tk.Scrollbar(text_frame, orient="vertical", command=text_widget.yview)
             text_widget.configure(yscrollcommand=scrollbar.set)
             
             text_widget.pack(side="left", fill="both", expand=True)
             scrollbar.pack(side="right", fill="y")
-        
-
+            self.tarot_details_texts.append(text_widget)
+    
+    def show_tarot_details(self, prediction_love, prediction_career, prediction_finance):
+        self.hide_diary_views()
+        for text_widget, text in zip(self.tarot_details_texts,
+                                     (prediction_love, prediction_career, prediction_finance)):
+            text_widget.config(state="normal")
+            text_widget.delete("1.0", "end")
+            text_widget.insert("1.0", text or "")
+            text_widget.config(state="disabled")
+        self.tarot_details_frame.pack(fill="both", expand=True, padx=20, pady=20)
+    
     # ==================== СТАТИСТИКА ====================
     
     def show_statistics(self):
-        self.clear_screen()
-        
-        tk.Label(self.main_frame, text="📊 Статистика", font=("Arial", 24, "bold"),
+        self.show_screen("statistics")
+    
+    def build_statistics(self, frame):
+        tk.Label(frame, text="📊 Статистика", font=("Arial", 24, "bold"),
                  fg=self.ACCENT_COLOR, bg=self.BG_COLOR).pack(pady=20)
         
-        stats = self.db.get_mood_statistics()
+        content = tk.Frame(frame, bg=self.BG_COLOR)
+        content.pack(fill="x")
+        content.columnconfigure(0, weight=1)
+        
+        self.stats_empty_label = tk.Label(content, text="Пока нет данных для статистики.\nПройди несколько тестов!",
+                                          font=("Arial", 14), fg=self.GRAY_COLOR, bg=self.BG_COLOR)
+        self.stats_header_label = tk.Label(content, text="Твои типы котов:", font=("Arial", 14),
+                                           fg=self.TEXT_COLOR, bg=self.BG_COLOR)
+        self.stats_content = content
+        self.stat_rows = []
+        
+        self.make_back_button(frame, pady=30)
+    
+    def make_stat_row(self):
+        stat_frame = tk.Frame(self.stats_content, bg=self.BG_COLOR)
+        
+        label = tk.Label(stat_frame, font=("Arial", 12), fg=self.TEXT_COLOR, bg=self.BG_COLOR, anchor="w")
+        label.pack(side="left")
+        
+        bar_frame = tk.Frame(stat_frame, bg="#333333", height=20, width=200)
+        bar_frame.pack(side="right", padx=10)
+        bar_frame.pack_propagate(False)
+        
+        bar_fill = tk.Frame(bar_frame, bg=self.ACCENT_COLOR, height=20)
+        bar_fill.place(x=0, y=0)
+        return {"frame": stat_frame, "label": label, "fill": bar_fill}
+    
+    def update_statistics(self):
+        stats = self.engine.mood_statistics()
+        
+        # Строки переиспользуются, лишние скрываются
+        while len(self.stat_rows) < len(stats):
+            self.stat_rows.append(self.make_stat_row())
+        for row in self.stat_rows:
+            row["frame"].grid_remove()
         
         if not stats:
-            tk.Label(self.main_frame, text="Пока нет данных для статистики.\nПройди несколько тестов!",
-                     font=("Arial", 14), fg=self.GRAY_COLOR, bg=self.BG_COLOR).pack(pady=50)
-        else:
-            tk.Label(self.main_frame, text="Твои типы котов:", font=("Arial", 14),
-                     fg=self.TEXT_COLOR, bg=self.BG_COLOR).pack(pady=10)
-            
-            total = sum(count for _, count in stats)
-            
-            for cat_type, count in stats:
-                percent = int(count / total * 100)
-                
-                stat_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
-                stat_frame.pack(fill="x", padx=50, pady=5)
-                
-                tk.Label(stat_frame, text=f"{cat_type}: {count} раз ({percent}%)",
-                         font=("Arial", 12), fg=self.TEXT_COLOR, bg=self.BG_COLOR, anchor="w").pack(side="left")
-                
-                bar_frame = tk.Frame(stat_frame, bg="#333333", height=20, width=200)
-                bar_frame.pack(side="right", padx=10)
-                bar_frame.pack_propagate(False)
-                
-                fill_width = int(200 * count / max(c for _, c in stats))
-                bar_fill = tk.Frame(bar_frame, bg=self.ACCENT_COLOR, height=20, width=fill_width)
-                bar_fill.place(x=0, y=0)
+            self.stats_header_label.grid_remove()
+            self.stats_empty_label.grid(row=0, column=0, pady=50)
+            return
         
-        tk.Button(self.main_frame, text="🏠 Вернуться в меню", font=("Arial", 12),
-                  fg=self.TEXT_COLOR, bg=self.BUTTON_COLOR, width=20, height=2,
-                  border=0, cursor="hand2", command=self.show_main_menu).pack(pady=30)
+        self.stats_empty_label.grid_remove()
+        self.stats_header_label.grid(row=0, column=0, pady=10)
+        
+        total = sum(count for _, count in stats)
+        max_count = max(c for _, c in stats)
+        
+        for i, (cat_type, count) in enumerate(stats):
+            percent = int(count / total * 100)
+            row = self.stat_rows[i]
+            row["label"].config(text=f"{cat_type}: {count} раз ({percent}%)")
+            row["fill"].config(width=int(200 * count / max_count))
+            row["frame"].grid(row=i + 1, column=0, sticky="ew", padx=50, pady=5)
+    
+    def report_startup(self):
+        """Печатает время до первой отрисовки по шагам и закрывает окно."""
+        self.window.update()
+        mark_startup("первая отрисовка")
+        
+        previous = STARTUP_STARTED
+        for name, moment in startup_marks:
+            print(f"[START] {name:<18} +{(moment - previous) * 1000:6.1f} мс  "
+                  f"{(moment - STARTUP_STARTED) * 1000:6.1f} мс")
+            previous = moment
+        total = (startup_marks[-1][1] - STARTUP_STARTED) * 1000
+        verdict = "в норме" if total <= STARTUP_TARGET_MS else "медленнее цели"
+        print(f"[START] До первой отрисовки {total:.1f} мс (цель {STARTUP_TARGET_MS} мс, {verdict})")
+        print(f"[START] Уже загружены: PIL {'PIL.Image' in sys.modules}, "
+              f"sqlite3 {'sqlite3' in sys.modules}, база {self.engine._db is not None}")
+        self.window.destroy()
     
     def run(self):
+        if self.profile_startup:
+            # Время с начала main.py; запуск самого интерпретатора сюда не входит
+            self.window.after_idle(self.report_startup)
+        if self.watchdog is not None:
+            # После первой отрисовки: создание окна зависанием не считается
+            self.window.after_idle(self.watchdog.start)
         self.window.mainloop()
-        self.db.close()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        api_client.close()
+        print(f"[API] Статистика: {api_client.get_stats()}")
+        print(f"[UI] Экраны: {self.screens.get_stats()}")
+        self.engine.close()
+        if metrics.enabled:
+            metrics.dump(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
 
 
 # ============================================================
@@ -1005,5 +1144,41 @@ class MainApp:
 # ============================================================
 
 if __name__ == "__main__":
-    app = MainApp()
-    app.run()
+    if "--metrics" in sys.argv:
+        sys.argv.remove("--metrics")
+        metrics.enabled = True
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "build-atlas":
+        build_tarot_atlas()
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench-db":
+        import benchmarks
+        benchmarks.main_db(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench-images":
+        import benchmarks
+        benchmarks.main_images(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] in ("export", "import"):
+        # python main.py export|import mood_results|tarot_readings файл.jsonl|файл.csv
+        from oracle import HISTORY_COLUMNS, export_history, import_history
+        if len(sys.argv) != 4 or sys.argv[2] not in HISTORY_COLUMNS:
+            sys.exit(f"Использование: python main.py {sys.argv[1]} "
+                     f"{{{'|'.join(HISTORY_COLUMNS)}}} файл.jsonl|файл.csv")
+        db = Database()
+        if sys.argv[1] == "export":
+            export_history(db, sys.argv[2], sys.argv[3])
+        else:
+            import_history(db, sys.argv[2], sys.argv[3])
+        db.close()
+    elif len(sys.argv) > 1 and sys.argv[1] == "profile-flow":
+        from oracle import profile_flow
+        profile_flow(*sys.argv[2:3])
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        import server
+        server.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild-aggregates":
+        db = Database()
+        db.rebuild_aggregates()
+        db.close()
+    else:
+        watchdog = "--watchdog" in sys.argv or os.getenv("ORACLE_WATCHDOG", "") not in ("", "0")
+        app = MainApp(profile_startup="--profile-startup" in sys.argv, watchdog=watchdog)
+        app.run()
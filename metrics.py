@@ -0,0 +1,175 @@
+# КОТОГАДАЛКА - метрики
+# Таймеры и счётчики горячих мест: запросы к базе, картинки, HTTP, перевод, экраны.
+# По умолчанию выключены и почти ничего не стоят. Включение:
+#   переменная окружения ORACLE_METRICS=1 или флаг --metrics.
+# Снимок - JSON (snapshot) или текст для Prometheus (to_prometheus).
+
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+
+WINDOW_SIZE = 1024  # сколько последних замеров хранит каждый таймер
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Histogram:
+    """
+    Скользящее окно последних WINDOW_SIZE длительностей.
+    Перцентили считаются по окну при снимке, count и sum - за всё время.
+    """
+
+    def __init__(self):
+        self.window = deque(maxlen=WINDOW_SIZE)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.window.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        values = sorted(self.window)
+        summary = {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+        }
+        for quantile in QUANTILES:
+            summary[f"p{round(quantile * 100)}"] = percentile(values, quantile)
+        return summary
+
+
+class Metrics:
+    """Реестр таймеров и счётчиков. Пишут в него из нескольких потоков, поэтому под замком."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+        self.started = time.time()
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def timed(self, name):
+        """with metrics.timed("db.query"): ... - замеряет блок, если метрики включены."""
+        if not self.enabled:
+            return nullcontext()
+        return self.timer(name)
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "uptime": time.time() - self.started,
+                "timers": {name: histogram.summary() for name, histogram in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_prometheus(self, prefix="oracle"):
+        """Снимок в текстовом формате Prometheus: summary для таймеров, counter для счётчиков."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_duration_seconds Длительность операций (квантили по последним {WINDOW_SIZE} замерам)",
+            f"# TYPE {prefix}_duration_seconds summary",
+        ]
+        for name, summary in snapshot["timers"].items():
+            for quantile in QUANTILES:
+                value = summary[f"p{round(quantile * 100)}"]
+                lines.append(f'{prefix}_duration_seconds{{op="{name}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'{prefix}_duration_seconds_sum{{op="{name}"}} {summary["sum"]:.6f}')
+            lines.append(f'{prefix}_duration_seconds_count{{op="{name}"}} {summary["count"]}')
+
+        lines += [
+            f"# HELP {prefix}_events_total Счётчики событий",
+            f"# TYPE {prefix}_events_total counter",
+        ]
+        for name, value in snapshot["counters"].items():
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, directory):
+        """Пишет metrics.json и metrics.prom в directory."""
+        import json
+
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "metrics.json"), "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        with open(os.path.join(directory, "metrics.prom"), "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        print(f"[METRICS] Снимок записан в {directory}")
+
+
+metrics = Metrics(enabled=os.getenv("ORACLE_METRICS", "") not in ("", "0"))
+
+
+@contextmanager
+def capture_profile(name, output_dir, top=20):
+    """
+    cProfile и tracemalloc вокруг одного сценария.
+    Печатает самые дорогие функции и места выделения памяти,
+    полный профиль сохраняется в output_dir/profile-<name>.pstats.
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        memory_snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        os.makedirs(output_dir, exist_ok=True)
+        stats_path = os.path.join(output_dir, f"profile-{name}.pstats")
+        profiler.dump_stats(stats_path)
+
+        print(f"[PROFILE] {name}: {elapsed * 1000:.1f} мс, память: пик {peak / 1024:.0f} КиБ, "
+              f"осталось {current / 1024:.0f} КиБ")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+        print("[PROFILE] Больше всего памяти выделено в:")
+        for stat in memory_snapshot.statistics("lineno")[:10]:
+            print(f"  {stat}")
+        print(f"[PROFILE] Полный профиль: {stats_path} (python -m pstats {stats_path})")
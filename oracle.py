@@ -0,0 +1,2258 @@
+# КОТОГАДАЛКА - ядро без интерфейса
+# Тест настроения, таро, предсказания, история и статистика.
+# Не зависит от Tkinter: его используют окно (main.py), скрипты и тесты.
+
+
+import os
+import random
+import json
+import csv
+import importlib
+import threading
+import time
+import queue
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from metrics import metrics, capture_profile
+
+
+class LazyModule:
+    """
+    Модуль, который импортируется при первом обращении к его атрибуту.
+    Окно рисует меню без PIL, картинки нужны только следующим экранам.
+    """
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+Image = LazyModule("PIL.Image")
+
+
+# ============================================================
+# БАЗА ДАННЫХ (SQLite)
+# ============================================================
+
+# Профили производительности SQLite.
+# "safe" - как раньше: журнал отката и commit после каждой записи.
+# "fast" - WAL, synchronous=NORMAL и отложенная запись пачками.
+# "server" - как fast, но commit сразу: соединений несколько, и запись
+# должна быть видна остальным без задержки буфера. Каждое сохранение
+# не печатается: это строка в лог на каждый запрос, счёт есть в метриках.
+DB_PROFILES = {
+    "safe": {
+        "pragmas": {},
+        "cached_statements": 128,
+        "flush_size": 1,
+        "flush_interval": 0,
+        "log_saves": True,
+    },
+    "fast": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size": -8000,  # в КиБ, ~8 МБ
+            "temp_store": "MEMORY",
+        },
+        "cached_statements": 256,
+        "flush_size": 50,
+        "flush_interval": 1.0,
+        "log_saves": True,
+    },
+    "server": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size": -8000,
+            "temp_store": "MEMORY",
+        },
+        "cached_statements": 256,
+        "flush_size": 1,
+        "flush_interval": 0,
+        "log_saves": False,
+    },
+}
+
+
+# Пользователь по умолчанию: окно на компьютере и старые записи без user_id
+DEFAULT_USER = "local"
+
+# Колонки истории для импорта и экспорта (id не переносится, при импорте он новый).
+# Первые три - ключ поиска дубликатов, остальные - содержимое записи.
+HISTORY_COLUMNS = {
+    "mood_results": ("user_id", "ts", "date", "cat_type", "score", "answers"),
+    "tarot_readings": ("user_id", "ts", "date", "card1_name", "card2_name", "card3_name",
+                       "prediction_love", "prediction_career", "prediction_finance"),
+}
+HISTORY_INT_COLUMNS = ("ts", "score")
+
+
+class Database:
+    """
+    Класс для работы с базой данных SQLite.
+    Хранит результаты тестов и раскладов таро, у каждой записи есть user_id.
+    Записи копятся в буфере и сбрасываются одной транзакцией по таймеру,
+    по размеру буфера, перед любым чтением и при close().
+    Если запись из буфера не проходит (например, NOT NULL), ошибка всплывает
+    при сбросе, а не в save_*: остальные записи пачки всё равно сохраняются,
+    а неудачная уходит в failed_writes.
+    """
+    
+    FAILED_WRITES_KEPT = 100
+    
+    def __init__(self, db_name="cat_oracle.db", profile="fast"):
+        import sqlite3
+        
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.db_path = os.path.join(script_dir, db_name)
+        self.profile = DB_PROFILES[profile]
+        # Таймер сбрасывает буфер из своего потока, поэтому доступ под замком
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False,
+                                          cached_statements=self.profile["cached_statements"])
+        self.cursor = self.connection.cursor()
+        self.pending_writes = []
+        self.failed_writes = deque(maxlen=self.FAILED_WRITES_KEPT)  # (sql, параметры, ошибка)
+        self.flush_timer = None
+        self.apply_pragmas()
+        self.create_tables()
+        self.migrate()
+        print(f"[DB] База данных: {self.db_path}")
+    
+    def apply_pragmas(self):
+        for name, value in self.profile["pragmas"].items():
+            self.cursor.execute(f"PRAGMA {name} = {value}")
+    
+    def create_tables(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mood_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                cat_type TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                answers TEXT,
+                ts INTEGER,
+                user_id TEXT NOT NULL DEFAULT 'local'
+            )
+        ''')
+        
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tarot_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                card1_name TEXT,
+                card2_name TEXT,
+                card3_name TEXT,
+                prediction_love TEXT,
+                prediction_career TEXT,
+                prediction_finance TEXT,
+                ts INTEGER,
+                user_id TEXT NOT NULL DEFAULT 'local'
+            )
+        ''')
+        
+        self.connection.commit()
+        print("[DB] Таблицы созданы")
+    
+    def migrate(self):
+        """Доводит схему до текущей версии, номер версии хранится в PRAGMA user_version."""
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        migrations = [self.migrate_timestamps, self.migrate_aggregates, self.migrate_users,
+                      self.migrate_update_trigger]
+        
+        for target, step in enumerate(migrations, start=1):
+            if version < target:
+                step()
+                self.cursor.execute(f"PRAGMA user_version = {target}")
+                self.connection.commit()
+                print(f"[DB] Схема обновлена до версии {target}")
+    
+    def migrate_timestamps(self):
+        """
+        v1: целочисленное время ts (unix epoch) рядом с текстовой датой
+        и покрывающие индексы для истории, трендов и статистики.
+        """
+        for table in ("mood_results", "tarot_readings"):
+            columns = [row[1] for row in self.cursor.execute(f"PRAGMA table_info({table})")]
+            if "ts" not in columns:
+                self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN ts INTEGER")
+            # date хранится в локальном времени, модификатор 'utc' переводит его в UTC
+            self.cursor.execute(f'''
+                UPDATE {table} SET ts = CAST(strftime('%s', date, 'utc') AS INTEGER)
+                WHERE ts IS NULL
+            ''')
+        
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_mood_results_ts
+            ON mood_results (ts, id, score, cat_type)
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_mood_results_cat_type
+            ON mood_results (cat_type)
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tarot_readings_ts
+            ON tarot_readings (ts, id)
+        ''')
+    
+    def migrate_aggregates(self):
+        """
+        v2: сводные таблицы по дням, дням недели и типам котов.
+        Поддерживаются триггерами на mood_results, поэтому экраны трендов
+        и статистики читают O(показанных дней), а не всю таблицу.
+        """
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mood_daily (
+                day TEXT PRIMARY KEY,
+                score_sum INTEGER NOT NULL,
+                count INTEGER NOT NULL
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mood_weekday (
+                weekday INTEGER PRIMARY KEY,
+                score_sum INTEGER NOT NULL,
+                count INTEGER NOT NULL
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mood_cat_counts (
+                cat_type TEXT PRIMARY KEY,
+                count INTEGER NOT NULL
+            )
+        ''')
+        
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_mood_results_insert
+            AFTER INSERT ON mood_results
+            BEGIN
+                INSERT INTO mood_daily (day, score_sum, count)
+                VALUES (DATE(NEW.ts, 'unixepoch', 'localtime'), NEW.score, 1)
+                ON CONFLICT (day) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum, count = count + 1;
+                
+                INSERT INTO mood_weekday (weekday, score_sum, count)
+                VALUES (CAST(strftime('%w', NEW.ts, 'unixepoch', 'localtime') AS INTEGER), NEW.score, 1)
+                ON CONFLICT (weekday) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum, count = count + 1;
+                
+                INSERT INTO mood_cat_counts (cat_type, count)
+                VALUES (NEW.cat_type, 1)
+                ON CONFLICT (cat_type) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_mood_results_delete
+            AFTER DELETE ON mood_results
+            BEGIN
+                UPDATE mood_daily SET score_sum = score_sum - OLD.score, count = count - 1
+                WHERE day = DATE(OLD.ts, 'unixepoch', 'localtime');
+                
+                UPDATE mood_weekday SET score_sum = score_sum - OLD.score, count = count - 1
+                WHERE weekday = CAST(strftime('%w', OLD.ts, 'unixepoch', 'localtime') AS INTEGER);
+                
+                UPDATE mood_cat_counts SET count = count - 1 WHERE cat_type = OLD.cat_type;
+            END
+        ''')
+        # Заполнение сводных таблиц - в migrate_users, она пересоздаёт их по пользователям
+    
+    def migrate_users(self):
+        """
+        v3: у каждой записи есть user_id, старые записи принадлежат DEFAULT_USER.
+        Индексы истории и сводные таблицы строятся по (user_id, ...),
+        так что запросы одного пользователя не задевают чужие строки.
+        """
+        for table in ("mood_results", "tarot_readings"):
+            columns = [row[1] for row in self.cursor.execute(f"PRAGMA table_info({table})")]
+            if "user_id" not in columns:
+                self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN user_id TEXT NOT NULL DEFAULT 'local'")
+        
+        self.cursor.execute("DROP INDEX IF EXISTS idx_mood_results_ts")
+        self.cursor.execute("DROP INDEX IF EXISTS idx_tarot_readings_ts")
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_mood_results_user_ts
+            ON mood_results (user_id, ts, id, score, cat_type)
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tarot_readings_user_ts
+            ON tarot_readings (user_id, ts, id)
+        ''')
+        
+        for trigger in ("trg_mood_results_insert", "trg_mood_results_delete"):
+            self.cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        for table in ("mood_daily", "mood_weekday", "mood_cat_counts"):
+            self.cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        
+        self.cursor.execute('''
+            CREATE TABLE mood_daily (
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                score_sum INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, day)
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE mood_weekday (
+                user_id TEXT NOT NULL,
+                weekday INTEGER NOT NULL,
+                score_sum INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, weekday)
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE mood_cat_counts (
+                user_id TEXT NOT NULL,
+                cat_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, cat_type)
+            )
+        ''')
+        
+        self.cursor.execute('''
+            CREATE TRIGGER trg_mood_results_insert
+            AFTER INSERT ON mood_results
+            BEGIN
+                INSERT INTO mood_daily (user_id, day, score_sum, count)
+                VALUES (NEW.user_id, DATE(NEW.ts, 'unixepoch', 'localtime'), NEW.score, 1)
+                ON CONFLICT (user_id, day) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum, count = count + 1;
+                
+                INSERT INTO mood_weekday (user_id, weekday, score_sum, count)
+                VALUES (NEW.user_id, CAST(strftime('%w', NEW.ts, 'unixepoch', 'localtime') AS INTEGER),
+                        NEW.score, 1)
+                ON CONFLICT (user_id, weekday) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum, count = count + 1;
+                
+                INSERT INTO mood_cat_counts (user_id, cat_type, count)
+                VALUES (NEW.user_id, NEW.cat_type, 1)
+                ON CONFLICT (user_id, cat_type) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        self.cursor.execute('''
+            CREATE TRIGGER trg_mood_results_delete
+            AFTER DELETE ON mood_results
+            BEGIN
+                UPDATE mood_daily SET score_sum = score_sum - OLD.score, count = count - 1
+                WHERE user_id = OLD.user_id AND day = DATE(OLD.ts, 'unixepoch', 'localtime');
+                
+                UPDATE mood_weekday SET score_sum = score_sum - OLD.score, count = count - 1
+                WHERE user_id = OLD.user_id
+                  AND weekday = CAST(strftime('%w', OLD.ts, 'unixepoch', 'localtime') AS INTEGER);
+                
+                UPDATE mood_cat_counts SET count = count - 1
+                WHERE user_id = OLD.user_id AND cat_type = OLD.cat_type;
+            END
+        ''')
+        
+        self.rebuild_aggregates(commit=False)
+    
+    def migrate_update_trigger(self):
+        """
+        v4: правка строки mood_results тоже доходит до сводных таблиц:
+        старая строка вычитается, как при удалении, новая прибавляется, как при вставке.
+        """
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_mood_results_update
+            AFTER UPDATE OF ts, score, cat_type, user_id ON mood_results
+            BEGIN
+                UPDATE mood_daily SET score_sum = score_sum - OLD.score, count = count - 1
+                WHERE user_id = OLD.user_id AND day = DATE(OLD.ts, 'unixepoch', 'localtime');
+                
+                UPDATE mood_weekday SET score_sum = score_sum - OLD.score, count = count - 1
+                WHERE user_id = OLD.user_id
+                  AND weekday = CAST(strftime('%w', OLD.ts, 'unixepoch', 'localtime') AS INTEGER);
+                
+                UPDATE mood_cat_counts SET count = count - 1
+                WHERE user_id = OLD.user_id AND cat_type = OLD.cat_type;
+                
+                INSERT INTO mood_daily (user_id, day, score_sum, count)
+                VALUES (NEW.user_id, DATE(NEW.ts, 'unixepoch', 'localtime'), NEW.score, 1)
+                ON CONFLICT (user_id, day) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum, count = count + 1;
+                
+                INSERT INTO mood_weekday (user_id, weekday, score_sum, count)
+                VALUES (NEW.user_id, CAST(strftime('%w', NEW.ts, 'unixepoch', 'localtime') AS INTEGER),
+                        NEW.score, 1)
+                ON CONFLICT (user_id, weekday) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum, count = count + 1;
+                
+                INSERT INTO mood_cat_counts (user_id, cat_type, count)
+                VALUES (NEW.user_id, NEW.cat_type, 1)
+                ON CONFLICT (user_id, cat_type) DO UPDATE SET count = count + 1;
+            END
+        ''')
+    
+    def rebuild_aggregates(self, commit=True):
+        """
+        Пересчитывает сводные таблицы с нуля по mood_results.
+        Нужен после смены часового пояса или ручной правки базы.
+        Запуск: python main.py rebuild-aggregates
+        """
+        with self.lock:
+            self.flush()
+            self.cursor.execute("DELETE FROM mood_daily")
+            self.cursor.execute("DELETE FROM mood_weekday")
+            self.cursor.execute("DELETE FROM mood_cat_counts")
+            
+            self.cursor.execute('''
+                INSERT INTO mood_daily (user_id, day, score_sum, count)
+                SELECT user_id, DATE(ts, 'unixepoch', 'localtime') as day, SUM(score), COUNT(*)
+                FROM mood_results GROUP BY user_id, day
+            ''')
+            self.cursor.execute('''
+                INSERT INTO mood_weekday (user_id, weekday, score_sum, count)
+                SELECT user_id, CAST(strftime('%w', ts, 'unixepoch', 'localtime') AS INTEGER) as weekday,
+                       SUM(score), COUNT(*)
+                FROM mood_results GROUP BY user_id, weekday
+            ''')
+            self.cursor.execute('''
+                INSERT INTO mood_cat_counts (user_id, cat_type, count)
+                SELECT user_id, cat_type, COUNT(*) FROM mood_results GROUP BY user_id, cat_type
+            ''')
+            
+            if commit:
+                self.connection.commit()
+                print("[DB] Сводные таблицы пересчитаны")
+    
+    def queue_write(self, sql, params):
+        with self.lock:
+            self.pending_writes.append((sql, params))
+            if len(self.pending_writes) >= self.profile["flush_size"]:
+                self.flush()
+            elif self.flush_timer is None and self.profile["flush_interval"]:
+                self.flush_timer = threading.Timer(self.profile["flush_interval"], self.flush_in_background)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+    
+    def flush(self):
+        """
+        Записывает накопленный буфер одной транзакцией.
+        Если пачка не прошла, она откатывается и пишется по одной записи:
+        удачные сохраняются, неудачные уходят в failed_writes,
+        первая ошибка пробрасывается дальше.
+        """
+        import sqlite3
+        
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            if not self.pending_writes:
+                return
+            # Буфер забирается сразу: после ошибки он не должен сбрасываться снова
+            writes, self.pending_writes = self.pending_writes, []
+            
+            with metrics.timed("db.flush"):
+                try:
+                    self.execute_writes(writes)
+                    self.connection.commit()
+                    failed = []
+                except sqlite3.Error:
+                    self.connection.rollback()
+                    failed = self.execute_writes_one_by_one(writes)
+            
+            metrics.inc("db.rows_written", len(writes) - len(failed))
+            if failed:
+                metrics.inc("db.write_errors", len(failed))
+                self.failed_writes.extend(failed)
+                print(f"[DB] Не записано {len(failed)} из {len(writes)}: {failed[0][2]}")
+                raise failed[0][2]
+    
+    def execute_writes(self, writes):
+        # Подряд идущие одинаковые запросы - одним executemany
+        batch_sql, batch = None, []
+        for sql, params in writes:
+            if sql != batch_sql and batch:
+                self.cursor.executemany(batch_sql, batch)
+                batch = []
+            batch_sql = sql
+            batch.append(params)
+        self.cursor.executemany(batch_sql, batch)
+    
+    def execute_writes_one_by_one(self, writes):
+        """Пишет записи по одной в одной транзакции, возвращает неудачные (sql, параметры, ошибка)."""
+        import sqlite3
+        
+        failed = []
+        for sql, params in writes:
+            try:
+                self.cursor.execute(sql, params)
+            except sqlite3.Error as e:
+                failed.append((sql, params, e))
+        self.connection.commit()
+        return failed
+    
+    def flush_in_background(self):
+        # Из потока таймера ошибку некому пробросить: печатаем, запись уже в failed_writes
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[DB] Ошибка отложенной записи: {e}")
+    
+    def query(self, sql, params=()):
+        with self.lock:
+            self.flush()
+            with metrics.timed("db.query"):
+                self.cursor.execute(sql, params)
+                return self.cursor.fetchall()
+    
+    def save_mood_result(self, cat_type, score, answers, user_id=DEFAULT_USER):
+        now = datetime.now()
+        date = now.strftime("%Y-%m-%d %H:%M:%S")
+        answers_str = ",".join(map(str, answers))
+        
+        self.queue_write('''
+            INSERT INTO mood_results (date, cat_type, score, answers, ts, user_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (date, cat_type, score, answers_str, int(now.timestamp()), user_id))
+        
+        if self.profile["log_saves"]:
+            print(f"[DB] Сохранён результат теста: {cat_type}")
+    
+    def save_tarot_reading(self, cards, prediction, user_id=DEFAULT_USER):
+        now = datetime.now()
+        date = now.strftime("%Y-%m-%d %H:%M:%S")
+        card_names = [card.name if card else "" for card in cards]
+        while len(card_names) < 3:
+            card_names.append("")
+        
+        self.queue_write('''
+            INSERT INTO tarot_readings 
+            (date, card1_name, card2_name, card3_name, 
+             prediction_love, prediction_career, prediction_finance, ts, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            date, 
+            card_names[0], card_names[1], card_names[2],
+            prediction.get('love', ''),
+            prediction.get('career', ''),
+            prediction.get('finance', ''),
+            int(now.timestamp()),
+            user_id
+        ))
+        
+        if self.profile["log_saves"]:
+            print(f"[DB] Сохранён расклад таро")
+    
+    # Все чтения ограничены одним пользователем.
+    # История выбирается по (user_id, ts), чтобы работали индексы из migrate_users,
+    # дата для отображения восстанавливается из ts в прежнем формате.
+    # Тренды и статистика читаются из сводных таблиц.
+    
+    def get_mood_history(self, limit=20, user_id=DEFAULT_USER):
+        return self.query('''
+            SELECT datetime(ts, 'unixepoch', 'localtime'), cat_type, score FROM mood_results
+            WHERE user_id = ?
+            ORDER BY ts DESC, id DESC LIMIT ?
+        ''', (user_id, limit))
+    
+    def get_tarot_history(self, limit=20, user_id=DEFAULT_USER):
+        return self.query('''
+            SELECT datetime(ts, 'unixepoch', 'localtime'), card1_name, card2_name, card3_name,
+                   prediction_love, prediction_career, prediction_finance FROM tarot_readings
+            WHERE user_id = ?
+            ORDER BY ts DESC, id DESC LIMIT ?
+        ''', (user_id, limit))
+    
+    def get_mood_history_page(self, before=None, limit=50, user_id=DEFAULT_USER):
+        """
+        Страница истории тестов для постраничной прокрутки по ключу (ts, id).
+        before - ключ последней уже показанной строки или None для первой страницы.
+        Строки: (ts, id, дата, тип_кота, баллы)
+        """
+        where, params = self.keyset_condition(before, user_id)
+        return self.query(f'''
+            SELECT ts, id, datetime(ts, 'unixepoch', 'localtime'), cat_type, score FROM mood_results
+            {where}
+            ORDER BY ts DESC, id DESC LIMIT ?
+        ''', (*params, limit))
+    
+    def get_tarot_history_page(self, before=None, limit=50, user_id=DEFAULT_USER):
+        """
+        Страница истории раскладов без текстов предсказаний
+        (их загружает get_tarot_reading по id).
+        Строки: (ts, id, дата, карта1, карта2, карта3)
+        """
+        where, params = self.keyset_condition(before, user_id)
+        return self.query(f'''
+            SELECT ts, id, datetime(ts, 'unixepoch', 'localtime'), card1_name, card2_name, card3_name
+            FROM tarot_readings
+            {where}
+            ORDER BY ts DESC, id DESC LIMIT ?
+        ''', (*params, limit))
+    
+    @staticmethod
+    def keyset_condition(before, user_id):
+        if before is None:
+            return "WHERE user_id = ?", (user_id,)
+        return "WHERE user_id = ? AND (ts, id) < (?, ?)", (user_id, *before)
+    
+    def get_tarot_reading(self, reading_id, user_id=DEFAULT_USER):
+        """Предсказания одного расклада: (любовь, карьера, финансы)."""
+        rows = self.query('''
+            SELECT prediction_love, prediction_career, prediction_finance
+            FROM tarot_readings WHERE id = ? AND user_id = ?
+        ''', (reading_id, user_id))
+        return rows[0] if rows else ("", "", "")
+    
+    def get_mood_statistics(self, user_id=DEFAULT_USER):
+        return self.query('''
+            SELECT cat_type, count FROM mood_cat_counts
+            WHERE user_id = ? AND count > 0 ORDER BY count DESC
+        ''', (user_id,))
+    
+    def get_mood_trend(self, days=14, user_id=DEFAULT_USER):
+        """
+        Получает тренд настроения за последние N дней.
+        Возвращает список кортежей (дата, средний_балл, количество_тестов)
+        """
+        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        
+        return self.query('''
+            SELECT day, score_sum * 1.0 / count as avg_score, count
+            FROM mood_daily
+            WHERE user_id = ? AND day >= ? AND count > 0
+            ORDER BY day ASC
+        ''', (user_id, start_date))
+    
+    def get_mood_by_weekday(self, user_id=DEFAULT_USER):
+        """
+        Получает среднее настроение по дням недели.
+        0 = Воскресенье, 1 = Понедельник, ... 6 = Суббота (SQLite strftime %w)
+        """
+        return self.query('''
+            SELECT weekday, score_sum * 1.0 / count as avg_score, count
+            FROM mood_weekday
+            WHERE user_id = ? AND count > 0
+            ORDER BY weekday
+        ''', (user_id,))
+    
+    # --- импорт и экспорт ---
+    
+    def iter_history(self, table, batch_size=1000):
+        """
+        Все строки таблицы истории по порядку id, словарями по HISTORY_COLUMNS.
+        Читает пачками через fetchmany, так что память не растёт с размером таблицы.
+        """
+        columns = HISTORY_COLUMNS[table]
+        self.flush()
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(columns, row))
+        finally:
+            cursor.close()
+    
+    def import_history(self, table, rows, batch_size=5000):
+        """
+        Добавляет строки истории пачками по batch_size, каждая пачка - одна транзакция.
+        Строка пропускается, если у того же пользователя уже есть запись с той же
+        датой и тем же содержимым: повторный импорт того же файла ничего не добавит.
+        Возвращает (прочитано, добавлено).
+        """
+        sql = history_import_sql(table)
+        read = inserted = 0
+        batch = []
+        for row in rows:
+            values = history_row_values(table, row)
+            batch.append(values + values)
+            read += 1
+            if len(batch) >= batch_size:
+                inserted += self.insert_batch(sql, batch)
+                batch = []
+        if batch:
+            inserted += self.insert_batch(sql, batch)
+        
+        print(f"[DB] Импорт {table}: прочитано {read}, добавлено {inserted}")
+        return read, inserted
+    
+    def insert_batch(self, sql, batch):
+        with self.lock:
+            self.flush()
+            self.cursor.executemany(sql, batch)
+            # rowcount у executemany - сумма по всем строкам, без изменений из триггеров
+            inserted = self.cursor.rowcount
+            self.connection.commit()
+            return inserted
+    
+    def close(self):
+        with self.lock:
+            try:
+                self.flush()
+            finally:
+                self.connection.close()
+        print("[DB] Соединение закрыто")
+
+
+def history_import_sql(table):
+    """
+    INSERT одной строки истории, который ничего не делает для дубликата.
+    Параметры - значения HISTORY_COLUMNS дважды: для вставки и для поиска дубликата.
+    """
+    columns = HISTORY_COLUMNS[table]
+    key_columns, payload_columns = columns[:3], columns[3:]
+    # Ключ (user_id, ts) ищется по индексу migrate_users, содержимое сравнивается
+    # с IFNULL, потому что в CSV пустая строка и NULL неотличимы
+    duplicate = " AND ".join(
+        [f"{column} = ?" for column in key_columns] +
+        [f"IFNULL({column}, '') = IFNULL(?, '')" for column in payload_columns]
+    )
+    return f'''
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join('?' for _ in columns)}
+        WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {duplicate})
+    '''
+
+
+def history_row_values(table, row):
+    """
+    Приводит строку из файла к кортежу значений HISTORY_COLUMNS.
+    Числа из CSV приходят строками, ts восстанавливается из date, если его нет.
+    """
+    values = []
+    for column in HISTORY_COLUMNS[table]:
+        value = row.get(column)
+        if value == "" and column in HISTORY_INT_COLUMNS + ("user_id",):
+            value = None
+        if value is not None and column in HISTORY_INT_COLUMNS:
+            value = int(value)
+        values.append(value)
+    
+    user_id, ts, date = values[:3]
+    if not date:
+        raise ValueError(f"строка без даты: {row}")
+    if ts is None:
+        values[1] = int(datetime.strptime(date, "%Y-%m-%d %H:%M:%S").timestamp())
+    if user_id is None:
+        values[0] = DEFAULT_USER
+    return tuple(values)
+
+
+def history_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def export_history(db, table, path):
+    """
+    Выгружает таблицу истории в JSONL или CSV (по расширению файла).
+    Строки пишутся по мере чтения из базы.
+    Запуск: python main.py export mood_results backup.jsonl
+    """
+    rows = db.iter_history(table)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if history_format(path) == "csv":
+            writer = csv.DictWriter(f, fieldnames=HISTORY_COLUMNS[table])
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+    print(f"[DB] Экспорт {table}: {count} строк в {path}")
+    return count
+
+
+def read_history_file(path):
+    """Построчно читает файл экспорта, отдаёт словари."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if history_format(path) == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def import_history(db, table, path):
+    """
+    Загружает файл экспорта в таблицу истории, дубликаты пропускаются.
+    Запуск: python main.py import mood_results backup.jsonl
+    """
+    return db.import_history(table, read_history_file(path))
+
+
+class ShardedDatabase:
+    """
+    Несколько файлов SQLite, пользователи раскладываются по ним по хэшу user_id.
+    У каждого файла своя блокировка записи WAL и свой размер, поэтому
+    при росте числа пользователей запись не упирается в один файл.
+    Интерфейс тот же, что у Database: все данные пользователя лежат в одном шарде.
+    """
+    
+    def __init__(self, db_name="cat_oracle.db", shards=4, profile="fast"):
+        base, ext = os.path.splitext(db_name)
+        self.shards = [Database(f"{base}.{i}{ext}", profile=profile) for i in range(shards)]
+    
+    def shard(self, user_id):
+        import hashlib
+        
+        # sha1, а не hash(): встроенный hash строк меняется между запусками
+        digest = hashlib.sha1(user_id.encode("utf-8")).digest()
+        return self.shards[int.from_bytes(digest[:4], "big") % len(self.shards)]
+    
+    def save_mood_result(self, cat_type, score, answers, user_id=DEFAULT_USER):
+        self.shard(user_id).save_mood_result(cat_type, score, answers, user_id)
+    
+    def save_tarot_reading(self, cards, prediction, user_id=DEFAULT_USER):
+        self.shard(user_id).save_tarot_reading(cards, prediction, user_id)
+    
+    def get_mood_history(self, limit=20, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_mood_history(limit, user_id)
+    
+    def get_tarot_history(self, limit=20, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_tarot_history(limit, user_id)
+    
+    def get_mood_history_page(self, before=None, limit=50, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_mood_history_page(before, limit, user_id)
+    
+    def get_tarot_history_page(self, before=None, limit=50, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_tarot_history_page(before, limit, user_id)
+    
+    def get_tarot_reading(self, reading_id, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_tarot_reading(reading_id, user_id)
+    
+    def get_mood_statistics(self, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_mood_statistics(user_id)
+    
+    def get_mood_trend(self, days=14, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_mood_trend(days, user_id)
+    
+    def get_mood_by_weekday(self, user_id=DEFAULT_USER):
+        return self.shard(user_id).get_mood_by_weekday(user_id)
+    
+    def rebuild_aggregates(self, commit=True):
+        for shard in self.shards:
+            shard.rebuild_aggregates(commit)
+    
+    def flush(self):
+        """Сбрасывает буферы всех шардов; ошибка одного не мешает остальным."""
+        import sqlite3
+        
+        errors = []
+        for shard in self.shards:
+            try:
+                shard.flush()
+            except sqlite3.Error as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+    
+    def iter_history(self, table, batch_size=1000):
+        """Строки таблицы истории всех шардов: шард за шардом, внутри шарда по id."""
+        for shard in self.shards:
+            yield from shard.iter_history(table, batch_size)
+    
+    def import_history(self, table, rows, batch_size=5000):
+        """
+        Как Database.import_history, но каждая строка уходит в шард своего user_id.
+        Пачки копятся отдельно для каждого шарда.
+        """
+        sql = history_import_sql(table)
+        read = inserted = 0
+        batches = {}
+        for row in rows:
+            values = history_row_values(table, row)
+            shard = self.shard(values[0])
+            batch = batches.setdefault(shard, [])
+            batch.append(values + values)
+            read += 1
+            if len(batch) >= batch_size:
+                inserted += shard.insert_batch(sql, batch)
+                batch.clear()
+        for shard, batch in batches.items():
+            if batch:
+                inserted += shard.insert_batch(sql, batch)
+        
+        print(f"[DB] Импорт {table}: прочитано {read}, добавлено {inserted}")
+        return read, inserted
+    
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+
+class HistoryPages:
+    """
+    Окно страниц истории для виртуального списка.
+    В памяти не больше max_pages страниц, остальные выбрасываются.
+    Для каждой страницы запоминается только ключ (ts, id), с которого она
+    начинается, и выброшенная страница перечитывается по тому же ключу.
+    fetch_page(before, limit) - как Database.get_mood_history_page.
+    """
+    
+    def __init__(self, fetch_page, page_size=50, max_pages=4, first_page=None):
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.reset(first_page)
+    
+    def reset(self, first_page=None):
+        """Начинает заново с первой страницы (например, после новых записей)."""
+        self.pages = OrderedDict()
+        self.cursors = [None]  # ключ начала каждой страницы, уже прочитанной хоть раз
+        self.known = 0  # сколько строк уже известно
+        self.has_more = True
+        if first_page is not None:
+            self.store(0, first_page)
+    
+    def __len__(self):
+        return self.known
+    
+    def store(self, number, rows):
+        if number == len(self.cursors) - 1:
+            # Самая дальняя страница: двигаем границу известного
+            self.known = number * self.page_size + len(rows)
+            self.has_more = len(rows) >= self.page_size
+            if self.has_more:
+                self.cursors.append((rows[-1][0], rows[-1][1]))
+        self.pages[number] = rows
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+    
+    def page(self, number):
+        rows = self.pages.get(number)
+        if rows is None:
+            rows = self.fetch_page(self.cursors[number], self.page_size)
+            self.store(number, rows)
+        else:
+            self.pages.move_to_end(number)
+        return rows
+    
+    def load_more(self):
+        if self.has_more:
+            self.page(len(self.cursors) - 1)
+    
+    def row(self, index):
+        rows = self.page(index // self.page_size)
+        offset = index % self.page_size
+        return rows[offset] if offset < len(rows) else None
+
+
+class ResponseCache:
+    """
+    Кэш ответов внешних API в отдельной базе SQLite.
+    Предсказание зависит только от трёх карт, перевод - только от текста,
+    поэтому повторные расклады обслуживаются без сети.
+    Используется из фонового потока, поэтому доступ под замком.
+    """
+    
+    def __init__(self, db_path, translation_ttl_days=30, max_translations=5000):
+        import sqlite3
+        
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.translation_ttl = translation_ttl_days * 24 * 60 * 60
+        self.max_translations = max_translations
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.create_tables()
+    
+    def create_tables(self):
+        with self.lock:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS prediction_cache (
+                    love_id INTEGER NOT NULL,
+                    career_id INTEGER NOT NULL,
+                    finance_id INTEGER NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    PRIMARY KEY (love_id, career_id, finance_id)
+                )
+            ''')
+            
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS translation_cache (
+                    text_hash TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    PRIMARY KEY (text_hash, target_language)
+                )
+            ''')
+            
+            self.connection.execute('''
+                CREATE INDEX IF NOT EXISTS idx_translation_cache_created
+                ON translation_cache (created_at)
+            ''')
+            
+            self.connection.commit()
+    
+    @staticmethod
+    def text_hash(text):
+        import hashlib
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def get_prediction(self, card_ids):
+        with self.lock:
+            row = self.connection.execute('''
+                SELECT response FROM prediction_cache
+                WHERE love_id = ? AND career_id = ? AND finance_id = ?
+            ''', tuple(card_ids)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save_prediction(self, card_ids, response):
+        with self.lock:
+            self.connection.execute('''
+                INSERT OR REPLACE INTO prediction_cache
+                (love_id, career_id, finance_id, response, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (*card_ids, json.dumps(response, ensure_ascii=False), int(time.time())))
+            self.connection.commit()
+    
+    def get_translations(self, texts, target_language):
+        """Возвращает {текст: перевод} для найденных в кэше и не устаревших строк."""
+        hashes = {self.text_hash(text): text for text in texts}
+        if not hashes:
+            return {}
+        
+        placeholders = ",".join("?" * len(hashes))
+        min_created = int(time.time()) - self.translation_ttl
+        with self.lock:
+            rows = self.connection.execute(f'''
+                SELECT text_hash, translated FROM translation_cache
+                WHERE target_language = ? AND created_at >= ?
+                AND text_hash IN ({placeholders})
+            ''', (target_language, min_created, *hashes)).fetchall()
+        return {hashes[text_hash]: translated for text_hash, translated in rows}
+    
+    def save_translations(self, pairs, target_language):
+        now = int(time.time())
+        with self.lock:
+            self.connection.executemany('''
+                INSERT OR REPLACE INTO translation_cache
+                (text_hash, target_language, translated, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', [(self.text_hash(text), target_language, translated, now) for text, translated in pairs])
+            self.evict_translations(now)
+            self.connection.commit()
+    
+    def evict_translations(self, now):
+        # Вызывается под замком: сначала устаревшие, потом самые старые сверх лимита
+        self.connection.execute('''
+            DELETE FROM translation_cache WHERE created_at < ?
+        ''', (now - self.translation_ttl,))
+        self.connection.execute('''
+            DELETE FROM translation_cache WHERE rowid IN (
+                SELECT rowid FROM translation_cache
+                ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_translations,))
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# ============================================================
+# ДАННЫЕ ДЛЯ ТЕСТА НАСТРОЕНИЯ
+# ============================================================
+
+QUESTIONS = [
+    {
+        "text": "Как ты себя чувствуешь прямо сейчас?",
+        "options": [
+            {"text": "Хочу спать и ничего не делать", "score": 1},
+            {"text": "Немного устал(а)", "score": 2},
+            {"text": "Нормально, обычный день", "score": 3},
+            {"text": "Довольно бодро!", "score": 4},
+            {"text": "Полон(на) энергии! 🔥", "score": 5}
+        ]
+    },
+    {
+        "text": "Что бы ты хотел(а) сделать прямо сейчас?",
+        "options": [
+            {"text": "Свернуться клубочком и уснуть", "score": 1},
+            {"text": "Посидеть в тишине", "score": 2},
+            {"text": "Посмотреть что-нибудь", "score": 3},
+            {"text": "Пообщаться с друзьями", "score": 4},
+            {"text": "Активно провести время!", "score": 5}
+        ]
+    },
+    {
+        "text": "Как ты относишься к сегодняшнему дню?",
+        "options": [
+            {"text": "Хочу, чтобы он скорее закончился", "score": 1},
+            {"text": "Как-то не очень...", "score": 2},
+            {"text": "Обычный день", "score": 3},
+            {"text": "Хороший день!", "score": 4},
+            {"text": "Отличный день! Всё супер!", "score": 5}
+        ]
+    },
+    {
+        "text": "Выбери погоду, которая тебе ближе сейчас:",
+        "options": [
+            {"text": "🌧️ Дождь за окном", "score": 1},
+            {"text": "☁️ Пасмурно", "score": 2},
+            {"text": "⛅ Переменная облачность", "score": 3},
+            {"text": "🌤️ Солнце выглядывает", "score": 4},
+            {"text": "☀️ Яркое солнце!", "score": 5}
+        ]
+    },
+    {
+        "text": "Если бы ты был(а) котом, что бы делал(а)?",
+        "options": [
+            {"text": "Спал(а) весь день", "score": 1},
+            {"text": "Лежал(а) и смотрел(а) в окно", "score": 2},
+            {"text": "Гулял(а) по дому", "score": 3},
+            {"text": "Играл(а) с игрушками", "score": 4},
+            {"text": "Носился(ась) как сумасшедший!", "score": 5}
+        ]
+    }
+]
+
+CAT_TYPES = [
+    {
+        "name": "Сонный котик 😴",
+        "description": "Сегодня тебе нужен отдых. Позволь себе расслабиться, "
+                       "как кот на мягком пледе. Не требуй от себя слишком многого.",
+        "min_score": 5, "max_score": 9,
+        "color": "#9E9E9E", "image_folder": "sleepy"
+    },
+    {
+        "name": "Задумчивый кот 🐱",
+        "description": "Ты сегодня в созерцательном настроении. Хорошее время "
+                       "для размышлений и планирования.",
+        "min_score": 10, "max_score": 14,
+        "color": "#78909C", "image_folder": "thoughtful"
+    },
+    {
+        "name": "Довольный котик 😺",
+        "description": "У тебя хорошее, стабильное настроение! Как кот, который "
+                       "поел и теперь доволен жизнью. Мур-мур!",
+        "min_score": 15, "max_score": 19,
+        "color": "#81C784", "image_folder": "happy"
+    },
+    {
+        "name": "Игривый кот 😸",
+        "description": "Ты полон энергии и готов к приключениям! Отличный день "
+                       "для активностей и новых начинаний!",
+        "min_score": 20, "max_score": 22,
+        "color": "#FFB74D", "image_folder": "playful"
+    },
+    {
+        "name": "Кот-ураган 🙀",
+        "description": "Энергия бьёт через край! Ты как кот в 3 часа ночи — "
+                       "готов свернуть горы и носиться по потолку!",
+        "min_score": 23, "max_score": 25,
+        "color": "#FF7043", "image_folder": "crazy"
+    }
+]
+
+IMAGES_FOLDER = "images"
+IMAGE_CACHE_DIR = os.path.join(".cache", "images")
+RESPONSE_CACHE_DB = os.path.join(".cache", "responses.db")
+
+# Названия дней недели (индекс 0 = Воскресенье в SQLite)
+WEEKDAYS = ["Вс", "Пн", "Вт", "Ср", "Чт", "Пт", "Сб"]
+
+
+# ============================================================
+# ФУНКЦИИ ДЛЯ РАБОТЫ С КАРТИНКАМИ
+# ============================================================
+
+def get_random_local_image(folder_name):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    folder_path = os.path.join(script_dir, IMAGES_FOLDER, folder_name)
+    
+    if not os.path.exists(folder_path):
+        return None
+    
+    image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.jfif')
+    images = [f for f in os.listdir(folder_path) if f.lower().endswith(image_extensions)]
+    
+    if not images:
+        return None
+    
+    return os.path.join(folder_path, random.choice(images))
+
+
+def flatten_to_rgb(image):
+    """Переводит картинку в RGB, прозрачность заливается белым."""
+    if image.mode in ('RGBA', 'P', 'LA'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        if 'A' in image.mode:
+            background.paste(image, mask=image.split()[-1])
+        else:
+            background.paste(image)
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def resize_image(image, max_width, max_height, fit=True, resample=None):
+    """
+    fit=True - вписывает картинку в рамку с сохранением пропорций (только уменьшение),
+    fit=False - растягивает ровно до max_width x max_height.
+    resample - фильтр PIL, по умолчанию LANCZOS.
+    """
+    if resample is None:
+        resample = Image.LANCZOS
+    image = flatten_to_rgb(image)
+    
+    if not fit:
+        return image.resize((max_width, max_height), resample)
+    
+    width, height = image.size
+    ratio = min(max_width / width, max_height / height)
+    
+    if ratio < 1:
+        new_width = int(width * ratio)
+        new_height = int(height * ratio)
+        image = image.resize((new_width, new_height), resample)
+    
+    return image
+
+
+# Во сколько раз декодированная картинка должна быть не меньше итоговой.
+# С запасом 2 финальный LANCZOS отличается от полного декодирования меньше
+# чем на 0.5/255 в среднем на фото из images/ (python main.py bench-images).
+DECODE_HEADROOM = 2
+
+
+# (путь к PNG, mtime и размер JPEG-двойника) -> файл, который стоит декодировать
+cheaper_sources = {}
+
+
+def cheaper_source(image_path):
+    """
+    Для PNG из папки png/ берёт JPEG с тем же именем из соседней jpg/, если он есть
+    и не progressive: обычный JPEG декодируется в несколько раз быстрее PNG,
+    а progressive - медленнее.
+    Ответ запоминается, пока JPEG не изменится, так что повторный вызов
+    обходится одним stat без открытия файлов.
+    """
+    folder, name = os.path.split(image_path)
+    if os.path.basename(folder) != "png" or not name.lower().endswith(".png"):
+        return image_path
+    
+    jpg_path = os.path.join(os.path.dirname(folder), "jpg", name[:-4] + ".jpg")
+    try:
+        stat = os.stat(jpg_path)
+    except OSError:
+        return image_path
+    cache_key = (image_path, stat.st_mtime_ns, stat.st_size)
+    source = cheaper_sources.get(cache_key)
+    if source is not None:
+        return source
+    
+    source = jpg_path
+    try:
+        with Image.open(jpg_path) as jpg:
+            if jpg.info.get("progressive"):
+                source = image_path
+    except OSError:
+        source = image_path
+    cheaper_sources[cache_key] = source
+    return source
+
+
+def open_scaled(image_path, max_width, max_height, fit=True):
+    """
+    Открывает картинку и уменьшает её до рамки самым дешёвым способом:
+    JPEG декодируется сразу в 1/2..1/8 размера (draft), остальное сначала
+    уменьшается в целое число раз (reduce), и только потом - точный resize.
+    """
+    with Image.open(cheaper_source(image_path)) as source:
+        image = source
+        width, height = image.size
+        if fit:
+            ratio = min(max_width / width, max_height / height, 1)
+            target = (width * ratio, height * ratio)
+        else:
+            target = (max_width, max_height)
+        needed = (max(int(target[0] * DECODE_HEADROOM), 1), max(int(target[1] * DECODE_HEADROOM), 1))
+        
+        if image.format == "JPEG":
+            image.draft(image.mode, needed)
+        image = flatten_to_rgb(image)
+        
+        factor = min(image.width // needed[0], image.height // needed[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+        image = resize_image(image, max_width, max_height, fit)
+        
+        # Если уменьшать было нечего, это всё ещё открытый файл:
+        # копируем, иначе картинка закроется вместе с with
+        if image is source:
+            image = source.copy()
+        return image
+
+
+class ImageCache:
+    """
+    Кэш уменьшенных картинок.
+    Ключ - (путь, mtime, размер файла, рамка, версия), где путь - тот файл,
+    который реально декодируется (см. cheaper_source). Два уровня:
+    LRU в памяти с лимитом по байтам и готовые PNG в папке кэша на диске.
+    """
+    
+    # Меняется, когда меняется способ уменьшения, чтобы старые файлы на диске не использовались
+    VERSION = 2
+    
+    def __init__(self, cache_dir, max_bytes=32 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()  # кэш прогревается и из фоновых потоков
+    
+    @classmethod
+    def make_key(cls, image_path, max_width, max_height, fit=True):
+        import hashlib
+        
+        stat = os.stat(image_path)
+        raw = (f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|"
+               f"{max_width}x{max_height}|{int(fit)}|v{cls.VERSION}")
+        return hashlib.sha1(raw.encode()).hexdigest()
+    
+    def get(self, image_path, max_width, max_height, fit=True):
+        # Ключ по файлу, который будет декодирован: правка JPEG-двойника PNG
+        # тоже должна сбрасывать кэш
+        image_path = cheaper_source(image_path)
+        key = self.make_key(image_path, max_width, max_height, fit)
+        
+        with self.lock:
+            image = self.memory.get(key)
+            if image is not None:
+                self.memory.move_to_end(key)
+                metrics.inc("image.cache_memory_hit")
+                return image
+        
+        disk_path = os.path.join(self.cache_dir, key[:2], key + ".png")
+        image = self.load_from_disk(disk_path)
+        if image is not None:
+            metrics.inc("image.cache_disk_hit")
+        else:
+            metrics.inc("image.cache_miss")
+            with metrics.timed("image.decode_resize"):
+                image = open_scaled(image_path, max_width, max_height, fit)
+            self.save_to_disk(disk_path, image)
+        
+        self.put_to_memory(key, image)
+        return image
+    
+    def load_from_disk(self, disk_path):
+        """Готовая картинка из кэша на диске или None. Битый файл удаляется."""
+        if not os.path.exists(disk_path):
+            return None
+        try:
+            with metrics.timed("image.disk_load"):
+                image = Image.open(disk_path)
+                image.load()
+            return image
+        except Exception as e:
+            print(f"[CACHE] Битый файл в кэше, будет пересобран: {e}")
+            try:
+                os.remove(disk_path)
+            except OSError:
+                pass
+            return None
+    
+    def save_to_disk(self, disk_path, image):
+        # Кэш на диске - только ускорение: картинка уже в памяти, ошибка записи не страшна
+        tmp_path = disk_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, disk_path)
+        except Exception as e:
+            print(f"[CACHE] Не удалось сохранить на диск: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def put_to_memory(self, key, image):
+        size = image.width * image.height * len(image.getbands())
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.memory:
+                return
+            self.memory[key] = image
+            self.memory_bytes += size
+            while self.memory_bytes > self.max_bytes:
+                _, old = self.memory.popitem(last=False)
+                self.memory_bytes -= old.width * old.height * len(old.getbands())
+    
+    def clear_memory(self):
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+
+
+image_cache = ImageCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), IMAGE_CACHE_DIR))
+
+
+# ============================================================
+# КЛАССЫ ДЛЯ ТАРО
+# ============================================================
+
+TAROT_CARD_SIZE = (150, 280)
+TAROT_ATLAS_IMAGE = "atlas.jpg"
+TAROT_ATLAS_INDEX = "atlas.json"
+TAROT_ATLAS_COLUMNS = 13
+
+
+def build_tarot_atlas(quality=85):
+    """
+    Собирает все карты из markup.json в один JPEG-лист заранее
+    уменьшенных карт (images/tarot/atlas.jpg) и индекс смещений
+    (images/tarot/atlas.json). Запуск: python main.py build-atlas
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    tarot_dir = os.path.join(script_dir, IMAGES_FOLDER, "tarot")
+    
+    with open(os.path.join(script_dir, 'markup.json'), 'r') as markup_file:
+        markup = json.load(markup_file)
+    
+    card_width, card_height = TAROT_CARD_SIZE
+    rows = (len(markup) + TAROT_ATLAS_COLUMNS - 1) // TAROT_ATLAS_COLUMNS
+    sheet = Image.new('RGB', (card_width * TAROT_ATLAS_COLUMNS, card_height * rows), (255, 255, 255))
+    index = {"card_size": [card_width, card_height], "cards": {}}
+    
+    for i, card in enumerate(markup):
+        x = (i % TAROT_ATLAS_COLUMNS) * card_width
+        y = (i // TAROT_ATLAS_COLUMNS) * card_height
+        with Image.open(os.path.join(tarot_dir, "png", card['name'] + '.png')) as img:
+            sheet.paste(img.convert('RGB').resize(TAROT_CARD_SIZE, Image.LANCZOS), (x, y))
+        index["cards"][card['name']] = [x, y]
+    
+    sheet.save(os.path.join(tarot_dir, TAROT_ATLAS_IMAGE), quality=quality, optimize=True)
+    with open(os.path.join(tarot_dir, TAROT_ATLAS_INDEX), 'w') as index_file:
+        json.dump(index, index_file, indent=1)
+    
+    print(f"[ATLAS] Собрано карт: {len(markup)}, лист {sheet.size[0]}x{sheet.size[1]}")
+
+
+class TarotAtlas:
+    """
+    Лист уменьшенных карт таро. Декодируется один раз,
+    дальше карты вырезаются из него в памяти.
+    """
+    
+    def __init__(self, image_path, index_path):
+        with open(index_path, 'r') as index_file:
+            index = json.load(index_file)
+        self.card_size = tuple(index["card_size"])
+        self.offsets = index["cards"]
+        self.sheet = Image.open(image_path)
+        self.sheet.load()
+    
+    def crop(self, name):
+        if name not in self.offsets:
+            return None
+        x, y = self.offsets[name]
+        width, height = self.card_size
+        return self.sheet.crop((x, y, x + width, y + height))
+
+
+_tarot_atlas = None
+_tarot_atlas_lock = threading.Lock()
+
+
+def get_tarot_atlas():
+    """
+    Возвращает общий атлас карт или None, если он ещё не собран.
+    Лист декодируется около 50-90 мс, поэтому окно заранее вызывает эту функцию
+    в фоновом потоке; под замком, чтобы лист не декодировался дважды.
+    """
+    global _tarot_atlas
+    with _tarot_atlas_lock:
+        if _tarot_atlas is None:
+            _tarot_atlas = load_tarot_atlas()
+    return _tarot_atlas or None
+
+
+def load_tarot_atlas():
+    """Атлас из images/tarot или False, если его нет или он испорчен."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    tarot_dir = os.path.join(script_dir, IMAGES_FOLDER, "tarot")
+    try:
+        return TarotAtlas(os.path.join(tarot_dir, TAROT_ATLAS_IMAGE),
+                          os.path.join(tarot_dir, TAROT_ATLAS_INDEX))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[ATLAS] Атлас недоступен, используются PNG: {e}")
+        return False
+
+
+class TarotCard:
+    __slots__ = ("name", "value", "image_path")
+    
+    def __init__(self, name, value, image_path):
+        self.name = name
+        self.value = value
+        self.image_path = image_path
+    
+    def load_image(self):
+        """Картинка карты размера TAROT_CARD_SIZE: из атласа, иначе из PNG."""
+        atlas = get_tarot_atlas()
+        if atlas and atlas.card_size == TAROT_CARD_SIZE:
+            image = atlas.crop(self.name)
+            if image is not None:
+                return image
+        return image_cache.get(self.image_path, *TAROT_CARD_SIZE, fit=False)
+
+
+TAROT_PNG_FOLDER = 'images/tarot/png/'
+
+# Раскладки: названия позиций по порядку вытягивания.
+# Предсказание API строится по первым трём картам любой раскладки.
+SPREADS = {
+    "three": ("Любовь", "Карьера", "Финансы"),
+    "celtic_cross": (
+        "Суть ситуации", "Препятствие", "Основа", "Прошлое", "Цель",
+        "Ближайшее будущее", "Вы сами", "Окружение", "Надежды и страхи", "Итог",
+    ),
+}
+
+_tarot_registry = None
+
+
+def get_tarot_registry():
+    """Все карты из markup.json. Читается один раз, колоды хранят только индексы."""
+    global _tarot_registry
+    if _tarot_registry is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(script_dir, 'markup.json'), 'r') as markup_file:
+            markup = json.load(markup_file)
+        _tarot_registry = tuple(
+            TarotCard(i['name'], i['id'], os.path.join(script_dir, TAROT_PNG_FOLDER + i['name'] + '.png'))
+            for i in markup
+        )
+    return _tarot_registry
+
+
+class Deck:
+    """
+    Колода - перестановка индексов общего реестра карт.
+    Вытягивание - один шаг тасования Фишера-Йетса: случайная карта из
+    оставшихся меняется местами с последней оставшейся, O(1).
+    seed делает последовательность раскладов воспроизводимой.
+    """
+    
+    def __init__(self, seed=None):
+        self.registry = get_tarot_registry()
+        self.random = random.Random(seed)
+        self.order = list(range(len(self.registry)))
+        self.remaining = len(self.order)
+    
+    def __len__(self):
+        return self.remaining
+    
+    def pull_card(self):
+        if not self.remaining:
+            raise IndexError("колода пуста")
+        last = self.remaining - 1
+        i = self.random.randrange(self.remaining)
+        self.order[i], self.order[last] = self.order[last], self.order[i]
+        self.remaining = last
+        return self.registry[self.order[last]]
+    
+    def pull(self, count):
+        return [self.pull_card() for _ in range(count)]
+    
+    def reset(self):
+        # Любая перестановка годится: карты всё равно выбираются случайным индексом
+        self.remaining = len(self.order)
+
+
+# ============================================================
+# ВНЕШНИЕ API
+# ============================================================
+
+class ApiUnavailableError(Exception):
+    """Сервис временно отключён предохранителем, запрос не отправлялся."""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель: после failure_threshold ошибок подряд сервис считается
+    недоступным на reset_timeout секунд, запросы сразу отклоняются.
+    Потом пропускается один пробный запрос.
+    """
+    
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+    
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()  # пробный запрос, остальные ждут
+                return True
+            return False
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ApiClient:
+    """
+    Общий HTTP-клиент для внешних API: одна requests.Session с пулом
+    keep-alive соединений, таймауты и повторы для каждого сервиса,
+    предохранитель и счётчики запросов, ошибок и задержек.
+    """
+    
+    ENDPOINTS = {
+        # (connect, read) таймауты, число повторов, базовая пауза между повторами
+        "astrology": {"timeout": (3, 10), "retries": 2, "backoff": 0.5},
+        "translate": {"timeout": (3, 10), "retries": 2, "backoff": 0.5},
+    }
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(self):
+        self.session = None
+        # Клиент общий для потоков окна и сервера: сессия и счётчики под замком
+        self.lock = threading.Lock()
+        self.breakers = {name: CircuitBreaker() for name in self.ENDPOINTS}
+        self.stats = {name: {"requests": 0, "errors": 0, "retries": 0, "rejected": 0, "total_time": 0.0}
+                      for name in self.ENDPOINTS}
+    
+    def get_session(self):
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                self.session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+                self.session.mount("https://", adapter)
+                self.session.mount("http://", adapter)
+                self.session.verify = False
+            return self.session
+    
+    def post(self, endpoint, url, **kwargs):
+        """POST с повторами. Возвращает разобранный JSON или бросает исключение."""
+        import requests
+        
+        config = self.ENDPOINTS[endpoint]
+        breaker = self.breakers[endpoint]
+        stats = self.stats[endpoint]
+        
+        if not breaker.allow():
+            self.count(stats, "rejected")
+            raise ApiUnavailableError(f"{endpoint}: сервис временно недоступен")
+        
+        session = self.get_session()
+        last_error = None
+        upstream_down = False
+        
+        for attempt in range(config["retries"] + 1):
+            if attempt:
+                self.count(stats, "retries")
+                time.sleep(config["backoff"] * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            
+            self.count(stats, "requests")
+            started = time.perf_counter()
+            try:
+                r = session.post(url, timeout=config["timeout"], **kwargs)
+                if r.status_code in self.RETRY_STATUSES:
+                    raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
+                r.raise_for_status()
+                result = r.json()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                last_error = e
+                self.count(stats, "errors")
+                metrics.inc(f"http.{endpoint}.errors")
+                status = e.response.status_code if e.response is not None else None
+                # Предохранитель срабатывает только на признаки падения сервиса:
+                # 5xx, таймауты и обрыв соединения. 4xx - ошибка самого запроса
+                upstream_down = status is None or status >= 500
+                if status is not None and status not in self.RETRY_STATUSES:
+                    break
+                continue
+            except ValueError as e:
+                last_error = e  # ответ не JSON, повтор не поможет
+                upstream_down = False
+                self.count(stats, "errors")
+                break
+            finally:
+                elapsed = time.perf_counter() - started
+                self.count(stats, "total_time", elapsed)
+                metrics.observe(f"http.{endpoint}", elapsed)
+            
+            breaker.record_success()
+            return result
+        
+        if upstream_down:
+            breaker.record_failure()
+        else:
+            breaker.record_success()  # сервис ответил, хоть и ошибкой
+        raise last_error
+    
+    def count(self, stats, name, value=1):
+        with self.lock:
+            stats[name] += value
+    
+    def get_stats(self):
+        snapshot = {}
+        for name, stats in self.stats.items():
+            with self.lock:
+                snapshot[name] = dict(stats)
+            snapshot[name]["avg_time"] = stats["total_time"] / stats["requests"] if stats["requests"] else 0.0
+            snapshot[name]["circuit_open"] = self.breakers[name].opened_at is not None
+        return snapshot
+    
+    def close(self):
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+
+api_client = ApiClient()
+
+# Адреса можно подменить переменными окружения, например на локальную заглушку
+ASTROLOGY_API_URL = os.getenv("ASTROLOGY_API_URL", "https://json.astrologyapi.com/v1/tarot_predictions")
+TRANSLATE_API_URL = os.getenv("TRANSLATE_API_URL", "https://translate.api.cloud.yandex.net/translate/v2/translate")
+
+
+PREDICTION_FALLBACK = {
+    'love': 'Не удалось получить предсказание. Попробуйте позже.',
+    'career': 'Не удалось получить предсказание. Попробуйте позже.',
+    'finance': 'Не удалось получить предсказание. Попробуйте позже.'
+}
+
+
+PREDICTION_TOPICS = ('love', 'career', 'finance')
+
+_translator_config = None
+_response_cache = None
+
+
+def get_response_cache():
+    """Общий кэш ответов API, открывается при первом обращении."""
+    global _response_cache
+    if _response_cache is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        _response_cache = ResponseCache(os.path.join(script_dir, RESPONSE_CACHE_DB))
+    return _response_cache
+
+
+def get_translator_config():
+    """Ключ и folderId Яндекс-переводчика из .env, читаются один раз."""
+    global _translator_config
+    if _translator_config is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _translator_config = (os.getenv("API_KEY"), os.getenv("folderId"))
+    return _translator_config
+
+
+def translate_texts(texts, target_language="ru"):
+    """
+    Переводит список строк одним запросом к Яндекс-переводчику.
+    Результаты возвращаются в том же порядке, что и texts.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    
+    cache = get_response_cache()
+    cached = cache.get_translations(texts, target_language)
+    pending = list(dict.fromkeys(text for text in texts if text not in cached))
+    metrics.inc("translate.cache_hit", len(texts) - len(pending))
+    
+    if pending:
+        metrics.inc("translate.cache_miss", len(pending))
+        with metrics.timed("translate.request"):
+            translated = request_translations(pending, target_language)
+        cache.save_translations(zip(pending, translated), target_language)
+        cached.update(zip(pending, translated))
+    
+    return [cached[text] for text in texts]
+
+
+def request_translations(texts, target_language):
+    print(f"[API] Перевод: {len(texts)} строк")
+    
+    api_key, folder_id = get_translator_config()
+    
+    response = api_client.post("translate", TRANSLATE_API_URL,
+        headers={
+            "Authorization": f"Api-Key {api_key}",
+            "Content-Type": "application/json"    
+        },
+        json={
+            "folderId": folder_id,
+            "texts": texts,
+            "targetLanguageCode": target_language
+        }
+    )
+    
+    translations = response['translations']
+    if len(translations) != len(texts):
+        raise ValueError(f"ожидалось {len(texts)} переводов, получено {len(translations)}")
+    return [item['text'] for item in translations]
+
+
+def translate_prediction(text):
+    return translate_texts([text])[0]
+
+
+def get_prediction(cards):
+    import base64
+    
+    card_ids = [card.value for card in cards[:3]]
+    cached = get_response_cache().get_prediction(card_ids)
+    if cached is not None:
+        metrics.inc("prediction.cache_hit")
+        return cached
+    metrics.inc("prediction.cache_miss")
+
+    try:
+        auth = "Basic " + base64.b64encode(
+            "649129:12788919b4c04b4ce2ddd4c31b36260a2aecf2d9".encode()
+        ).decode()
+        
+        response = api_client.post(
+            "astrology",
+            ASTROLOGY_API_URL,
+            headers={
+                'Authorization': auth,
+                'Content-Type': 'application/json'
+            },
+            params={
+                'love': cards[0].value,
+                'career': cards[1].value,
+                'finance': cards[2].value
+            }
+        )
+        if all(isinstance(response.get(topic), str) for topic in PREDICTION_TOPICS):
+            get_response_cache().save_prediction(card_ids, response)
+        return response
+    except Exception as e:
+        print(f"[API] Ошибка: {e}")
+        metrics.inc("prediction.fallback")
+        return dict(PREDICTION_FALLBACK)
+
+
+def fetch_translated_prediction(cards):
+    """
+    Получает предсказание и переводит его на русский.
+    Выполняется в фоновом потоке, Tkinter здесь трогать нельзя.
+    """
+    started = time.perf_counter()
+    prediction = get_prediction(cards)
+    
+    try:
+        translated = translate_texts([prediction[topic] for topic in PREDICTION_TOPICS])
+        prediction = dict(zip(PREDICTION_TOPICS, translated))
+    except Exception as e:
+        print(f"[API] Ошибка перевода: {e}")
+    
+    metrics.observe("prediction.total", time.perf_counter() - started)
+    return prediction
+
+
+class SpreadPrefetcher:
+    """
+    Заранее вытягивает следующие расклады из колоды и в фоне прогревает
+    для них картинки карт, предсказание и перевод, пока пользователь
+    читает текущий расклад. Очередь ограничена depth раскладами.
+    """
+    
+    def __init__(self, executor, deck, depth=1, spread_size=3):
+        self.executor = executor
+        self.deck = deck
+        self.depth = depth
+        self.spread_size = spread_size
+        self.queue = deque()
+    
+    def fill(self):
+        while len(self.queue) < self.depth and len(self.deck) >= self.spread_size:
+            cards = self.deck.pull(self.spread_size)
+            self.queue.append((cards, self.executor.submit(self.warm, cards)))
+    
+    @staticmethod
+    def warm(cards):
+        for card in cards:
+            try:
+                card.load_image()
+            except Exception as e:
+                print(f"[IMG] Ошибка загрузки карты: {e}")
+        return fetch_translated_prediction(cards)
+    
+    def take(self):
+        """Готовый (или ещё догружающийся) расклад: (карты, future) или None."""
+        return self.queue.popleft() if self.queue else None
+    
+    def cancel(self):
+        while self.queue:
+            _, future = self.queue.popleft()
+            future.cancel()
+
+
+# ============================================================
+# ДВИЖОК
+# ============================================================
+
+def score_answers(answers):
+    """Проверяет ответы теста по QUESTIONS и возвращает сумму баллов."""
+    if len(answers) != len(QUESTIONS):
+        raise ValueError(f"нужно {len(QUESTIONS)} ответов, получено {len(answers)}")
+    for number, (question, score) in enumerate(zip(QUESTIONS, answers), start=1):
+        if score not in {option["score"] for option in question["options"]}:
+            raise ValueError(f"вопрос {number}: недопустимый балл {score}")
+    return sum(answers)
+
+
+def build_cat_type_table(cat_types=CAT_TYPES, questions=QUESTIONS):
+    """
+    Таблица «сумма баллов -> индекс в cat_types» для всех сумм, которые
+    вообще можно набрать в questions. Заодно проверяет диапазоны типов:
+    каждая возможная сумма должна попадать ровно в один тип.
+    Возвращает (минимальная_сумма, таблица).
+    """
+    min_total = sum(min(option["score"] for option in question["options"]) for question in questions)
+    max_total = sum(max(option["score"] for option in question["options"]) for question in questions)
+    
+    table = []
+    for total in range(min_total, max_total + 1):
+        matches = [i for i, cat_type in enumerate(cat_types)
+                   if cat_type["min_score"] <= total <= cat_type["max_score"]]
+        if not matches:
+            raise ValueError(f"сумма {total} не попадает ни в один тип кота")
+        if len(matches) > 1:
+            names = ", ".join(cat_types[i]["name"] for i in matches)
+            raise ValueError(f"сумма {total} попадает в несколько типов: {names}")
+        table.append(matches[0])
+    return min_total, table
+
+
+_cat_type_table = None
+
+
+def get_cat_type_table():
+    global _cat_type_table
+    if _cat_type_table is None:
+        _cat_type_table = build_cat_type_table()
+    return _cat_type_table
+
+
+def get_cat_type(total_score):
+    min_total, table = get_cat_type_table()
+    index = total_score - min_total
+    if 0 <= index < len(table):
+        return CAT_TYPES[table[index]]
+    return CAT_TYPES[0]
+
+
+def check_batch_rows(rows, width):
+    """
+    Форма пачки из обычного списка - до любых вычислений: каждая строка
+    должна быть последовательностью из width ответов. Иначе плоский список
+    [1, 2, 3, 4, 5] упал бы TypeError где-то внутри, а не ValueError.
+    """
+    rows = list(rows)
+    for number, row in enumerate(rows):
+        if isinstance(row, (str, bytes)) or not hasattr(row, "__len__"):
+            raise ValueError(f"строка {number}: ожидался список из {width} ответов, получено {row!r}")
+        if len(row) != width:
+            raise ValueError(f"строка {number}: нужно {width} ответов, получено {len(row)}")
+    return rows
+
+
+def score_batch(answers):
+    """
+    Считает пачку тестов разом: answers - матрица N x len(QUESTIONS)
+    (массив NumPy, список строк или плоский array.array длины N * len(QUESTIONS)).
+    Возвращает (суммы, индексы_в_CAT_TYPES): суммы int16, индексы int8.
+    С NumPy это np.ndarray и один векторный проход, без него - array.array
+    и цикл по строкам; оба поддерживают буферный протокол, так что
+    np.asarray() и memoryview() одинаково работают с любым результатом.
+    Недопустимый или нецелый балл в любой строке - ValueError, как в score_answers,
+    неверная форма (плоский список, строка не той длины) - тоже ValueError.
+    """
+    from array import array
+    
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    
+    width = len(QUESTIONS)
+    min_total, table = get_cat_type_table()
+    
+    if np is not None:
+        # Тип проверяется до приведения: 1.5 не должно тихо стать 1,
+        # а True среди чисел в обычном списке NumPy молча превратит в 1
+        if not isinstance(answers, (np.ndarray, array)):
+            answers = check_batch_rows(answers, width)
+            if any(isinstance(score, bool) for row in answers for score in row):
+                raise ValueError("баллы должны быть целыми числами, а не True/False")
+        matrix = np.asarray(answers)
+        if matrix.size and matrix.dtype.kind not in "iu":
+            raise ValueError(f"баллы должны быть целыми числами, получен тип {matrix.dtype}")
+        if matrix.ndim == 1 and matrix.size % width == 0:
+            matrix = matrix.reshape(-1, width)
+        if matrix.ndim != 2 or matrix.shape[1] != width:
+            raise ValueError(f"ожидалась матрица N x {width}, получено {matrix.shape}")
+        # valid[вопрос, балл] - есть ли у вопроса вариант с таким баллом
+        max_option = max(option["score"] for question in QUESTIONS for option in question["options"])
+        valid = np.zeros((width, max_option + 1), dtype=bool)
+        for i, question in enumerate(QUESTIONS):
+            valid[i, [option["score"] for option in question["options"]]] = True
+        
+        in_range = (matrix >= 0) & (matrix <= max_option)
+        ok = in_range & valid[np.arange(width), np.clip(matrix, 0, max_option).astype(np.intp)]
+        if not ok.all():
+            row, column = np.argwhere(~ok)[0]
+            raise ValueError(f"строка {row}, вопрос {column + 1}: недопустимый балл {matrix[row, column]}")
+        
+        totals = matrix.astype(np.int16).sum(axis=1, dtype=np.int16)
+        return totals, np.asarray(table, dtype=np.int8)[totals - min_total]
+    
+    if isinstance(answers, array):
+        if len(answers) % width:
+            raise ValueError(f"длина {len(answers)} не делится на число вопросов {width}")
+        rows = (answers[start:start + width] for start in range(0, len(answers), width))
+    else:
+        rows = check_batch_rows(answers, width)
+    valid = [{option["score"] for option in question["options"]} for question in QUESTIONS]
+    
+    totals, types = array("h"), array("b")
+    for number, row in enumerate(rows):
+        for column, score in enumerate(row):
+            if isinstance(score, bool) or not isinstance(score, int) or score not in valid[column]:
+                raise ValueError(f"строка {number}, вопрос {column + 1}: недопустимый балл {score}")
+        total = sum(row)
+        totals.append(total)
+        types.append(table[total - min_total])
+    return totals, types
+
+
+class MoodQuiz:
+    """Состояние одного прохождения теста настроения."""
+    
+    def __init__(self):
+        self.answers = []
+    
+    @property
+    def current_question(self):
+        return len(self.answers)
+    
+    @property
+    def total_score(self):
+        return sum(self.answers)
+    
+    @property
+    def finished(self):
+        return len(self.answers) >= len(QUESTIONS)
+    
+    def question(self):
+        return QUESTIONS[self.current_question]
+    
+    def answer(self, score):
+        if self.finished:
+            raise ValueError("тест уже пройден")
+        self.answers.append(score)
+
+
+class OracleEngine:
+    """
+    Сервисный слой Котогадалки без интерфейса: тест настроения, колода
+    и расклады таро, предсказания, история и статистика.
+    Окно Tkinter - лишь один из клиентов, движок можно гонять из скриптов.
+    """
+    
+    def __init__(self, db=None, spread_size=3):
+        self._db = db
+        self.spread_size = spread_size
+    
+    @property
+    def db(self):
+        """База открывается (и мигрирует) при первом обращении, а не при запуске окна."""
+        if self._db is None:
+            self._db = Database()
+        return self._db
+    
+    # --- тест настроения ---
+    
+    def submit_mood_test(self, answers, user_id=DEFAULT_USER):
+        """Считает результат, сохраняет его и возвращает (тип_кота, баллы)."""
+        total_score = score_answers(answers)
+        cat_type = get_cat_type(total_score)
+        self.db.save_mood_result(cat_type["name"], total_score, answers, user_id)
+        return cat_type, total_score
+    
+    # --- таро ---
+    
+    def new_deck(self, seed=None):
+        return Deck(seed)
+    
+    def draw_spread(self, deck, spread=None):
+        """
+        Вытягивает spread_size карт или раскладку из SPREADS,
+        при нехватке карт колода собирается заново.
+        """
+        size = len(SPREADS[spread]) if spread else self.spread_size
+        if len(deck) < size:
+            deck.reset()
+        return deck.pull(size)
+    
+    def predict(self, cards):
+        """Предсказание на русском. Блокирует на время сетевых запросов."""
+        return fetch_translated_prediction(cards)
+    
+    def save_reading(self, cards, prediction, user_id=DEFAULT_USER):
+        self.db.save_tarot_reading(cards, prediction, user_id)
+    
+    def tarot_reading(self, deck=None, user_id=DEFAULT_USER, spread=None, seed=None):
+        """
+        Полный расклад одним вызовом: карты, предсказание, сохранение.
+        В историю попадают первые три карты - по ним строится предсказание.
+        """
+        cards = self.draw_spread(deck if deck is not None else self.new_deck(seed), spread)
+        prediction = self.predict(cards)
+        self.save_reading(cards, prediction, user_id)
+        return cards, prediction
+    
+    # --- история и статистика (по одному пользователю) ---
+    
+    def mood_history_page(self, before=None, limit=50, user_id=DEFAULT_USER):
+        return self.db.get_mood_history_page(before, limit, user_id)
+    
+    def tarot_history_page(self, before=None, limit=50, user_id=DEFAULT_USER):
+        return self.db.get_tarot_history_page(before, limit, user_id)
+    
+    def tarot_reading_details(self, reading_id, user_id=DEFAULT_USER):
+        return self.db.get_tarot_reading(reading_id, user_id)
+    
+    def mood_trend(self, days=14, user_id=DEFAULT_USER):
+        return self.db.get_mood_trend(days, user_id)
+    
+    def mood_by_weekday(self, user_id=DEFAULT_USER):
+        return self.db.get_mood_by_weekday(user_id)
+    
+    def mood_statistics(self, user_id=DEFAULT_USER):
+        return self.db.get_mood_statistics(user_id)
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+
+
+class EnginePool:
+    """
+    Пул движков, у каждого своё соединение с базой.
+    Нужен серверу: запросы обрабатываются в нескольких потоках,
+    а соединение SQLite одновременно может использовать только один.
+    """
+    
+    def __init__(self, size=4, db_name="cat_oracle.db", profile="server", shards=1):
+        self.engines = queue.Queue()
+        for _ in range(size):
+            if shards > 1:
+                db = ShardedDatabase(db_name, shards=shards, profile=profile)
+            else:
+                db = Database(db_name, profile=profile)
+            self.engines.put(OracleEngine(db))
+        self.size = size
+    
+    @contextmanager
+    def engine(self):
+        engine = self.engines.get()
+        try:
+            yield engine
+        finally:
+            self.engines.put(engine)
+    
+    def close(self):
+        for _ in range(self.size):
+            self.engines.get().close()
+
+
+def profile_flow(name="tarot", db=None):
+    """
+    Один сценарий целиком под cProfile и tracemalloc:
+    tarot - колода, расклад, картинки карт, предсказание с переводом, сохранение;
+    mood - тест настроения, сохранение, тренды и статистика.
+    Запуск: python main.py profile-flow tarot|mood
+    Без db сценарий пишет в копию cat_oracle.db во временной папке:
+    данные реальные, но настоящая история не засоряется.
+    """
+    import sqlite3
+    import tempfile
+    
+    def tarot():
+        cards = engine.draw_spread(engine.new_deck())
+        for card in cards:
+            card.load_image()
+        engine.save_reading(cards, engine.predict(cards))
+        engine.db.flush()
+    
+    def mood():
+        engine.submit_mood_test([question["options"][2]["score"] for question in QUESTIONS])
+        engine.mood_trend(14)
+        engine.mood_by_weekday()
+        engine.mood_statistics()
+    
+    flows = {"tarot": tarot, "mood": mood}
+    if name not in flows:
+        raise ValueError(f"неизвестный сценарий {name}, есть: {', '.join(flows)}")
+    
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    tmp_dir = None
+    if db is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp_dir.name, "profile.db")
+        real_path = os.path.join(script_dir, "cat_oracle.db")
+        if os.path.exists(real_path):
+            # backup, а не копия файла: в WAL-режиме часть данных ещё в -wal
+            source = sqlite3.connect(real_path)
+            target = sqlite3.connect(db_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+        db = Database(db_path)
+    engine = OracleEngine(db)
+    
+    # База открывается до замера, чтобы в профиль не попала миграция
+    engine.db
+    try:
+        with capture_profile(name, os.path.join(script_dir, ".cache")):
+            flows[name]()
+    finally:
+        engine.close()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
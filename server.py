@@ -0,0 +1,371 @@
+# КОТОГАДАЛКА - HTTP API
+# Тест настроения, расклады таро, история, тренды и статистика в JSON.
+# Запуск: python main.py serve [--host 127.0.0.1] [--port 8080] [--workers 8] [--shards N] [--stub-upstreams]
+# Пользователь передаётся заголовком X-User-Id, без него - пользователь по умолчанию.
+# С --metrics (или ORACLE_METRICS=1) метрики доступны на /metrics (Prometheus) и /metrics.json.
+
+
+import asyncio
+import argparse
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import oracle
+from metrics import metrics
+from oracle import QUESTIONS, CAT_TYPES, DEFAULT_USER, SPREADS, EnginePool, ResponseCache
+
+
+MAX_BODY_SIZE = 64 * 1024
+MAX_USER_ID_LENGTH = 64
+MAX_PAGE_SIZE = 200
+MAX_TREND_DAYS = 3650
+MAX_SQLITE_INT = 2 ** 63 - 1  # больше SQLite не примет в параметре запроса
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+async def read_request(reader):
+    """
+    Читает один HTTP/1.1 запрос. Возвращает (метод, путь, заголовки, тело)
+    или None, если клиент закрыл соединение.
+    """
+    request_line = await read_line(reader)
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "некорректная строка запроса")
+    
+    headers = {}
+    while True:
+        line = await read_line(reader)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "некорректный Content-Length")
+    if length < 0:
+        raise HttpError(400, "некорректный Content-Length")
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, "слишком большое тело запроса")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def read_line(reader):
+    try:
+        return await reader.readline()
+    except ValueError:
+        # Строка длиннее лимита буфера StreamReader
+        raise HttpError(400, "слишком длинная строка запроса")
+
+
+def write_response(writer, status, payload, keep_alive=True):
+    """payload - объект для JSON или готовый текст (метрики Prometheus)."""
+    if isinstance(payload, str):
+        body = payload.encode("utf-8")
+        content_type = "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        content_type = "application/json; charset=utf-8"
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+def parse_json(body):
+    """Тело запроса - JSON-объект; пустое тело - пустой объект."""
+    try:
+        params = json.loads(body or b"{}")
+    except ValueError:
+        raise HttpError(400, "тело запроса - не JSON")
+    if not isinstance(params, dict):
+        raise HttpError(400, "тело запроса должно быть JSON-объектом")
+    return params
+
+
+def is_int(value):
+    # bool - подкласс int, но true/false числами не считаем
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def int_param(query, name, default=None, minimum=None, maximum=MAX_SQLITE_INT):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise HttpError(400, f"параметр {name} должен быть числом")
+    if minimum is not None and value < minimum:
+        raise HttpError(400, f"параметр {name} должен быть не меньше {minimum}")
+    if value > maximum:
+        raise HttpError(400, f"параметр {name} должен быть не больше {maximum}")
+    return value
+
+
+def user_id_from(headers):
+    user_id = headers.get("x-user-id", "").strip() or DEFAULT_USER
+    if len(user_id) > MAX_USER_ID_LENGTH:
+        raise HttpError(400, f"X-User-Id длиннее {MAX_USER_ID_LENGTH} символов")
+    return user_id
+
+
+def cat_type_payload(cat_type, score):
+    return {
+        "cat_type": cat_type["name"],
+        "description": cat_type["description"],
+        "color": cat_type["color"],
+        "score": score,
+    }
+
+
+class OracleServer:
+    """
+    Асинхронный HTTP-сервер поверх OracleEngine.
+    Событийный цикл только разбирает запросы; работа с базой и внешними
+    API уходит в пул потоков, каждый поток берёт движок из EnginePool.
+    """
+    
+    def __init__(self, engine_pool, workers=8):
+        self.engine_pool = engine_pool
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oracle-http")
+        self.routes = {
+            ("GET", "/questions"): self.get_questions,
+            ("POST", "/mood"): self.post_mood,
+            ("POST", "/tarot"): self.post_tarot,
+            ("GET", "/history/mood"): self.get_mood_history,
+            ("GET", "/history/tarot"): self.get_tarot_history,
+            ("GET", "/trends"): self.get_trends,
+            ("GET", "/statistics"): self.get_statistics,
+            ("GET", "/metrics"): self.get_metrics,
+            ("GET", "/metrics.json"): self.get_metrics_json,
+        }
+    
+    async def run_in_engine(self, func, *args):
+        def call():
+            with self.engine_pool.engine() as engine:
+                return func(engine, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+    
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload = await self.dispatch(method, target, headers, body)
+                except HttpError as e:
+                    status, payload, keep_alive = e.status, {"error": e.message}, False
+                
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                raise HttpError(405, "метод не поддерживается")
+            raise HttpError(404, "нет такого адреса")
+        try:
+            with metrics.timed(f"server.{method} {url.path}"):
+                return 200, await handler(user_id_from(headers), parse_qs(url.query), body)
+        except HttpError:
+            raise
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            print(f"[HTTP] Ошибка {method} {url.path}: {e}")
+            return 500, {"error": "внутренняя ошибка"}
+    
+    # --- обработчики ---
+    
+    async def get_questions(self, user_id, query, body):
+        return {"questions": QUESTIONS, "cat_types": CAT_TYPES}
+    
+    async def post_mood(self, user_id, query, body):
+        answers = parse_json(body).get("answers")
+        if not isinstance(answers, list) or not all(is_int(a) for a in answers):
+            raise HttpError(400, "answers должен быть списком чисел")
+        cat_type, score = await self.run_in_engine(lambda engine: engine.submit_mood_test(answers, user_id))
+        return cat_type_payload(cat_type, score)
+    
+    async def post_tarot(self, user_id, query, body):
+        params = parse_json(body)
+        spread = params.get("spread", "three")
+        seed = params.get("seed")
+        if spread not in SPREADS:
+            raise HttpError(400, f"spread должен быть одним из: {', '.join(SPREADS)}")
+        if seed is not None and not is_int(seed):
+            raise HttpError(400, "seed должен быть числом")
+        
+        cards, prediction = await self.run_in_engine(
+            lambda engine: engine.tarot_reading(user_id=user_id, spread=spread, seed=seed))
+        return {
+            "spread": spread,
+            "cards": [{"position": position, "id": card.value, "name": card.name}
+                      for position, card in zip(SPREADS[spread], cards)],
+            "prediction": prediction,
+        }
+    
+    async def get_mood_history(self, user_id, query, body):
+        before = self.before_key(query)
+        limit = int_param(query, "limit", 20, minimum=1, maximum=MAX_PAGE_SIZE)
+        rows = await self.run_in_engine(lambda engine: engine.mood_history_page(before, limit, user_id))
+        return {"items": [{"ts": ts, "id": row_id, "date": date, "cat_type": cat_type, "score": score}
+                          for ts, row_id, date, cat_type, score in rows]}
+    
+    async def get_tarot_history(self, user_id, query, body):
+        before = self.before_key(query)
+        limit = int_param(query, "limit", 20, minimum=1, maximum=MAX_PAGE_SIZE)
+        rows = await self.run_in_engine(lambda engine: engine.tarot_history_page(before, limit, user_id))
+        return {"items": [{"ts": ts, "id": row_id, "date": date, "cards": [card1, card2, card3]}
+                          for ts, row_id, date, card1, card2, card3 in rows]}
+    
+    async def get_trends(self, user_id, query, body):
+        days = int_param(query, "days", 14, minimum=1, maximum=MAX_TREND_DAYS)
+        trend, weekday = await self.run_in_engine(
+            lambda engine: (engine.mood_trend(days, user_id), engine.mood_by_weekday(user_id)))
+        return {
+            "days": [{"day": day, "avg_score": avg, "count": count} for day, avg, count in trend],
+            "weekdays": [{"weekday": wd, "avg_score": avg, "count": count} for wd, avg, count in weekday],
+        }
+    
+    async def get_statistics(self, user_id, query, body):
+        stats = await self.run_in_engine(lambda engine: engine.mood_statistics(user_id))
+        return {"cat_types": [{"cat_type": cat_type, "count": count} for cat_type, count in stats]}
+    
+    async def get_metrics(self, user_id, query, body):
+        return metrics.to_prometheus()
+    
+    async def get_metrics_json(self, user_id, query, body):
+        return metrics.snapshot()
+    
+    @staticmethod
+    def before_key(query):
+        before_ts = int_param(query, "before_ts", minimum=0)
+        before_id = int_param(query, "before_id", minimum=0)
+        if before_ts is None or before_id is None:
+            return None
+        return before_ts, before_id
+    
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.engine_pool.close()
+
+
+# ============================================================
+# ЗАГЛУШКА ВНЕШНИХ API (для нагрузочных тестов без сети)
+# ============================================================
+
+async def handle_stub_connection(reader, writer):
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            method, target, headers, body = request
+            url = urlsplit(target)
+            
+            if url.path.endswith("/tarot_predictions"):
+                query = parse_qs(url.query)
+                payload = {topic: f"Stub {topic} prediction for card {query.get(topic, ['?'])[0]}."
+                           for topic in oracle.PREDICTION_TOPICS}
+            elif url.path.endswith("/translate"):
+                texts = parse_json(body).get("texts", [])
+                payload = {"translations": [{"text": f"[ru] {text}"} for text in texts]}
+            else:
+                write_response(writer, 404, {"error": "нет такого адреса"}, keep_alive=False)
+                await writer.drain()
+                break
+            
+            write_response(writer, 200, payload)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+        pass
+    finally:
+        writer.close()
+
+
+def use_stub_upstreams(host, port):
+    """Перенаправляет внешние API на заглушку и отделяет их кэш от настоящего."""
+    base = f"http://{host}:{port}"
+    oracle.ASTROLOGY_API_URL = f"{base}/v1/tarot_predictions"
+    oracle.TRANSLATE_API_URL = f"{base}/translate/v2/translate"
+    oracle._translator_config = ("stub", "stub")
+    oracle._response_cache = ResponseCache(os.path.join(tempfile.mkdtemp(prefix="oracle-stub-"), "responses.db"))
+
+
+# ============================================================
+# ТОЧКА ВХОДА
+# ============================================================
+
+async def serve(host, port, workers, db_name, shards, stub_upstreams):
+    servers = []
+    if stub_upstreams:
+        stub = await asyncio.start_server(handle_stub_connection, host, port + 1)
+        servers.append(stub)
+        use_stub_upstreams(host, port + 1)
+        print(f"[HTTP] Заглушка внешних API: http://{host}:{port + 1}")
+    
+    app = OracleServer(EnginePool(size=workers, db_name=db_name, shards=shards), workers=workers)
+    server = await asyncio.start_server(app.handle_connection, host, port)
+    servers.append(server)
+    print(f"[HTTP] Сервер запущен: http://{host}:{port}")
+    
+    try:
+        await asyncio.gather(*(s.serve_forever() for s in servers))
+    finally:
+        app.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="HTTP API Котогадалки")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="потоков и соединений с базой")
+    parser.add_argument("--db", default="cat_oracle.db", help="файл базы данных")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="разложить пользователей по N файлам базы (имя.0.db, имя.1.db, ...)")
+    parser.add_argument("--metrics", action="store_true", help="собирать метрики для /metrics")
+    parser.add_argument("--stub-upstreams", action="store_true",
+                        help="поднять заглушку астрологического API и переводчика на порту port+1")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enabled = True
+    
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.db, args.shards, args.stub_upstreams))
+    except KeyboardInterrupt:
+        print("[HTTP] Сервер остановлен")
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import pytest
+
+from oracle import DEFAULT_USER, Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "oracle.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def add_moods():
+    """add_moods(db, count, user_id) - count тестов, по три с одинаковым ts."""
+    def add(db, count, user_id=DEFAULT_USER, start_ts=1_700_000_000):
+        rows = []
+        for i in range(count):
+            ts = start_ts + i // 3 * 3600
+            rows.append({
+                "user_id": user_id,
+                "ts": ts,
+                "date": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+                "cat_type": "Задумчивый кот 🐱",
+                "score": 10 + i % 5,
+                "answers": str(i),
+            })
+        db.import_history("mood_results", rows)
+    return add
@@ -0,0 +1,51 @@
+def aggregates(db, user_id):
+    return (db.get_mood_by_weekday(user_id), db.get_mood_statistics(user_id),
+            db.query("SELECT day, score_sum, count FROM mood_daily WHERE user_id = ? AND count > 0 ORDER BY day",
+                     (user_id,)))
+
+
+def test_triggers_match_full_rebuild(db, add_moods):
+    add_moods(db, 40, user_id="anna")
+    add_moods(db, 25, user_id="boris", start_ts=1_710_000_000)
+    with db.lock:
+        db.cursor.execute("DELETE FROM mood_results WHERE user_id = 'anna' AND id % 3 = 0")
+        db.connection.commit()
+    
+    maintained = {user: aggregates(db, user) for user in ("anna", "boris")}
+    db.rebuild_aggregates()
+    
+    assert maintained == {user: aggregates(db, user) for user in ("anna", "boris")}
+
+
+def test_updated_rows_match_full_rebuild(db, add_moods):
+    add_moods(db, 30, user_id="anna")
+    add_moods(db, 10, user_id="boris", start_ts=1_710_000_000)
+    with db.lock:
+        db.cursor.execute("UPDATE mood_results SET score = score + 5, cat_type = 'Довольный котик 😺' "
+                          "WHERE id % 4 = 0")
+        db.cursor.execute("UPDATE mood_results SET ts = ts + 86400 * 3 WHERE id % 5 = 0")
+        db.cursor.execute("UPDATE mood_results SET user_id = 'boris' WHERE user_id = 'anna' AND id % 7 = 0")
+        db.connection.commit()
+    
+    maintained = {user: aggregates(db, user) for user in ("anna", "boris")}
+    db.rebuild_aggregates()
+    
+    assert maintained == {user: aggregates(db, user) for user in ("anna", "boris")}
+
+
+def test_aggregates_are_per_user(db, add_moods):
+    add_moods(db, 6, user_id="anna")
+    
+    assert sum(count for _, count in db.get_mood_statistics("anna")) == 6
+    assert db.get_mood_statistics("boris") == []
+    assert db.get_mood_by_weekday("boris") == []
+
+
+def test_saved_result_shows_up_in_todays_trend(db):
+    db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+    db.save_mood_result("Довольный котик 😺", 20, [4, 4, 4, 4, 4])
+    
+    (day, avg_score, count), = db.get_mood_trend(days=1)
+    
+    assert (avg_score, count) == (19, 2)
+    assert db.get_mood_statistics() == [("Довольный котик 😺", 2)]
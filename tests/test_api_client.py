@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+import requests
+
+from oracle import ApiClient, ApiUnavailableError, CircuitBreaker
+
+
+def response(status, content=b"{}"):
+    r = requests.Response()
+    r.status_code = status
+    r._content = content
+    return r
+
+
+class FakeSession:
+    """Отдаёт заранее заданные ответы или исключения по очереди, последний повторяется."""
+    
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+    
+    def post(self, url, **kwargs):
+        result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client():
+    client = ApiClient()
+    # Без пауз между повторами
+    client.ENDPOINTS = {name: dict(config, backoff=0) for name, config in ApiClient.ENDPOINTS.items()}
+    return client
+
+
+def test_success_returns_json(client):
+    client.session = FakeSession(response(200, b'{"ok": 1}'))
+    
+    assert client.post("astrology", "http://x") == {"ok": 1}
+    assert client.get_stats()["astrology"]["requests"] == 1
+
+
+def test_server_errors_are_retried_then_open_breaker(client):
+    client.session = FakeSession(response(503))
+    breaker = client.breakers["astrology"]
+    
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            client.post("astrology", "http://x")
+    
+    assert client.session.calls == breaker.failure_threshold * (client.ENDPOINTS["astrology"]["retries"] + 1)
+    with pytest.raises(ApiUnavailableError):
+        client.post("astrology", "http://x")
+    stats = client.get_stats()["astrology"]
+    assert stats["rejected"] == 1
+    assert stats["circuit_open"]
+
+
+def test_timeouts_count_as_breaker_failures(client):
+    client.session = FakeSession(requests.Timeout("slow"))
+    
+    for _ in range(client.breakers["astrology"].failure_threshold):
+        with pytest.raises(requests.Timeout):
+            client.post("astrology", "http://x")
+    
+    assert client.get_stats()["astrology"]["circuit_open"]
+
+
+def test_client_errors_do_not_open_breaker(client):
+    client.session = FakeSession(response(400))
+    
+    for _ in range(10):
+        with pytest.raises(requests.HTTPError):
+            client.post("astrology", "http://x")
+    
+    assert client.session.calls == 10  # 4xx не повторяются
+    assert not client.get_stats()["astrology"]["circuit_open"]
+
+
+def test_client_error_after_server_error_closes_breaker(client):
+    client.breakers["astrology"].failures = 2
+    client.session = FakeSession(response(404))
+    
+    with pytest.raises(requests.HTTPError):
+        client.post("astrology", "http://x")
+    
+    assert client.breakers["astrology"].failures == 0
+
+
+def test_breaker_lets_one_probe_through_after_timeout(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("oracle.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    
+    now[0] += 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_counters_are_consistent_across_threads(client):
+    client.session = FakeSession(response(200))
+    threads_count, calls = 8, 300
+    
+    def worker():
+        for _ in range(calls):
+            client.post("translate", "http://x")
+    
+    threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert client.get_stats()["translate"]["requests"] == threads_count * calls
@@ -0,0 +1,28 @@
+import pytest
+
+from oracle import Deck, get_tarot_registry
+
+
+def test_deck_deals_every_card_once():
+    deck = Deck(seed=1)
+    
+    cards = deck.pull(len(deck))
+    
+    assert len(cards) == len(get_tarot_registry())
+    assert len({card.name for card in cards}) == len(cards)
+    with pytest.raises(IndexError):
+        deck.pull_card()
+
+
+def test_same_seed_same_spreads():
+    assert [card.name for card in Deck(seed=7).pull(10)] == [card.name for card in Deck(seed=7).pull(10)]
+
+
+def test_reset_returns_all_cards():
+    deck = Deck(seed=3)
+    deck.pull(5)
+    
+    deck.reset()
+    
+    assert len(deck) == len(get_tarot_registry())
+    assert len({card.name for card in deck.pull(len(deck))}) == len(deck.registry)
@@ -0,0 +1,86 @@
+from oracle import HistoryPages
+
+
+def all_rows(db):
+    return db.query("SELECT ts, id FROM mood_results ORDER BY ts DESC, id DESC")
+
+
+def keys(rows):
+    return [(row[0], row[1]) for row in rows]
+
+
+def test_keyset_pages_cover_history_once_in_order(db, add_moods):
+    add_moods(db, 130)
+    
+    seen, before = [], None
+    while True:
+        page = db.get_mood_history_page(before, limit=20)
+        if not page:
+            break
+        seen += keys(page)
+        before = seen[-1]
+    
+    assert seen == keys(all_rows(db))
+
+
+def test_keyset_pages_are_per_user(db, add_moods):
+    add_moods(db, 10, user_id="anna")
+    add_moods(db, 5, user_id="boris")
+    
+    assert len(db.get_mood_history_page(limit=50, user_id="anna")) == 10
+    assert len(db.get_mood_history_page(limit=50, user_id="boris")) == 5
+
+
+def test_window_keeps_at_most_max_pages(db, add_moods):
+    add_moods(db, 500)
+    pages = HistoryPages(db.get_mood_history_page, page_size=20, max_pages=3)
+    
+    rows = []
+    while pages.has_more:
+        pages.load_more()
+    for index in range(len(pages)):
+        rows.append(pages.row(index))
+        assert len(pages.pages) <= 3
+    
+    assert len(pages) == 500
+    assert keys(rows) == keys(all_rows(db))
+
+
+def test_dropped_pages_are_refetched_by_their_cursor(db, add_moods):
+    add_moods(db, 200)
+    calls = []
+    
+    def fetch_page(before, limit):
+        calls.append(before)
+        return db.get_mood_history_page(before, limit)
+    
+    pages = HistoryPages(fetch_page, page_size=20, max_pages=2)
+    for index in range(199):
+        pages.row(index)
+    first_pass = len(calls)
+    
+    assert pages.row(0) == db.get_mood_history_page(None, 20)[0]
+    assert keys([pages.row(45)]) == [all_rows(db)[45]]
+    assert calls[first_pass:] == [None, pages.cursors[2]]
+
+
+def test_reset_starts_from_first_page(db, add_moods):
+    add_moods(db, 30)
+    pages = HistoryPages(db.get_mood_history_page, page_size=20)
+    pages.load_more()
+    pages.load_more()
+    assert len(pages) == 30 and not pages.has_more
+    
+    add_moods(db, 3, start_ts=1_800_000_000)
+    pages.reset(db.get_mood_history_page(None, 20))
+    
+    assert pages.row(0)[0] == 1_800_000_000
+    assert len(pages) == 20 and pages.has_more
+
+
+def test_empty_history(db):
+    pages = HistoryPages(db.get_mood_history_page, page_size=20)
+    pages.load_more()
+    
+    assert len(pages) == 0
+    assert not pages.has_more
@@ -0,0 +1,157 @@
+import os
+
+import pytest
+from PIL import Image
+
+from oracle import ImageCache, open_scaled
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageCache(str(tmp_path / "cache"))
+
+
+def make_image(path, size, mode="RGB", color="red", **save_args):
+    Image.new(mode, size, color).save(path, **save_args)
+    return str(path)
+
+
+def test_small_rgb_image_survives_closing_source(tmp_path, cache):
+    # Уже RGB и уже влезает в рамку: уменьшать нечего
+    path = make_image(tmp_path / "small.jpg", (120, 100))
+    
+    image = cache.get(path, 180, 180)
+    
+    assert image.size == (120, 100)
+    assert image.getpixel((5, 5))[0] > 200
+    assert os.listdir(tmp_path / "cache")
+
+
+def test_open_scaled_returns_loaded_copy(tmp_path):
+    path = make_image(tmp_path / "small.png", (50, 40))
+    
+    image = open_scaled(path, 100, 100)
+    
+    assert image.size == (50, 40)
+    image.copy()  # закрытая картинка здесь бы упала
+
+
+def test_transparency_is_flattened_to_white(tmp_path, cache):
+    path = make_image(tmp_path / "alpha.png", (400, 200), mode="RGBA", color=(0, 0, 0, 0))
+    
+    image = cache.get(path, 100, 100)
+    
+    assert image.mode == "RGB"
+    assert image.size == (100, 50)
+    assert image.getpixel((10, 10)) == (255, 255, 255)
+
+
+def test_disk_tier_survives_restart(tmp_path, cache):
+    path = make_image(tmp_path / "big.jpg", (1000, 800))
+    first = cache.get(path, 250, 250)
+    
+    restarted = ImageCache(cache.cache_dir)
+    second = restarted.get(path, 250, 250)
+    
+    assert second.size == first.size == (250, 200)
+
+
+def test_corrupt_disk_entry_is_rebuilt(tmp_path, cache):
+    path = make_image(tmp_path / "big.jpg", (1000, 800))
+    cache.get(path, 250, 250)
+    key = cache.make_key(path, 250, 250)
+    disk_path = os.path.join(cache.cache_dir, key[:2], key + ".png")
+    with open(disk_path, "wb") as f:
+        f.write(b"not a png")
+    
+    image = ImageCache(cache.cache_dir).get(path, 250, 250)
+    
+    assert image.size == (250, 200)
+    with Image.open(disk_path) as rebuilt:
+        assert rebuilt.size == (250, 200)
+
+
+def test_unwritable_cache_dir_does_not_break_loading(tmp_path):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("file, not a directory")
+    path = make_image(tmp_path / "big.jpg", (1000, 800))
+    
+    image = ImageCache(str(blocker)).get(path, 250, 250)
+    
+    assert image.size == (250, 200)
+
+
+def test_memory_tier_respects_byte_budget(tmp_path):
+    cache = ImageCache(str(tmp_path / "cache"), max_bytes=3 * 100 * 100 * 3)
+    paths = [make_image(tmp_path / f"{i}.png", (100, 100)) for i in range(5)]
+    
+    for path in paths:
+        cache.get(path, 100, 100)
+    
+    assert cache.memory_bytes <= cache.max_bytes
+    assert len(cache.memory) == 3
+
+
+def test_key_follows_the_decoded_jpeg_twin(tmp_path, cache):
+    (tmp_path / "png").mkdir()
+    (tmp_path / "jpg").mkdir()
+    png_path = make_image(tmp_path / "png" / "card.png", (600, 1000), color="red")
+    jpg_path = make_image(tmp_path / "jpg" / "card.jpg", (300, 500), color="red")
+    assert cache.get(png_path, 150, 280, fit=False).getpixel((75, 140))[0] > 200
+    
+    make_image(jpg_path, (300, 500), color="blue")
+    os.utime(jpg_path, ns=(1, 1))
+    
+    image = ImageCache(cache.cache_dir).get(png_path, 150, 280, fit=False)
+    assert image.getpixel((75, 140))[2] > 200
+
+
+def test_progressive_jpeg_twin_is_skipped(tmp_path, cache):
+    (tmp_path / "png").mkdir()
+    (tmp_path / "jpg").mkdir()
+    png_path = make_image(tmp_path / "png" / "card.png", (600, 1000), color="red")
+    make_image(tmp_path / "jpg" / "card.jpg", (300, 500), color="blue", progressive=True)
+    
+    image = cache.get(png_path, 150, 280, fit=False)
+    
+    assert image.getpixel((75, 140))[0] > 200
+
+
+def test_memory_hit_opens_no_files(tmp_path, cache, monkeypatch):
+    (tmp_path / "png").mkdir()
+    (tmp_path / "jpg").mkdir()
+    png_path = make_image(tmp_path / "png" / "card.png", (600, 1000))
+    make_image(tmp_path / "jpg" / "card.jpg", (300, 500))
+    first = cache.get(png_path, 150, 280)
+    
+    def no_open(*args, **kwargs):
+        raise AssertionError("файл открыт при попадании в кэш")
+    
+    monkeypatch.setattr(Image, "open", no_open)
+    
+    assert cache.get(png_path, 150, 280) is first
+
+
+def test_atlas_is_loaded_once_across_threads(monkeypatch):
+    import threading
+    import time
+    
+    import oracle
+    
+    calls = []
+    
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.05)
+        return False
+    
+    monkeypatch.setattr(oracle, "_tarot_atlas", None)
+    monkeypatch.setattr(oracle, "load_tarot_atlas", slow_load)
+    threads = [threading.Thread(target=oracle.get_tarot_atlas) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert calls == [1]
+    assert oracle.get_tarot_atlas() is None
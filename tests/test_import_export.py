@@ -0,0 +1,56 @@
+import pytest
+
+from oracle import HISTORY_COLUMNS, Database, export_history, import_history
+
+
+@pytest.fixture
+def other_db(tmp_path):
+    db = Database(str(tmp_path / "other.db"))
+    yield db
+    db.close()
+
+
+def history(db, table):
+    return list(db.iter_history(table))
+
+
+@pytest.mark.parametrize("extension", ["jsonl", "csv"])
+def test_roundtrip_keeps_rows(db, other_db, add_moods, tmp_path, extension):
+    add_moods(db, 12, user_id="anna")
+    db.save_tarot_reading([None, None, None], {"love": "l", "career": "c"}, user_id="boris")
+    
+    for table in HISTORY_COLUMNS:
+        path = str(tmp_path / f"{table}.{extension}")
+        assert export_history(db, table, path) == len(history(db, table))
+        assert import_history(other_db, table, path) == (len(history(db, table)),) * 2
+        assert history(other_db, table) == history(db, table)
+
+
+def test_repeated_import_adds_nothing(db, other_db, add_moods, tmp_path):
+    add_moods(db, 9)
+    path = str(tmp_path / "mood.csv")
+    export_history(db, "mood_results", path)
+    
+    import_history(other_db, "mood_results", path)
+    
+    assert import_history(other_db, "mood_results", path) == (9, 0)
+    assert len(history(other_db, "mood_results")) == 9
+
+
+def test_import_restores_ts_and_user_from_date(db, tmp_path):
+    path = tmp_path / "old.jsonl"
+    path.write_text('{"date": "2024-01-02 03:04:05", "cat_type": "x", "score": 12, "answers": "1"}\n')
+    
+    import_history(db, "mood_results", str(path))
+    
+    (row,) = history(db, "mood_results")
+    assert row["user_id"] == "local"
+    assert row["ts"] is not None
+
+
+def test_row_without_date_is_rejected(db, tmp_path):
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"cat_type": "x", "score": 12}\n')
+    
+    with pytest.raises(ValueError):
+        import_history(db, "mood_results", str(path))
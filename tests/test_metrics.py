@@ -0,0 +1,75 @@
+import json
+
+from metrics import WINDOW_SIZE, Histogram, Metrics, percentile
+
+
+def test_percentile_on_sorted_values():
+    values = list(range(1, 101))
+    
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.99) == 100
+    assert percentile([], 0.5) == 0.0
+
+
+def test_histogram_window_and_totals():
+    histogram = Histogram()
+    for i in range(WINDOW_SIZE + 10):
+        histogram.observe(float(i))
+    
+    summary = histogram.summary()
+    
+    assert summary["count"] == WINDOW_SIZE + 10
+    assert summary["max"] == WINDOW_SIZE + 9
+    assert len(histogram.window) == WINDOW_SIZE
+    assert summary["p50"] >= 10  # первые замеры уже вышли из окна
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.inc("event")
+    with metrics.timed("op"):
+        pass
+    
+    assert metrics.snapshot()["timers"] == {}
+    assert metrics.snapshot()["counters"] == {}
+
+
+def test_prometheus_and_json_dump(tmp_path):
+    metrics = Metrics(enabled=True)
+    metrics.inc("image.cache_miss", 2)
+    with metrics.timed("db.query"):
+        pass
+    
+    text = metrics.to_prometheus()
+    metrics.dump(str(tmp_path))
+    
+    assert 'oracle_events_total{event="image.cache_miss"} 2' in text
+    assert 'oracle_duration_seconds_count{op="db.query"} 1' in text
+    assert 'quantile="0.95"' in text
+    with open(tmp_path / "metrics.json", encoding="utf-8") as f:
+        assert json.load(f)["counters"] == {"image.cache_miss": 2}
+    assert (tmp_path / "metrics.prom").read_text(encoding="utf-8") == text
+
+
+def test_profile_flow_leaves_real_database_alone():
+    import os
+    import sqlite3
+    
+    import oracle
+    
+    real_path = os.path.join(os.path.dirname(os.path.abspath(oracle.__file__)), "cat_oracle.db")
+    
+    def count_moods():
+        if not os.path.exists(real_path):
+            return None
+        connection = sqlite3.connect(f"file:{real_path}?mode=ro", uri=True)
+        try:
+            return connection.execute("SELECT COUNT(*) FROM mood_results").fetchone()[0]
+        finally:
+            connection.close()
+    
+    before = count_moods()
+    
+    oracle.profile_flow("mood")
+    
+    assert count_moods() == before
@@ -0,0 +1,84 @@
+import sqlite3
+from datetime import datetime
+
+from oracle import DEFAULT_USER, Database
+
+
+BASELINE_SCHEMA = """
+    CREATE TABLE mood_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        cat_type TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        answers TEXT
+    );
+    CREATE TABLE tarot_readings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        card1_name TEXT,
+        card2_name TEXT,
+        card3_name TEXT,
+        prediction_love TEXT,
+        prediction_career TEXT,
+        prediction_finance TEXT
+    );
+"""
+DATES = ["2024-01-01 10:00:00", "2024-01-02 23:30:00", "2024-01-02 08:15:00"]
+
+
+def make_baseline_db(path):
+    """База в схеме до миграций: только текстовая дата, без ts и user_id."""
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    for i, date in enumerate(DATES):
+        connection.execute("INSERT INTO mood_results (date, cat_type, score, answers) VALUES (?, ?, ?, ?)",
+                           (date, "Задумчивый кот 🐱", 15 + i, "3,3,3,3,3"))
+    connection.execute("INSERT INTO tarot_readings (date, card1_name, card2_name, card3_name, prediction_love) "
+                       "VALUES (?, 'a', 'b', 'c', 'love')", (DATES[0],))
+    connection.commit()
+    connection.close()
+
+
+def test_baseline_database_is_migrated_to_current_version(tmp_path):
+    path = str(tmp_path / "old.db")
+    make_baseline_db(path)
+    
+    db = Database(path)
+    try:
+        assert db.query("PRAGMA user_version")[0][0] == 4
+        rows = db.query("SELECT date, ts, user_id FROM mood_results ORDER BY id")
+        for date, ts, user_id in rows:
+            assert ts == int(datetime.strptime(date, "%Y-%m-%d %H:%M:%S").timestamp())
+            assert user_id == DEFAULT_USER
+        
+        # История читается по новым индексам в прежнем формате даты
+        assert [row[0] for row in db.get_mood_history(10)] == sorted(DATES, reverse=True)
+        assert len(db.get_tarot_history(10)) == 1
+        
+        indexes = {row[0] for row in db.query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_mood_results_user_ts", "idx_tarot_readings_user_ts"} <= indexes
+        assert "idx_mood_results_ts" not in indexes
+        
+        # Сводные таблицы заполнены старыми записями
+        assert sum(count for _, count in db.get_mood_statistics()) == len(DATES)
+    finally:
+        db.close()
+
+
+def test_migrations_run_once(tmp_path):
+    path = str(tmp_path / "old.db")
+    make_baseline_db(path)
+    Database(path).close()
+    
+    db = Database(path)
+    try:
+        assert db.query("PRAGMA user_version")[0][0] == 4
+        assert db.query("SELECT COUNT(*) FROM mood_results")[0][0] == len(DATES)
+        assert sum(count for _, count in db.get_mood_statistics()) == len(DATES)
+    finally:
+        db.close()
+
+
+def test_new_database_starts_at_current_version(db):
+    assert db.query("PRAGMA user_version")[0][0] == 4
+    assert db.get_mood_history(10) == []
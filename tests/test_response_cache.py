@@ -0,0 +1,43 @@
+import pytest
+
+from oracle import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache" / "responses.db"), max_translations=3)
+    yield cache
+    cache.close()
+
+
+def test_prediction_roundtrip(cache):
+    assert cache.get_prediction((1, 2, 3)) is None
+    
+    cache.save_prediction((1, 2, 3), {"love": "yes"})
+    
+    assert cache.get_prediction((1, 2, 3)) == {"love": "yes"}
+    assert cache.get_prediction((3, 2, 1)) is None
+
+
+def test_translations_per_language(cache):
+    cache.save_translations([("cat", "кот")], "ru")
+    
+    assert cache.get_translations(["cat", "dog"], "ru") == {"cat": "кот"}
+    assert cache.get_translations(["cat"], "de") == {}
+    assert cache.get_translations([], "ru") == {}
+
+
+def test_expired_translations_are_ignored(cache, monkeypatch):
+    cache.save_translations([("cat", "кот")], "ru")
+    
+    later = cache.translation_ttl + 10
+    monkeypatch.setattr("oracle.time.time", lambda real=__import__("time").time: real() + later)
+    
+    assert cache.get_translations(["cat"], "ru") == {}
+
+
+def test_translation_count_is_capped(cache):
+    cache.save_translations([(f"text {i}", f"текст {i}") for i in range(10)], "ru")
+    
+    stored = cache.connection.execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0]
+    assert stored == cache.max_translations
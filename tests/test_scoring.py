@@ -0,0 +1,99 @@
+import sys
+from array import array
+
+import pytest
+
+from oracle import CAT_TYPES, QUESTIONS, build_cat_type_table, get_cat_type, score_answers, score_batch
+
+
+OPTION_SCORES = [sorted(option["score"] for option in question["options"]) for question in QUESTIONS]
+ROWS = [
+    [scores[0] for scores in OPTION_SCORES],
+    [scores[-1] for scores in OPTION_SCORES],
+    [scores[i % len(scores)] for i, scores in enumerate(OPTION_SCORES)],
+]
+BAD_ROWS = [
+    [1.5] + ROWS[0][1:],
+    [True] + ROWS[0][1:],
+    ROWS[0][:-1] + [99],
+    ROWS[0][:-1] + [-1],
+]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setitem(sys.modules, "numpy", None)  # import numpy -> ImportError
+    return request.param
+
+
+def expected(rows):
+    totals = [score_answers(row) for row in rows]
+    return totals, [CAT_TYPES.index(get_cat_type(total)) for total in totals]
+
+
+def test_rows_match_single_scoring(backend):
+    totals, types = score_batch(ROWS)
+    assert (list(totals), list(types)) == expected(ROWS)
+
+
+def test_flat_array_input(backend):
+    flat = array("h", [score for row in ROWS for score in row])
+    totals, types = score_batch(flat)
+    assert (list(totals), list(types)) == expected(ROWS)
+
+
+def test_result_types_share_widths(backend):
+    totals, types = score_batch(ROWS)
+    assert memoryview(totals).itemsize == 2
+    assert memoryview(types).itemsize == 1
+
+
+@pytest.mark.parametrize("row", BAD_ROWS)
+def test_invalid_scores_are_rejected(backend, row):
+    with pytest.raises(ValueError):
+        score_batch([ROWS[0], row])
+
+
+def test_wrong_width_is_rejected(backend):
+    with pytest.raises(ValueError):
+        score_batch([ROWS[0], ROWS[0][:-1]])
+
+
+@pytest.mark.parametrize("answers", [ROWS[0], [ROWS[0], 3], ["12345"]])
+def test_wrong_shape_list_is_rejected(backend, answers):
+    with pytest.raises(ValueError):
+        score_batch(answers)
+
+
+def test_numpy_rejects_float_and_wrong_shape():
+    np = pytest.importorskip("numpy")
+    with pytest.raises(ValueError):
+        score_batch(np.array(ROWS, dtype=float))
+    with pytest.raises(ValueError):
+        score_batch(np.zeros((len(QUESTIONS), len(QUESTIONS) - 1), dtype=int))
+
+
+def test_table_covers_every_reachable_score():
+    min_total, table = build_cat_type_table()
+    
+    assert min_total == sum(scores[0] for scores in OPTION_SCORES)
+    assert len(table) == sum(scores[-1] for scores in OPTION_SCORES) - min_total + 1
+
+
+def test_table_rejects_gaps_and_overlaps():
+    gap = [dict(cat_type) for cat_type in CAT_TYPES]
+    gap[1]["max_score"] -= 1
+    overlap = [dict(cat_type) for cat_type in CAT_TYPES]
+    overlap[1]["max_score"] += 1
+    
+    with pytest.raises(ValueError, match="ни в один"):
+        build_cat_type_table(gap)
+    with pytest.raises(ValueError, match="несколько"):
+        build_cat_type_table(overlap)
+
+
+def test_out_of_range_total_falls_back_to_first_type():
+    assert get_cat_type(-100) is CAT_TYPES[0]
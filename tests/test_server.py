@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import pytest
+
+from oracle import EnginePool
+from server import HttpError, OracleServer, read_request
+
+
+def parse(raw):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader)
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = OracleServer(EnginePool(size=2, db_name=str(tmp_path / "server.db")), workers=2)
+    yield app
+    app.close()
+
+
+def call(app, method, path, body=None, headers=None):
+    """Один запрос к серверу через настоящий сокет. Возвращает (статус, JSON)."""
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body)
+    body = (body or "").encode()
+    lines = [f"{method} {path} HTTP/1.1", "Host: test", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    if body and "Content-Length" not in (headers or {}):
+        lines.append(f"Content-Length: {len(body)}")
+    raw = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+    
+    async def run():
+        server = await asyncio.start_server(app.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), timeout=5)
+            writer.close()
+            return response
+        finally:
+            server.close()
+            await server.wait_closed()
+    
+    response = asyncio.run(run())
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(payload)
+
+
+def test_read_request_parses_headers_and_body():
+    method, target, headers, body = parse(
+        b"post /mood?x=1 HTTP/1.1\r\nX-User-Id: anna\r\nContent-Length: 2\r\n\r\n{}")
+    
+    assert (method, target, body) == ("POST", "/mood?x=1", b"{}")
+    assert headers["x-user-id"] == "anna"
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"1.5"])
+def test_read_request_rejects_bad_content_length(length):
+    with pytest.raises(HttpError) as error:
+        parse(b"POST /mood HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+    assert error.value.status == 400
+
+
+def test_read_request_rejects_huge_body():
+    with pytest.raises(HttpError) as error:
+        parse(b"POST /mood HTTP/1.1\r\nContent-Length: 999999999\r\n\r\n")
+    assert error.value.status == 413
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_gets_400_response(app, length):
+    status, payload = call(app, "POST", "/mood", "{}", headers={"Content-Length": length})
+    assert status == 400
+    assert "Content-Length" in payload["error"]
+
+
+def test_mood_roundtrip_and_history(app):
+    status, payload = call(app, "POST", "/mood", {"answers": [1, 2, 3, 4, 5]}, headers={"X-User-Id": "anna"})
+    assert status == 200
+    assert payload["score"] == 15
+    
+    status, payload = call(app, "GET", "/history/mood?limit=5", headers={"X-User-Id": "anna"})
+    assert status == 200
+    assert [item["score"] for item in payload["items"]] == [15]
+    
+    status, payload = call(app, "GET", "/history/mood", headers={"X-User-Id": "boris"})
+    assert payload["items"] == []
+
+
+@pytest.mark.parametrize("body", [
+    [],
+    "[1, 2, 3, 4, 5]",
+    "5",
+    {"answers": [True, 1, 1, 1, 1]},
+    {"answers": "12345"},
+    {"answers": [1, 1, 1, 1, 9]},
+    {"answers": [1, 1, 1]},
+    "not json",
+])
+def test_bad_mood_body_gets_400(app, body):
+    status, payload = call(app, "POST", "/mood", body)
+    assert status == 400, payload
+
+
+def test_bad_tarot_body_gets_400(app):
+    assert call(app, "POST", "/tarot", [])[0] == 400
+    assert call(app, "POST", "/tarot", {"spread": "nope"})[0] == 400
+    assert call(app, "POST", "/tarot", {"seed": True})[0] == 400
+
+
+@pytest.mark.parametrize("path", [
+    "/history/mood?limit=-1",
+    "/history/tarot?limit=0",
+    "/history/mood?limit=abc",
+    "/history/mood?before_ts=-1&before_id=1",
+    "/trends?days=-5",
+    "/trends?days=100000",
+    "/history/tarot?limit=201",
+    "/history/mood?before_ts=99999999999999999999999&before_id=1",
+    "/history/mood?before_ts=1&before_id=9223372036854775808",
+])
+def test_bad_query_params_get_400(app, path):
+    assert call(app, "GET", path)[0] == 400
+
+
+def test_unknown_route_and_method(app):
+    assert call(app, "GET", "/nope")[0] == 404
+    assert call(app, "GET", "/mood")[0] == 405
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from oracle import ShardedDatabase
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    db = ShardedDatabase(str(tmp_path / "oracle.db"), shards=4)
+    yield db
+    db.close()
+
+
+USERS = [f"user{i:03d}" for i in range(40)]
+
+
+def test_shard_files_are_created(sharded, tmp_path):
+    files = {name for name in os.listdir(tmp_path) if name.endswith(".db")}
+    assert files == {f"oracle.{i}.db" for i in range(4)}
+
+
+def test_user_always_maps_to_the_same_shard(sharded, tmp_path):
+    first = [sharded.shards.index(sharded.shard(user)) for user in USERS]
+    
+    reopened = ShardedDatabase(str(tmp_path / "oracle.db"), shards=4)
+    try:
+        assert [reopened.shards.index(reopened.shard(user)) for user in USERS] == first
+    finally:
+        reopened.close()
+    # Пользователи расходятся по всем шардам
+    assert set(first) == {0, 1, 2, 3}
+
+
+def test_user_data_stays_in_one_shard(sharded):
+    for user in USERS:
+        sharded.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3], user_id=user)
+    
+    for user in USERS:
+        holders = [shard for shard in sharded.shards
+                   if shard.query("SELECT COUNT(*) FROM mood_results WHERE user_id = ?", (user,))[0][0]]
+        assert holders == [sharded.shard(user)]
+    assert sum(shard.query("SELECT COUNT(*) FROM mood_results")[0][0] for shard in sharded.shards) == len(USERS)
+
+
+def test_reads_are_isolated_per_user(sharded, add_moods):
+    add_moods(sharded.shard("anna"), 7, user_id="anna")
+    add_moods(sharded.shard("boris"), 3, user_id="boris")
+    
+    assert len(sharded.get_mood_history_page(limit=50, user_id="anna")) == 7
+    assert len(sharded.get_mood_history(50, user_id="boris")) == 3
+    assert sum(count for _, count in sharded.get_mood_statistics("anna")) == 7
+    assert sharded.get_mood_history(50, user_id="nobody") == []
+
+
+def test_export_and_import_fan_out_over_shards(sharded, tmp_path):
+    for user in USERS:
+        sharded.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3], user_id=user)
+    sharded.flush()
+    assert all(shard.pending_writes == [] for shard in sharded.shards)
+    
+    rows = list(sharded.iter_history("mood_results", batch_size=3))
+    assert sorted(row["user_id"] for row in rows) == USERS
+    
+    copy = ShardedDatabase(str(tmp_path / "copy.db"), shards=4)
+    try:
+        assert copy.import_history("mood_results", rows, batch_size=4) == (len(USERS), len(USERS))
+        assert copy.import_history("mood_results", rows) == (len(USERS), 0)
+        for user in USERS:
+            assert len(copy.get_mood_history(10, user_id=user)) == 1
+    finally:
+        copy.close()
@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+from oracle import Database
+
+
+def count_on_disk(path):
+    """Строки, которые видит другое соединение, то есть уже записанные."""
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT COUNT(*) FROM mood_results").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_fast_profile_buffers_until_read(db):
+    db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+    
+    assert count_on_disk(db.db_path) == 0
+    assert len(db.get_mood_history(10)) == 1  # чтение сбрасывает буфер
+    assert count_on_disk(db.db_path) == 1
+
+
+def test_buffer_flushes_by_size(db):
+    for _ in range(db.profile["flush_size"]):
+        db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+    
+    assert count_on_disk(db.db_path) == db.profile["flush_size"]
+    assert db.pending_writes == []
+
+
+def test_close_flushes_buffer(tmp_path):
+    db = Database(str(tmp_path / "oracle.db"))
+    db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+    db.save_tarot_reading([None, None, None], {}, user_id="anna")
+    
+    db.close()
+    
+    assert count_on_disk(db.db_path) == 1
+
+
+def test_safe_and_server_profiles_write_immediately(tmp_path):
+    for profile in ("safe", "server"):
+        db = Database(str(tmp_path / f"{profile}.db"), profile=profile)
+        try:
+            db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+            assert count_on_disk(db.db_path) == 1
+        finally:
+            db.close()
+
+
+def test_failed_write_does_not_break_the_database(tmp_path):
+    db = Database(str(tmp_path / "oracle.db"))
+    db.save_mood_result(None, 18, [4, 4, 4, 3, 3])  # cat_type NOT NULL
+    db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+    
+    with pytest.raises(sqlite3.IntegrityError):
+        db.get_mood_history(10)
+    
+    # Хорошая запись из той же пачки сохранена, база дальше работает
+    assert [row[1] for row in db.get_mood_history(10)] == ["Довольный котик 😺"]
+    assert len(db.failed_writes) == 1
+    db.save_mood_result("Задумчивый кот 🐱", 12, [2, 2, 2, 3, 3])
+    assert len(db.get_mood_history(10)) == 2
+    
+    db.save_mood_result(None, 18, [4, 4, 4, 3, 3])
+    with pytest.raises(sqlite3.IntegrityError):
+        db.close()
+    assert count_on_disk(db.db_path) == 2
+    with pytest.raises(sqlite3.ProgrammingError):
+        db.connection.execute("SELECT 1")  # соединение закрыто несмотря на ошибку
+
+
+def test_failed_write_in_safe_profile_raises_at_save(tmp_path):
+    db = Database(str(tmp_path / "safe.db"), profile="safe")
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            db.save_mood_result(None, 18, [4, 4, 4, 3, 3])
+        db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+        assert count_on_disk(db.db_path) == 1
+    finally:
+        db.close()
+
+
+def test_server_profile_does_not_log_each_save(tmp_path, capsys):
+    db = Database(str(tmp_path / "server.db"), profile="server")
+    try:
+        capsys.readouterr()
+        db.save_mood_result("Довольный котик 😺", 18, [4, 4, 4, 3, 3])
+        db.save_tarot_reading([], {})
+        
+        assert capsys.readouterr().out == ""
+        assert count_on_disk(db.db_path) == 1
+    finally:
+        db.close()